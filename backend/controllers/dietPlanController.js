@@ -11,8 +11,23 @@ export const createDietPlan = async (req, res) => {
       generatedFrom: req.body.generatedFrom
     });
 
+    const idempotencyKey = req.get('Idempotency-Key') || req.body.idempotencyKey;
+
+    // Replayed save: return the plan stored the first time
+    if (idempotencyKey) {
+      const existing = await DietPlan.findOne({ idempotencyKey });
+      if (existing) {
+        return res.status(200).json({
+          success: true,
+          message: 'Diet plan already saved',
+          data: existing
+        });
+      }
+    }
+
     const dietPlanData = {
       ...req.body,
+      ...(idempotencyKey && { idempotencyKey }),
       userId: req.user.id
     };
 
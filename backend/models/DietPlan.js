@@ -8,6 +8,12 @@ const dietPlanSchema = new mongoose.Schema({
     required: false,
   },
 
+  // Client-supplied key so retried saves don't create duplicates
+  idempotencyKey: {
+    type: String,
+    required: false,
+  },
+
   // User Information
   userInfo: {
     name: {
@@ -132,6 +138,7 @@ dietPlanSchema.pre('save', function(next) {
 // Index for faster queries
 dietPlanSchema.index({ userId: 1, createdAt: -1 });
 dietPlanSchema.index({ status: 1 });
+dietPlanSchema.index({ idempotencyKey: 1 }, { unique: true, sparse: true });
 
 const DietPlan = mongoose.model('DietPlan', dietPlanSchema);
 
@@ -1,16 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify
 from flask_cors import CORS
-import joblib
+import hmac
 import json
 import numpy as np
-import pandas as pd
 import os
+import sys
+import atexit
+import threading
 import warnings
+from collections import OrderedDict
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import requests
-import xgboost as xgb          
 from dotenv import load_dotenv
+from inference import MACRO_TARGETS, MacroPredictor
+from features import FeatureBuilder, parse_record
+from encoders import CompiledEncoders
+from report_jobs import JobQueueFull, JobStore, ReportJobQueue
+from plan_writer import CircuitBreaker, DietPlanWriter, PlanOutbox, PlanStatusStore, PersistenceError, with_idempotency_key
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry, ModelSet, files_version
+from model_pack import ModelPack
 load_dotenv()
 
 warnings.filterwarnings(
@@ -24,20 +33,14 @@ warnings.filterwarnings(
     category=UserWarning
 )
 
-# Import OCR processor 
-from ocr_processor import process_medical_report
+# The OCR processor (cv2, PyPDF2, pdf2image, Tesseract setup) is
+# imported on first use; see ocr_module()
 
 
 # APP SETUP
 
 
-app = Flask(__name__)
-
-CORS(
-    app,
-    supports_credentials=True,
-    resources={r"/*": {"origins": "*"}}
-)
+api = Blueprint('api', __name__)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
@@ -47,14 +50,65 @@ ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 NODEJS_API_URL = os.environ.get(
     'NODEJS_API_URL',
     'http://localhost:5000/api/diet-plans'
 )
 
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'compiled')
+
+# The engineered feature formulas are unverified reconstructions (see
+# features.py); keep them at 0 until they pass the parity check
+ENGINEERED_FEATURES = os.environ.get('ENGINEERED_FEATURES', 'false').lower() == 'true'
+
+# When models load: 'eager' before the app is returned, 'background' on
+# a thread while the app already answers /api/health, 'lazy' on the
+# first prediction
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', 'background').lower()
+
+# Poll the model files this often and hot-swap a validated new set; 0 disables
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', 10))
+
+# Packed model artifact written by export_model_pack.py (default
+# models/model_pack.bin). MODEL_FORMAT: 'auto' maps the pack when it
+# matches the model files, 'pack' requires it, 'files' ignores it
+MODEL_PACK_PATH = os.environ.get('MODEL_PACK_PATH', '')
+MODEL_FORMAT    = os.environ.get('MODEL_FORMAT', 'auto').lower()
+
+# Token for /api/admin/* (X-Admin-Token header); unset disables those routes
+ML_ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN', '')
+
+# 'async' queues diet plans for a background writer; 'sync' saves inline
+PERSISTENCE_MODE        = os.environ.get('PERSISTENCE_MODE', 'async').lower()
+PERSIST_QUEUE_SIZE      = int(os.environ.get('PERSIST_QUEUE_SIZE', 1000))
+PERSIST_BATCH_SIZE      = int(os.environ.get('PERSIST_BATCH_SIZE', 20))
+PERSIST_MAX_RETRIES     = int(os.environ.get('PERSIST_MAX_RETRIES', 3))
+PERSIST_BACKOFF_SECONDS = float(os.environ.get('PERSIST_BACKOFF_SECONDS', 0.5))
+
+# Plans the backend could not take are kept here and replayed later
+OUTBOX_ENABLED          = os.environ.get('OUTBOX_ENABLED', 'true').lower() == 'true'
+OUTBOX_PATH             = os.environ.get('OUTBOX_PATH', os.path.join(BASE_DIR, 'outbox', 'diet_plans.db'))
+OUTBOX_REPLAY_SECONDS   = float(os.environ.get('OUTBOX_REPLAY_SECONDS', 30))
+
+# Pending plan outcomes, shared by every worker process
+PLAN_STATUS_PATH        = os.environ.get('PLAN_STATUS_PATH', OUTBOX_PATH)
+
+# Circuit breaker around the Node.js API: open after N consecutive
+# failures, probe again after the reset period
+BACKEND_CIRCUIT_FAILURES      = int(os.environ.get('BACKEND_CIRCUIT_FAILURES', 5))
+BACKEND_CIRCUIT_RESET_SECONDS = float(os.environ.get('BACKEND_CIRCUIT_RESET_SECONDS', 30))
+
+# Async report OCR (/api/reports/jobs)
+REPORT_JOB_WORKERS      = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+REPORT_JOB_QUEUE_SIZE   = int(os.environ.get('REPORT_JOB_QUEUE_SIZE', 20))
+REPORT_JOB_TTL_SECONDS  = float(os.environ.get('REPORT_JOB_TTL_SECONDS', 3600))
+REPORT_JOB_DB           = os.environ.get('REPORT_JOB_DB', os.path.join(UPLOAD_FOLDER, 'report_jobs.db'))
+
+# Memoised predictions per feature vector; size 0 disables the cache
+PREDICTION_CACHE_SIZE        = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get('PREDICTION_CACHE_TTL_SECONDS', 3600))
+
 PORT = int(os.environ.get('PORT', 5001))
 DEBUG = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
 
@@ -65,72 +119,224 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def ocr_module():
+    """The OCR processor module, imported the first time a report needs it."""
+    import ocr_processor
+    return ocr_processor
+
+
+def process_medical_report(file):
+    return ocr_module().process_medical_report(file)
+
+
+def model_files(models_dir=None):
+    """Every file a model set is loaded from; their contents define its version."""
+    models_dir = models_dir or MODELS_DIR
+    return [os.path.join(models_dir, f'{name}_model.ubj') for name in MACRO_TARGETS] + [
+        os.path.join(models_dir, 'metadata.json'),
+        os.path.join(models_dir, 'label_encoders.joblib'),
+    ]
+
+
+def model_pack_path():
+    return MODEL_PACK_PATH or os.path.join(MODELS_DIR, 'model_pack.bin')
+
+
+def load_model_set():
+    """
+    Load a new ModelSet, from the packed artifact when it is current
+    (see MODEL_FORMAT), otherwise from the individual model files.
+    """
+    pack_path = model_pack_path()
+    if MODEL_FORMAT != 'files' and os.path.exists(pack_path):
+        pack = ModelPack(pack_path)
+        if MODEL_FORMAT == 'pack' or model_pack_is_current(pack):
+            return load_model_pack(pack)
+        print(f"  [WARN] {pack_path} does not match the model files; "
+              f"re-run export_model_pack.py. Loading the files instead")
+    elif MODEL_FORMAT == 'pack':
+        raise FileNotFoundError(pack_path)
+    return load_model_files()
+
+
+def model_pack_is_current(pack):
+    """A pack is current unless the full set of model files is present and differs from it."""
+    paths = model_files()
+    if not all(os.path.exists(path) for path in paths):
+        return True
+    return files_version(paths) == pack.version
+
+
+def load_model_pack(pack):
+    """ModelSet over a mapped pack: no xgboost, joblib or sklearn import, no tree copies."""
+    predictor = MacroPredictor.from_forest(pack.forest, pack.targets)
+    encoders  = CompiledEncoders(pack.encoder_classes)
+    print(f"   Mapped {os.path.basename(pack.path)} ({len(pack.forest.roots)} trees, "
+          f"{len(pack.feature_columns)} features)")
+    return ModelSet(
+        pack.version, predictor, pack.metadata, None, encoders,
+        FeatureBuilder(pack.feature_columns, encoders, engineered=ENGINEERED_FEATURES)
+    )
+
+
+def load_model_files():
+    """Load the individual model files on disk into a new ModelSet; raises on any error."""
+    import joblib
+
+    version = files_version(model_files())
+
+    # Regression models — all four evaluated together by one predictor
+    predictor = MacroPredictor.from_dir(MODELS_DIR, MACRO_TARGETS, backend=INFERENCE_BACKEND)
+    for name in MACRO_TARGETS:
+        print(f"   Loaded {name}_model.ubj")
+    print(f"   Inference backend: {predictor.backend}")
+
+    # Meal plan: rule-based
+    print("   Meal plan: using rule-based clinical logic")
+
+    # Metadata
+    with open(os.path.join(MODELS_DIR, 'metadata.json'), 'r') as f:
+        metadata = json.load(f)
+    print("   Loaded metadata.json")
+
+    # Label encoders
+    label_encoders = joblib.load(os.path.join(MODELS_DIR, 'label_encoders.joblib'))
+    print("   Loaded label_encoders.joblib")
+
+    # Plain lookup tables replace LabelEncoder.transform on the hot path
+    encoders = CompiledEncoders.from_label_encoders(label_encoders)
+
+    # Column order resolved once; every request reuses it
+    feature_builder = FeatureBuilder(metadata['feature_columns'], encoders, engineered=ENGINEERED_FEATURES)
+
+    # Version log
+    saved_sklearn = metadata.get('sklearn_version', 'unknown')
+    saved_xgb = metadata.get('xgboost_version', 'unknown')
+    import sklearn
+    import xgboost as xgb
+    print(f"\n  Trained with sklearn={saved_sklearn} xgboost={saved_xgb}")
+    print(f"  Running with sklearn={sklearn.__version__} xgboost={xgb.__version__}")
+
+    return ModelSet(version, predictor, metadata, label_encoders, encoders, feature_builder)
+
+
+def validate_model_set(model_set):
+    """Smoke batch: the sample payloads must featurise and score to sane macros."""
+    matrix  = model_set.feature_builder.build(SMOKE_PAYLOADS)
+    outputs = model_set.predictor.predict(matrix)
+
+    if outputs.shape != (len(SMOKE_PAYLOADS), len(MACRO_TARGETS)):
+        raise ValueError(f'Smoke batch returned shape {outputs.shape}')
+    if not np.all(np.isfinite(outputs)):
+        raise ValueError('Smoke batch produced non-finite predictions')
+    calories = outputs[:, MACRO_TARGETS.index('calories')]
+    if np.any(calories <= 0):
+        raise ValueError(f'Smoke batch produced non-positive calories: {calories.tolist()}')
+
+
+def mark_models_ready(model_set, previous):
+    global MODEL_STATE, MODELS_LOADED
+    MODEL_STATE, MODELS_LOADED = 'ready', True
+
+
 def load_models():
-    global models, metadata, label_encoders
+    """First load through the model registry; later reloads swap sets in place."""
+    global MODEL_STATE, MODELS_LOADED
 
-    try:
-        # Regression models
-        for name in ['calories', 'protein', 'carbs', 'fats']:
-            path = os.path.join(MODELS_DIR, f'{name}_model.ubj')
-            m = xgb.XGBRegressor()
-            m.load_model(path)
-            models[name] = m
-            print(f"   Loaded {name}_model.ubj")
-
-        # Meal plan: rule-based
-        print("   Meal plan: using rule-based clinical logic")
-
-        # Metadata
-        with open(os.path.join(MODELS_DIR, 'metadata.json'), 'r') as f:
-            metadata = json.load(f)
-        print("   Loaded metadata.json")
-
-        # Label encoders
-        label_encoders = joblib.load(os.path.join(MODELS_DIR, 'label_encoders.joblib'))
-        print("   Loaded label_encoders.joblib")
-
-        # Version log
-        saved_sklearn = metadata.get('sklearn_version', 'unknown')
-        saved_xgb = metadata.get('xgboost_version', 'unknown')
-        import sklearn
-        print(f"\n  Trained with sklearn={saved_sklearn} xgboost={saved_xgb}")
-        print(f"  Running with sklearn={sklearn.__version__} xgboost={xgb.__version__}")
+    print("\n" + "=" * 50)
+    print(" Loading ML models...")
+    print("=" * 50)
+    MODEL_STATE = 'loading'
 
+    if model_registry.reload(reason='startup'):
+        print(" Models loaded successfully")
         return True
 
-    except FileNotFoundError as e:
-        print(f"\n Model file not found: {e}")
+    if (model_registry.last_error or '').startswith('FileNotFoundError'):
         print("  Expected in ml/models/:")
         print("  calories_model.ubj, protein_model.ubj, carbs_model.ubj, fats_model.ubj,")
         print("  label_encoders.joblib, metadata.json")
-        return False
-
-    except Exception as e:
-        print(f" Error loading models: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
+        print("  or model_pack.bin from export_model_pack.py")
+    MODEL_STATE, MODELS_LOADED = 'failed', False
+    return False
+
+
+def ensure_models_loaded():
+    """Load the models once; callers arriving mid-load wait for it to finish."""
+    if MODEL_STATE in ('ready', 'failed'):
+        return MODEL_STATE == 'ready'
+    with _model_lock:
+        if MODEL_STATE not in ('ready', 'failed'):
+            load_models()
+    return MODEL_STATE == 'ready'
+
+
+def start_model_loading(warm_up):
+    """Begin loading models per MODEL_WARMUP ('lazy' leaves it to the first prediction)."""
+    global MODEL_STATE
+
+    if warm_up == 'eager':
+        ensure_models_loaded()
+    elif warm_up == 'background':
+        MODEL_STATE = 'loading'
+        threading.Thread(target=ensure_models_loaded, name='model-warmup', daemon=True).start()
+    elif warm_up != 'lazy':
+        raise ValueError(f"MODEL_WARMUP must be 'eager', 'background' or 'lazy', got {warm_up!r}")
+
+
+def models_unavailable():
+    """A 503 response while the models are loading or failed to load, else None."""
+    if MODEL_STATE == 'not_loaded':
+        ensure_models_loaded()
+    if MODEL_STATE == 'ready':
+        return None
+    if MODEL_STATE == 'loading':
+        return jsonify({'success': False, 'error': 'Models are still loading'}), 503, {'Retry-After': '2'}
+    return jsonify({'success': False, 'error': 'Models failed to load'}), 503
 
 
 # GLOBALS
 
 
-models         = {}
-metadata       = {}
-label_encoders = {}
+# Loads, validates and hot-swaps model sets; requests hold one with acquire()
+model_registry = ModelRegistry(
+    load_model_set,
+    validate=validate_model_set,
+    watch_paths=model_files() + [model_pack_path()],
+    trigger_path=os.path.join(MODELS_DIR, '.reload'),
+    on_swap=mark_models_ready
+)
+
+# 'not_loaded' -> 'loading' -> 'ready' | 'failed'
+MODEL_STATE   = 'not_loaded'
+MODELS_LOADED = False
+_model_lock   = threading.Lock()
+
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+    watch_paths=model_files() + [model_pack_path()]
+)
 
-print("\n" + "=" * 50)
-print(" Loading ML models...")
-print("=" * 50)
+plan_writer = DietPlanWriter(
+    NODEJS_API_URL,
+    max_queue=PERSIST_QUEUE_SIZE,
+    batch_size=PERSIST_BATCH_SIZE,
+    max_retries=PERSIST_MAX_RETRIES,
+    backoff_seconds=PERSIST_BACKOFF_SECONDS,
+    replay_seconds=OUTBOX_REPLAY_SECONDS,
+    breaker=CircuitBreaker(BACKEND_CIRCUIT_FAILURES, BACKEND_CIRCUIT_RESET_SECONDS)
+)
+atexit.register(plan_writer.stop)
 
-MODELS_LOADED = load_models()
+report_jobs = ReportJobQueue(
+    process_medical_report,
+    workers=REPORT_JOB_WORKERS,
+    max_pending=REPORT_JOB_QUEUE_SIZE,
+    result_ttl=REPORT_JOB_TTL_SECONDS
+)
 
-if MODELS_LOADED:
-    print(" Models loaded successfully")
-else:
-    print(" Models failed to load")
 
-    
 
 # RULE-BASED MEAL PLAN  
 
@@ -166,80 +372,78 @@ def predict_meal_plan_rule(frontend_data: dict) -> str:
 
 
 
-def save_to_mongodb(user_data, predictions, data_source='manual', report_data=None):
+def build_diet_plan_payload(user_data, predictions, data_source='manual', report_data=None):
     """
-    Save diet plan to MongoDB through Node.js API
+    Diet plan document as stored by the Node.js API
     """
-    try:
-        diet_plan_data = {
-            'userInfo': {
-                'name':   user_data.get('name', 'User'),
-                'age':    int(user_data.get('age', 0)),
-                'gender': user_data.get('gender', 'Other'),
-                'height': float(user_data.get('height', 0)),
-                'weight': float(user_data.get('weight', 0)),
-                'bmi':    float(user_data.get('bmi', 0)),
-                'goal':   user_data.get('goal', 'Maintenance')
-            },
-            'healthInfo': {
-                'diseases':      user_data.get('diseases', []),
-                'allergies':     user_data.get('allergies', ''),
-                'activityLevel': user_data.get('activityLevel', 'moderate'),
-                'dietPreference':user_data.get('dietPreference', 'Regular'),
-                'mealsPerDay':   int(user_data.get('mealsPerDay', 3))
-            },
-            'recommendations': {
-                'dailyCalories': int(predictions['recommended_calories']),
-                'proteinGrams':  int(predictions['recommended_protein']),
-                'carbsGrams':    int(predictions['recommended_carbs']),
-                'fatsGrams':     int(predictions['recommended_fats']),
-                'mealPlanType':  predictions['recommended_meal_plan']
-            },
-            'macroPercentages': predictions.get('macro_percentages', {}),
-            'mealBreakdown':    predictions.get('meal_breakdown', []),
-            'healthInsights':   predictions.get('health_insights', []),
-            'dataSource':       data_source
-        }
+    diet_plan_data = {
+        'userInfo': {
+            'name':   user_data.get('name', 'User'),
+            'age':    int(user_data.get('age', 0)),
+            'gender': user_data.get('gender', 'Other'),
+            'height': float(user_data.get('height', 0)),
+            'weight': float(user_data.get('weight', 0)),
+            'bmi':    float(user_data.get('bmi', 0)),
+            'goal':   user_data.get('goal', 'Maintenance')
+        },
+        'healthInfo': {
+            'diseases':      user_data.get('diseases', []),
+            'allergies':     user_data.get('allergies', ''),
+            'activityLevel': user_data.get('activityLevel', 'moderate'),
+            'dietPreference':user_data.get('dietPreference', 'Regular'),
+            'mealsPerDay':   int(user_data.get('mealsPerDay', 3))
+        },
+        'recommendations': {
+            'dailyCalories': int(predictions['recommended_calories']),
+            'proteinGrams':  int(predictions['recommended_protein']),
+            'carbsGrams':    int(predictions['recommended_carbs']),
+            'fatsGrams':     int(predictions['recommended_fats']),
+            'mealPlanType':  predictions['recommended_meal_plan']
+        },
+        'macroPercentages': predictions.get('macro_percentages', {}),
+        'mealBreakdown':    predictions.get('meal_breakdown', []),
+        'healthInsights':   predictions.get('health_insights', []),
+        'dataSource':       data_source
+    }
 
-        if report_data:
-            diet_plan_data['reportData'] = {
-                'fileName':    report_data.get('fileName', ''),
-                'uploadDate':  datetime.now().isoformat(),
-                'extractedData': {
-                    'patientDetails': report_data.get('patient_details', {}),
-                    'diseases':       report_data.get('diseases', []),
-                    'allergies':      report_data.get('allergies', ''),
-                    'numericalInfo':  report_data.get('numerical_info', {})
-                }
+    if report_data:
+        diet_plan_data['reportData'] = {
+            'fileName':    report_data.get('fileName', ''),
+            'uploadDate':  datetime.now().isoformat(),
+            'extractedData': {
+                'patientDetails': report_data.get('patient_details', {}),
+                'diseases':       report_data.get('diseases', []),
+                'allergies':      report_data.get('allergies', ''),
+                'numericalInfo':  report_data.get('numerical_info', {})
             }
+        }
+
+    return diet_plan_data
+
+
+def save_to_mongodb(user_data, predictions, data_source='manual', report_data=None):
+    """
+    Save diet plan to MongoDB through Node.js API (blocking)
+    """
+    try:
+        diet_plan_data = with_idempotency_key(
+            build_diet_plan_payload(user_data, predictions, data_source, report_data)
+        )
 
         print(f"\n{'='*60}")
         print("Saving diet plan to MongoDB...")
         print(f"{'='*60}")
 
-        response = requests.post(
-            NODEJS_API_URL,
-            json=diet_plan_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
-        )
-
-        if response.status_code in [200, 201]:
-            result = response.json()
-            if result.get('success'):
-                diet_plan_id = result.get('data', {}).get('_id')
-                print(f"[OK] Diet plan saved to MongoDB!  ID: {diet_plan_id}")
-                return diet_plan_id
-            else:
-                print(f"[ERROR] MongoDB save failed: {result.get('message')}")
-                return None
-        else:
-            print(f"[ERROR] MongoDB API error: {response.status_code}  {response.text}")
-            return None
+        diet_plan_id = plan_writer.send(diet_plan_data)
+        print(f"[OK] Diet plan saved to MongoDB!  ID: {diet_plan_id}")
+        return diet_plan_id
 
-    except requests.exceptions.ConnectionError:
-        print("[ERROR] Could not connect to Node.js backend — MongoDB storage skipped.")
-        print("  Make sure Node.js server is running on port 5000.")
+    except PersistenceError as e:
+        print(f"[ERROR] {e}")
+        if e.retryable and plan_writer.outbox is not None:
+            plan_writer.outbox.add(diet_plan_data, str(e))
+            plan_writer.start()
+            print("  Plan kept in outbox for replay.")
         return None
     except Exception as e:
         print(f"[ERROR] Error saving to MongoDB: {str(e)}")
@@ -248,106 +452,241 @@ def save_to_mongodb(user_data, predictions, data_source='manual', report_data=No
         return None
 
 
+def persist_diet_plan(user_data, predictions, data_source='manual', report_data=None):
+    """
+    Hand the plan to the background writer (or save inline when
+    PERSISTENCE_MODE=sync). Returns the fields merged into the response.
+    """
+    if PERSISTENCE_MODE == 'sync':
+        diet_plan_id = save_to_mongodb(user_data, predictions, data_source, report_data)
+        fields = {'diet_plan_id': diet_plan_id, 'saved_to_database': diet_plan_id is not None}
+        if not diet_plan_id:
+            fields['note'] = 'Diet plan generated but not saved to database'
+        return fields
+
+    payload    = build_diet_plan_payload(user_data, predictions, data_source, report_data)
+    pending_id = plan_writer.submit(payload)
+    if pending_id is None:
+        print("[WARN] Persistence queue full — diet plan not saved")
+        return {
+            'diet_plan_id':      None,
+            'saved_to_database': False,
+            'note':              'Diet plan generated but not saved to database (persistence queue full)'
+        }
+
+    return {
+        'diet_plan_id':      None,
+        'pending_plan_id':   pending_id,
+        'saved_to_database': False,
+        'save_status':       plan_writer.status(pending_id)['status']
+    }
+
+
 
 # FEATURE MAPPING
 
 
 def map_frontend_to_model(frontend_data):
     """
-    Map frontend form data to model features.
+    Map frontend form data to model features, including the engineered
+    columns listed in metadata.json.
     """
-    model_input = {}
+    with model_registry.acquire() as model_set:
+        columns = model_set.feature_builder.compute_columns([parse_record(frontend_data)])
+    return {col: values[0].item() for col, values in columns.items()}
 
-    model_input['Age']        = int(frontend_data.get('age', 30))
-    model_input['Height_cm']  = float(frontend_data.get('height', 170))
-    model_input['Weight_kg']  = float(frontend_data.get('weight', 70))
-    model_input['BMI']        = float(frontend_data.get('bmi', 24.0))
 
-    gender = frontend_data.get('gender', 'Other')
-    try:
-        model_input['Gender'] = label_encoders['Gender'].transform([gender])[0]
-    except ValueError:
-        model_input['Gender'] = label_encoders['Gender'].transform(['Other'])[0]
+def create_feature_vector(model_input, feature_columns):
+    features = [model_input.get(col, 0) for col in feature_columns]
+    return np.array(features).reshape(1, -1)
 
-    diseases = frontend_data.get('diseases', [])
-    chronic_disease = diseases[0] if diseases and diseases[0] != 'None' else 'None'
-    try:
-        model_input['Chronic_Disease'] = label_encoders['Chronic_Disease'].transform([chronic_disease])[0]
-    except ValueError:
-        model_input['Chronic_Disease'] = label_encoders['Chronic_Disease'].transform(['None'])[0]
 
-    allergies = frontend_data.get('allergies', '').strip() or 'None'
-    try:
-        model_input['Allergies'] = label_encoders['Allergies'].transform([allergies])[0]
-    except:
-        model_input['Allergies'] = label_encoders['Allergies'].transform(['None'])[0]
 
-    diet_pref = frontend_data.get('dietPreference', 'Regular')
-    try:
-        model_input['Dietary_Habits'] = label_encoders['Dietary_Habits'].transform([diet_pref])[0]
-    except ValueError:
-        model_input['Dietary_Habits'] = label_encoders['Dietary_Habits'].transform(['Regular'])[0]
+# PREDICTION
 
-    activity_mapping = {
-        'sedentary': 0, 'light': 2, 'moderate': 4, 'very': 6, 'extra': 6
-    }
-    activity = frontend_data.get('activityLevel', 'moderate')
-    model_input['Exercise_Frequency'] = activity_mapping.get(activity, 3)
 
-    model_input['Blood_Pressure_Systolic']  = 120
-    model_input['Blood_Pressure_Diastolic'] = 80
-    if chronic_disease == 'Hypertension':
-        model_input['Blood_Pressure_Systolic']  = 140
-        model_input['Blood_Pressure_Diastolic'] = 90
+REQUIRED_FIELDS = ['age', 'gender', 'height', 'weight', 'bmi', 'activityLevel']
 
-    model_input['Cholesterol_Level'] = 200
-    if chronic_disease in ['High Cholesterol', 'Heart Disease']:
-        model_input['Cholesterol_Level'] = 250
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
 
-    model_input['Blood_Sugar_Level'] = 95
-    if chronic_disease == 'Diabetes':
-        model_input['Blood_Sugar_Level'] = 180
+# Scored by every newly loaded model set before it may serve traffic
+SMOKE_PAYLOADS = [
+    {'age': 25, 'gender': 'Male',   'height': 178, 'weight': 72, 'bmi': 22.7, 'activityLevel': 'moderate',  'diseases': ['None']},
+    {'age': 58, 'gender': 'Female', 'height': 160, 'weight': 84, 'bmi': 32.8, 'activityLevel': 'sedentary', 'diseases': ['Diabetes']},
+    {'age': 41, 'gender': 'Female', 'height': 167, 'weight': 50, 'bmi': 17.9, 'activityLevel': 'very',      'diseases': ['Hypertension']},
+]
 
-    genetic_risk = 'Yes' if chronic_disease in ['Heart Disease', 'Diabetes', 'Hypertension'] else 'No'
-    model_input['Genetic_Risk_Factor'] = label_encoders['Genetic_Risk_Factor'].transform([genetic_risk])[0]
 
-    steps_mapping = {
-        'sedentary': 3000, 'light': 6000, 'moderate': 9000, 'very': 12000, 'extra': 15000
-    }
-    model_input['Daily_Steps']  = steps_mapping.get(activity, 7000)
-    model_input['Sleep_Hours']  = 7.0
-    model_input['Alcohol_Consumption'] = label_encoders['Alcohol_Consumption'].transform(['No'])[0]
-    model_input['Smoking_Habit']       = label_encoders['Smoking_Habit'].transform(['No'])[0]
-
-    bmr = (10 * model_input['Weight_kg'] +
-           6.25 * model_input['Height_cm'] -
-           5   * model_input['Age'])
-    bmr += 5 if gender == 'Male' else -161
-
-    activity_multiplier = {
-        'sedentary': 1.2, 'light': 1.375, 'moderate': 1.55, 'very': 1.725, 'extra': 1.9
-    }
-    tdee = bmr * activity_multiplier.get(activity, 1.55)
+def merge_ocr_result(data, ocr_result):
+    """Fold diseases and allergies found in a report into the form data."""
+    if not ocr_result.get('success'):
+        print(f"\n[WARN] OCR processing failed: {ocr_result.get('error', 'Unknown error')}")
+        return data
 
-    model_input['Caloric_Intake']        = int(tdee)
-    model_input['Protein_Intake']        = int(tdee * 0.25 / 4)
-    model_input['Carbohydrate_Intake']   = int(tdee * 0.45 / 4)
-    model_input['Fat_Intake']            = int(tdee * 0.30 / 9)
+    print(f"\n[OK] OCR extraction successful!")
+    print(f"  Extracted diseases:  {ocr_result.get('diseases', [])}")
+    print(f"  Extracted allergies: {ocr_result.get('allergies', '')}")
 
-    try:
-        model_input['Preferred_Cuisine'] = label_encoders['Preferred_Cuisine'].transform(['Western'])[0]
-    except ValueError:
-        first_cuisine = label_encoders['Preferred_Cuisine'].classes_[0]
-        model_input['Preferred_Cuisine'] = label_encoders['Preferred_Cuisine'].transform([first_cuisine])[0]
+    # Merge OCR diseases with form diseases
+    ocr_diseases = ocr_result.get('diseases', [])
+    if ocr_diseases and ocr_diseases != ['None']:
+        combined = list(set(data.get('diseases', []) + ocr_diseases))
+        if len(combined) > 1 and 'None' in combined:
+            combined.remove('None')
+        data['diseases'] = combined
 
-    model_input['Food_Aversions'] = label_encoders['Food_Aversions'].transform(['None'])[0]
+    # Append OCR allergies
+    ocr_allergies = ocr_result.get('allergies', '')
+    if ocr_allergies:
+        existing = data.get('allergies', '')
+        data['allergies'] = f"{existing}, {ocr_allergies}" if existing else ocr_allergies
 
-    return model_input
+    print(f"\n[OK] Final merged data:")
+    print(f"  Diseases:  {data.get('diseases', [])}")
+    print(f"  Allergies: {data.get('allergies', '')}")
+    return data
 
 
-def create_feature_vector(model_input, feature_columns):
-    features = [model_input.get(col, 0) for col in feature_columns]
-    return np.array(features).reshape(1, -1)
+def missing_required_fields(data):
+    return [f for f in REQUIRED_FIELDS if f not in data]
+
+
+def predict_macros(feature_matrix, model_set=None):
+    """
+    One predictions dict per row, from `model_set` (default: the active
+    set). Rows whose feature vector is in the prediction cache skip the
+    model; the rest (deduplicated) are scored together in one pass over
+    all four targets.
+    """
+    if model_set is None:
+        with model_registry.acquire() as model_set:
+            return predict_macros(feature_matrix, model_set)
+
+    if prediction_cache.enabled:
+        keys = [PredictionCache.make_key(row, model_set.version) for row in feature_matrix]
+    else:
+        keys = list(range(feature_matrix.shape[0]))
+    results = [prediction_cache.get(key) for key in keys]
+
+    # Rows sharing an uncached vector are scored once
+    pending = OrderedDict()
+    for i, cached in enumerate(results):
+        if cached is None:
+            pending.setdefault(keys[i], []).append(i)
+
+    if pending:
+        rows    = [indices[0] for indices in pending.values()]
+        outputs = model_set.predictor.predict_dict(feature_matrix[rows])
+        for j, (key, indices) in enumerate(pending.items()):
+            predictions = {
+                'recommended_calories': int(outputs['calories'][j]),
+                'recommended_protein':  int(outputs['protein'][j]),
+                'recommended_carbs':    int(outputs['carbs'][j]),
+                'recommended_fats':     int(outputs['fats'][j]),
+            }
+            prediction_cache.put(key, predictions)
+            for i in indices:
+                results[i] = dict(predictions)
+    return results
+
+
+def build_recommendation(data, predictions):
+    """
+    Turn raw macro predictions into the API response body.
+    Adds the rule-based meal plan to `predictions` in place.
+    """
+    #  Meal plan — deterministic clinical rule
+    predictions['recommended_meal_plan'] = predict_meal_plan_rule(data)
+
+    # Alternative plans with rule-based confidence labels
+    plan_order = {
+        'Low-Carb Diet':      ['Low-Carb Diet',      'Balanced Diet',      'High-Protein Diet', 'Low-Fat Diet'],
+        'Low-Fat Diet':       ['Low-Fat Diet',        'Balanced Diet',      'Low-Carb Diet',     'High-Protein Diet'],
+        'High-Protein Diet':  ['High-Protein Diet',   'Balanced Diet',      'Low-Carb Diet',     'Low-Fat Diet'],
+        'Balanced Diet':      ['Balanced Diet',       'High-Protein Diet',  'Low-Carb Diet',     'Low-Fat Diet'],
+    }
+    recommended = predictions['recommended_meal_plan']
+    order  = plan_order.get(recommended, MEAL_PLAN_CLASSES)
+    confs  = [0.85, 0.08, 0.04, 0.03]
+    alternative_plans = [
+        {'name': p, 'confidence': c}
+        for p, c in zip(order[:3], confs[:3])
+    ]
+
+    # Macro percentages
+    total_cal   = predictions['recommended_calories']
+    protein_cal = predictions['recommended_protein'] * 4
+    carbs_cal   = predictions['recommended_carbs']   * 4
+    fats_cal    = predictions['recommended_fats']    * 9
+    macro_percentages = {
+        'protein': round((protein_cal / total_cal) * 100, 1) if total_cal else 0,
+        'carbs':   round((carbs_cal   / total_cal) * 100, 1) if total_cal else 0,
+        'fats':    round((fats_cal    / total_cal) * 100, 1) if total_cal else 0,
+    }
+
+    # Meal breakdown
+    meals_per_day    = int(data.get('mealsPerDay', 3))
+    cals_per_meal    = total_cal // meals_per_day
+    meal_names       = ['Breakfast', 'Morning Snack', 'Lunch', 'Afternoon Snack', 'Dinner', 'Evening Snack']
+    meal_breakdown   = [
+        {
+            'name':    meal_names[i] if i < len(meal_names) else f'Meal {i+1}',
+            'calories': cals_per_meal,
+            'protein':  predictions['recommended_protein'] // meals_per_day,
+            'carbs':    predictions['recommended_carbs']   // meals_per_day,
+            'fats':     predictions['recommended_fats']    // meals_per_day,
+        }
+        for i in range(meals_per_day)
+    ]
+
+    health_insights = generate_health_insights(data, predictions)
+
+    return {
+        'success':   True,
+        'timestamp': datetime.now().isoformat(),
+        'user_info': {
+            'name':   data.get('name', 'User'),
+            'age':    data.get('age'),
+            'gender': data.get('gender'),
+            'bmi':    float(data.get('bmi')),
+            'goal':   data.get('goal', 'Maintenance')
+        },
+        'recommendations': {
+            'daily_calories':  predictions['recommended_calories'],
+            'protein_grams':   predictions['recommended_protein'],
+            'carbs_grams':     predictions['recommended_carbs'],
+            'fats_grams':      predictions['recommended_fats'],
+            'meal_plan_type':  predictions['recommended_meal_plan']
+        },
+        'macro_percentages': macro_percentages,
+        'meal_breakdown':    meal_breakdown,
+        'alternative_plans': alternative_plans,
+        'health_insights':   health_insights
+    }
+
+
+def parse_batch_payload():
+    """
+    Read the batch body: a JSON array, {"users": [...]} or NDJSON.
+    NDJSON lines that fail to parse are kept as the exception so the
+    row can be reported individually.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(e)
+        return rows
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('users')
+    return payload
 
 
 
@@ -400,21 +739,84 @@ def generate_health_insights(user_data, predictions):
 # ROUTES
 
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
+    """Liveness: answers as soon as the process is up; 'ready' says whether it can predict."""
     return jsonify({
-        'status':        'healthy',
-        'timestamp':     datetime.now().isoformat(),
-        'models_loaded': len(models) > 0
+        'status':           'healthy',
+        'ready':            MODEL_STATE == 'ready',
+        'model_state':      MODEL_STATE,
+        'timestamp':        datetime.now().isoformat(),
+        'models_loaded':    model_registry.active is not None,
+        'model_version':    model_registry.version,
+        'model_registry':   model_registry.stats(),
+        'ocr_loaded':       'ocr_processor' in sys.modules,
+        'persistence':      {'mode': PERSISTENCE_MODE, **plan_writer.stats()},
+        'backend_circuit':  plan_writer.breaker.snapshot(),
+        'report_jobs':      report_jobs.stats(),
+        'prediction_cache': prediction_cache.stats()
     })
 
 
-@app.route('/api/meal-plans', methods=['GET'])
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the models are loaded, 503 until then."""
+    ready = MODEL_STATE == 'ready'
+    return jsonify({'ready': ready, 'model_state': MODEL_STATE}), 200 if ready else 503
+
+
+def admin_denied():
+    """An error response unless the request carries the admin token, else None."""
+    if not ML_ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Admin endpoints are disabled; set ML_ADMIN_TOKEN'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ML_ADMIN_TOKEN):
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 401
+    return None
+
+
+@api.route('/api/admin/models', methods=['GET'])
+def model_status():
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify({'success': True, **model_registry.stats()})
+
+
+@api.route('/api/admin/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Load, validate and switch to the model files now on disk. This worker
+    reloads before answering; other workers follow through the watched
+    trigger file within MODEL_WATCH_SECONDS.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    if model_registry.stats()['reloading']:
+        return jsonify({'success': False, 'error': 'A reload is already running'}), 409
+
+    switched = model_registry.request_reload()
+    status   = model_registry.stats()
+    if not switched:
+        return jsonify({'success': False, 'error': status['last_error'] or 'Reload did not run', **status}), 422
+    return jsonify({'success': True, **status})
+
+
+@api.route('/api/diet-plans/pending/<pending_id>', methods=['GET'])
+def pending_plan_status(pending_id):
+    status = plan_writer.status(pending_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown pending plan id'}), 404
+    return jsonify({'success': True, 'pending_plan_id': pending_id, **status})
+
+
+@api.route('/api/meal-plans', methods=['GET'])
 def get_meal_plans():
     try:
-        meal_plan_encoder = label_encoders.get('Recommended_Meal_Plan')
-        if meal_plan_encoder:
-            meal_plans = meal_plan_encoder.classes_.tolist()
+        model_set = model_registry.active
+        encoders  = model_set.encoders if model_set is not None else None
+        if encoders is not None and 'Recommended_Meal_Plan' in encoders:
+            meal_plans = encoders.classes('Recommended_Meal_Plan')
         else:
             meal_plans = ['Balanced Diet', 'High-Protein Diet', 'Low-Carb Diet', 'Low-Fat Diet']
         return jsonify({'success': True, 'meal_plans': meal_plans})
@@ -422,7 +824,7 @@ def get_meal_plans():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/process-report', methods=['POST'])
+@api.route('/api/process-report', methods=['POST'])
 def process_report():
 
     try:
@@ -459,12 +861,72 @@ def process_report():
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
 
-@app.route('/api/predict', methods=['POST'])
+@api.route('/api/reports/jobs', methods=['POST'])
+def submit_report_job():
+    """
+    Queue a medical report for OCR and return at once with a job id.
+    Poll GET /api/reports/jobs/<job_id> for the result, or pass the id
+    to /api/predict as report_job_id.
+    """
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'error': 'No file selected'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({
+            'success': False,
+            'error':   f'File type not allowed. Supported: {", ".join(ALLOWED_EXTENSIONS)}'
+        }), 400
+
+    try:
+        job_id = report_jobs.submit(file)
+    except JobQueueFull as e:
+        print(f"[WARN] Report job rejected: {e}")
+        response = jsonify({'success': False, 'error': 'OCR queue is full, please retry shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    return jsonify({
+        'success':    True,
+        'job_id':     job_id,
+        'status':     'queued',
+        'status_url': f'/api/reports/jobs/{job_id}'
+    }), 202
+
+
+@api.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown report job id'}), 404
+
+    return jsonify({
+        'success':     True,
+        'job_id':      job_id,
+        'status':      job['status'],
+        'filename':    job['filename'],
+        'created_at':  job['created_at'],
+        'started_at':  job['started_at'],
+        'finished_at': job['finished_at'],
+        'result':      job['result'],
+        'error':       job['error']
+    })
+
+
+@api.route('/api/predict', methods=['POST'])
 def predict():
 
     ocr_result  = None
     data_source = 'manual'
     file        = None
+    job         = None
+
+    unavailable = models_unavailable()
+    if unavailable:
+        return unavailable
 
     try:
         #  Determine input mode 
@@ -482,144 +944,55 @@ def predict():
                 print(f"{'='*60}")
 
                 ocr_result = process_medical_report(file)
-
-                if ocr_result.get('success'):
-                    print(f"\n[OK] OCR extraction successful!")
-                    print(f"  Extracted diseases:  {ocr_result.get('diseases', [])}")
-                    print(f"  Extracted allergies: {ocr_result.get('allergies', '')}")
-
-                    # Merge OCR diseases with form diseases
-                    ocr_diseases = ocr_result.get('diseases', [])
-                    if ocr_diseases and ocr_diseases != ['None']:
-                        combined = list(set(data.get('diseases', []) + ocr_diseases))
-                        if len(combined) > 1 and 'None' in combined:
-                            combined.remove('None')
-                        data['diseases'] = combined
-
-                    # Append OCR allergies
-                    ocr_allergies = ocr_result.get('allergies', '')
-                    if ocr_allergies:
-                        existing = data.get('allergies', '')
-                        data['allergies'] = f"{existing}, {ocr_allergies}" if existing else ocr_allergies
-
-                    print(f"\n[OK] Final merged data:")
-                    print(f"  Diseases:  {data.get('diseases', [])}")
-                    print(f"  Allergies: {data.get('allergies', '')}")
-                else:
-                    print(f"\n[WARN] OCR processing failed: {ocr_result.get('error', 'Unknown error')}")
+                merge_ocr_result(data, ocr_result)
         else:
             data = request.get_json()
 
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
 
+        # Report already OCR'd through /api/reports/jobs
+        if data.get('report_job_id') and ocr_result is None:
+            job = report_jobs.get(data['report_job_id'])
+            if job is None:
+                return jsonify({'success': False, 'error': 'Unknown report job id'}), 404
+            if job['status'] in ('queued', 'running'):
+                return jsonify({'success': False, 'error': f"Report job is still {job['status']}"}), 409
+
+            ocr_result  = job['result'] or {'success': False, 'error': job['error']}
+            data_source = 'report'
+            merge_ocr_result(data, ocr_result)
+
         #  Validate required fields 
-        required_fields = ['age', 'gender', 'height', 'weight', 'bmi', 'activityLevel']
-        missing = [f for f in required_fields if f not in data]
+        missing = missing_required_fields(data)
         if missing:
             return jsonify({
                 'success': False,
                 'error':   f'Missing required fields: {", ".join(missing)}'
             }), 400
 
-        # Build feature vector
-        model_input    = map_frontend_to_model(data)
-        feature_vector = create_feature_vector(model_input, metadata['feature_columns'])
-
-        # Predictions 
-        predictions = {
-            'recommended_calories': int(models['calories'].predict(feature_vector)[0]),
-            'recommended_protein':  int(models['protein'].predict(feature_vector)[0]),
-            'recommended_carbs':    int(models['carbs'].predict(feature_vector)[0]),
-            'recommended_fats':     int(models['fats'].predict(feature_vector)[0]),
-        }
-
-        #  Meal plan — deterministic clinical rule
-        predictions['recommended_meal_plan'] = predict_meal_plan_rule(data)
-
-        # Alternative plans with rule-based confidence labels
-        plan_order = {
-            'Low-Carb Diet':      ['Low-Carb Diet',      'Balanced Diet',      'High-Protein Diet', 'Low-Fat Diet'],
-            'Low-Fat Diet':       ['Low-Fat Diet',        'Balanced Diet',      'Low-Carb Diet',     'High-Protein Diet'],
-            'High-Protein Diet':  ['High-Protein Diet',   'Balanced Diet',      'Low-Carb Diet',     'Low-Fat Diet'],
-            'Balanced Diet':      ['Balanced Diet',       'High-Protein Diet',  'Low-Carb Diet',     'Low-Fat Diet'],
-        }
-        recommended = predictions['recommended_meal_plan']
-        order  = plan_order.get(recommended, MEAL_PLAN_CLASSES)
-        confs  = [0.85, 0.08, 0.04, 0.03]
-        alternative_plans = [
-            {'name': p, 'confidence': c}
-            for p, c in zip(order[:3], confs[:3])
-        ]
-
-        # Macro percentages
-        total_cal   = predictions['recommended_calories']
-        protein_cal = predictions['recommended_protein'] * 4
-        carbs_cal   = predictions['recommended_carbs']   * 4
-        fats_cal    = predictions['recommended_fats']    * 9
-        macro_percentages = {
-            'protein': round((protein_cal / total_cal) * 100, 1) if total_cal else 0,
-            'carbs':   round((carbs_cal   / total_cal) * 100, 1) if total_cal else 0,
-            'fats':    round((fats_cal    / total_cal) * 100, 1) if total_cal else 0,
-        }
-
-        # Meal breakdown
-        meals_per_day    = int(data.get('mealsPerDay', 3))
-        cals_per_meal    = total_cal // meals_per_day
-        meal_names       = ['Breakfast', 'Morning Snack', 'Lunch', 'Afternoon Snack', 'Dinner', 'Evening Snack']
-        meal_breakdown   = [
-            {
-                'name':    meal_names[i] if i < len(meal_names) else f'Meal {i+1}',
-                'calories': cals_per_meal,
-                'protein':  predictions['recommended_protein'] // meals_per_day,
-                'carbs':    predictions['recommended_carbs']   // meals_per_day,
-                'fats':     predictions['recommended_fats']    // meals_per_day,
-            }
-            for i in range(meals_per_day)
-        ]
-
-        health_insights = generate_health_insights(data, predictions)
+        # Features and predictions from one model set, even mid-reload
+        with model_registry.acquire() as model_set:
+            feature_vector = model_set.feature_builder.build([data])
+            predictions    = predict_macros(feature_vector, model_set)[0]
+            model_version  = model_set.version
 
         # Build response 
-        response = {
-            'success':   True,
-            'timestamp': datetime.now().isoformat(),
-            'user_info': {
-                'name':   data.get('name', 'User'),
-                'age':    data.get('age'),
-                'gender': data.get('gender'),
-                'bmi':    float(data.get('bmi')),
-                'goal':   data.get('goal', 'Maintenance')
-            },
-            'recommendations': {
-                'daily_calories':  predictions['recommended_calories'],
-                'protein_grams':   predictions['recommended_protein'],
-                'carbs_grams':     predictions['recommended_carbs'],
-                'fats_grams':      predictions['recommended_fats'],
-                'meal_plan_type':  predictions['recommended_meal_plan']
-            },
-            'macro_percentages': macro_percentages,
-            'meal_breakdown':    meal_breakdown,
-            'alternative_plans': alternative_plans,
-            'health_insights':   health_insights
-        }
+        response = build_recommendation(data, predictions)
+        response['model_version'] = model_version
 
         # Save to MongoDB 
         report_data_for_mongo = None
         if data_source == 'report' and ocr_result and ocr_result.get('success'):
             report_data_for_mongo = {
-                'fileName':       file.filename if file else '',
+                'fileName':       file.filename if file else (job['filename'] if job else ''),
                 'patient_details': ocr_result.get('patient_details', {}),
                 'diseases':        ocr_result.get('diseases', []),
                 'allergies':       ocr_result.get('allergies', ''),
                 'numerical_info':  ocr_result.get('numerical_info', {})
             }
 
-        diet_plan_id = save_to_mongodb(data, predictions, data_source, report_data_for_mongo)
-        response['diet_plan_id']       = diet_plan_id
-        response['saved_to_database']  = diet_plan_id is not None
-        if not diet_plan_id:
-            response['note'] = 'Diet plan generated but not saved to database'
+        response.update(persist_diet_plan(data, predictions, data_source, report_data_for_mongo))
 
         return jsonify(response)
 
@@ -634,26 +1007,163 @@ def predict():
 
 
 
-# STARTUP
+@api.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Score many users in one request. Rows are validated and parsed one
+    by one, then every valid row is featurised and scored as a single
+    matrix. Errors are reported per row.
+    """
+    unavailable = models_unavailable()
+    if unavailable:
+        return unavailable
+
+    try:
+        rows = parse_batch_payload()
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'success': False, 'error': 'Expected a non-empty array of user payloads'}), 400
+
+        if len(rows) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error':   f'Batch too large: {len(rows)} rows (max {MAX_BATCH_SIZE})'
+            }), 413
+
+        results    = [None] * len(rows)
+        valid_rows = []
+        parsed     = []
+
+        for i, data in enumerate(rows):
+            try:
+                if isinstance(data, Exception):
+                    raise ValueError(f'Invalid JSON: {data}')
+                if not isinstance(data, dict):
+                    raise ValueError('Row must be a JSON object')
+
+                missing = missing_required_fields(data)
+                if missing:
+                    raise ValueError(f'Missing required fields: {", ".join(missing)}')
+
+                parsed.append(parse_record(data))
+                valid_rows.append(i)
+            except Exception as e:
+                results[i] = {'index': i, 'success': False, 'error': str(e)}
+
+        batch_predictions = []
+        with model_registry.acquire() as model_set:
+            model_version = model_set.version
+            if parsed:
+                feature_matrix    = model_set.feature_builder.build_parsed(parsed)
+                batch_predictions = predict_macros(feature_matrix, model_set)
+
+        for i, predictions in zip(valid_rows, batch_predictions):
+            try:
+                results[i] = {'index': i, **build_recommendation(rows[i], predictions)}
+            except Exception as e:
+                results[i] = {'index': i, 'success': False, 'error': str(e)}
+
+        succeeded = sum(1 for r in results if r['success'])
+        print(f"[OK] Batch prediction: {succeeded}/{len(rows)} rows scored")
+
+        return jsonify({
+            'success':       True,
+            'timestamp':     datetime.now().isoformat(),
+            'model_version': model_version,
+            'total':         len(rows),
+            'succeeded':     succeeded,
+            'failed':        len(rows) - succeeded,
+            'results':       results
+        })
+
+    except Exception as e:
+        print(f"Error in batch prediction: {str(e)}")
+        import traceback; traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
+
 
 
 # STARTUP
 
+
+def open_stores():
+    """
+    Open this process's SQLite stores (plan outbox, plan status, report
+    jobs) and replay anything left in the outbox. Nothing is opened at import, so
+    no handle or writer thread is created in a process that later forks.
+    """
+    if plan_writer.status_store is None:
+        plan_writer.status_store = PlanStatusStore(PLAN_STATUS_PATH)
+    if OUTBOX_ENABLED and plan_writer.outbox is None:
+        plan_writer.outbox = PlanOutbox(OUTBOX_PATH)
+    if report_jobs.store is None:
+        report_jobs.store = JobStore(REPORT_JOB_DB)
+
+    if plan_writer.outbox is not None and len(plan_writer.outbox):
+        print(f"[WARN] {len(plan_writer.outbox)} diet plan(s) waiting in outbox — replaying in background")
+        plan_writer.start()
+
+
+def create_app(warm_up=None, watch=True, stores=True):
+    """
+    Build the Flask app. Models load per `warm_up` (default MODEL_WARMUP):
+    with 'background' the app serves /api/health at once and predictions
+    answer 503 until the models are ready. `watch` starts the model file
+    watcher that hot-swaps retrained models. `stores` opens the SQLite
+    stores now; the gunicorn master leaves them to each worker.
+    """
+    flask_app = Flask(__name__)
+    flask_app.config['UPLOAD_FOLDER']      = UPLOAD_FOLDER
+    flask_app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
+    CORS(
+        flask_app,
+        supports_credentials=True,
+        resources={r"/*": {"origins": "*"}}
+    )
+    flask_app.register_blueprint(api)
+
+    start_model_loading((warm_up or MODEL_WARMUP).lower())
+    if stores:
+        open_stores()
+    if watch:
+        model_registry.watch(MODEL_WATCH_SECONDS)
+    return flask_app
+
+
+def reset_after_fork():
+    """
+    Run in each gunicorn worker after fork (see gunicorn.conf.py). Models
+    and encoders stay shared copy-on-write with the master; threads,
+    sockets, SQLite handles and process pools are rebuilt per worker.
+    Models the master did not load are loaded here, per MODEL_WARMUP,
+    and each worker watches the model files itself.
+    """
+    plan_writer.reset_after_fork()
+    report_jobs.reset_after_fork()
+    open_stores()
+    model_registry.reset_after_fork()
+    if 'ocr_processor' in sys.modules:
+        ocr_module().reset_ocr_pool_after_fork()
+    if MODEL_STATE == 'not_loaded':
+        start_model_loading(MODEL_WARMUP)
+    model_registry.watch(MODEL_WATCH_SECONDS)
+
+
 if __name__ == '__main__':
     print("\n" + "=" * 50)
     print(" Starting Diet Recommendation API Server")
     print("=" * 50)
 
-    if MODELS_LOADED:
-        print("\n Server is ready!")
-        print("  - Calories Model  : Loaded")
-        print("  - Protein Model   : Loaded")
-        print("  - Carbs Model     : Loaded")
-        print("  - Fats Model      : Loaded")
+    app = create_app()
+
+    if MODEL_STATE == 'failed':
+        print("\n Failed to load models. Server not started.")
+    else:
+        print("\n Server is starting!")
+        print(f"  - Models          : {MODEL_STATE} (warm-up: {MODEL_WARMUP})")
         print("  - Meal Plan       : Rule-Based Clinical Logic ")
+        print(f"  - Inference       : {INFERENCE_BACKEND}")
         print(f"  - Port            : {PORT}")
         print("\n" + "=" * 50)
 
         app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
-    else:
-        print("\n Failed to load models. Server not started.")
\ No newline at end of file
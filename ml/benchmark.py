@@ -0,0 +1,499 @@
+"""
+Benchmarks for the ML service hot paths, on seeded synthetic fixtures:
+
+    python benchmark.py                          # run everything
+    python benchmark.py --only predict,text      # cases whose name contains these
+    python benchmark.py --baseline old.json      # flag regressions against a saved run
+
+Each case reports latency percentiles (ms), throughput, the tracemalloc
+peak of one call and the process peak RSS so far. Results are written
+as JSON (default benchmarks/results-<timestamp>.json) so runs can be
+compared. Caches (predictions, OCR results) are disabled unless a case
+says otherwise, so the numbers measure the work itself.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ACTIVITY_LEVELS = ['sedentary', 'light', 'moderate', 'very', 'extra']
+GENDERS         = ['Male', 'Female']
+DISEASES        = ['None', 'Diabetes', 'Hypertension', 'Heart Disease', 'High Cholesterol', 'Obesity']
+ALLERGENS       = ['penicillin', 'peanuts', 'shellfish', 'lactose', 'aspirin']
+
+# Regression when p50 grows by more than this fraction and by more than
+# NOISE_FLOOR_MS, so sub-microsecond jitter on tiny cases is ignored
+REGRESSION_THRESHOLD = 0.15
+NOISE_FLOOR_MS       = 0.02
+
+
+# FIXTURES
+
+
+def make_payloads(rng, count):
+    """Frontend /api/predict payloads spread over the form's value space."""
+    payloads = []
+    for _ in range(count):
+        height = float(rng.uniform(150, 195))
+        weight = float(rng.uniform(45, 120))
+        payloads.append({
+            'age':           str(int(rng.integers(18, 80))),
+            'gender':        GENDERS[int(rng.integers(len(GENDERS)))],
+            'height':        f'{height:.0f}',
+            'weight':        f'{weight:.0f}',
+            'bmi':           f'{weight / (height / 100) ** 2:.1f}',
+            'activityLevel': ACTIVITY_LEVELS[int(rng.integers(len(ACTIVITY_LEVELS)))],
+            'diseases':      [DISEASES[int(rng.integers(len(DISEASES)))]],
+        })
+    return payloads
+
+
+def make_report_lines(rng):
+    """Lines of a typed lab report with the fields the extractors look for."""
+    diseases = rng.choice(DISEASES[1:], size=2, replace=False)
+    return [
+        'CITY GENERAL HOSPITAL - LABORATORY REPORT',
+        f'Patient Name: Patient {int(rng.integers(1000, 9999))}',
+        f'Age: {int(rng.integers(25, 80))} years    Gender: {GENDERS[int(rng.integers(2))]}',
+        f'Date: 2024-0{int(rng.integers(1, 9))}-1{int(rng.integers(0, 9))}',
+        '',
+        'TEST                      RESULT      REFERENCE',
+        f'Blood Pressure            {int(rng.integers(110, 170))}/{int(rng.integers(70, 100))} mmHg',
+        f'Total Cholesterol         {int(rng.integers(150, 290))} mg/dl   < 200',
+        f'HDL Cholesterol           {int(rng.integers(30, 70))} mg/dl    > 40',
+        f'LDL Cholesterol           {int(rng.integers(70, 190))} mg/dl   < 130',
+        f'Triglycerides             {int(rng.integers(80, 300))} mg/dl   < 150',
+        f'Fasting Blood Sugar       {int(rng.integers(75, 180))} mg/dl   70-100',
+        f'HbA1c                     {rng.uniform(4.8, 9.5):.1f} %       < 5.7',
+        f'Hemoglobin                {rng.uniform(10, 17):.1f} g/dl',
+        '',
+        f'Diagnosis: {diseases[0]}, {diseases[1]}',
+        f'Known allergies: allergic to {ALLERGENS[int(rng.integers(len(ALLERGENS)))]}',
+        'Physician notes: follow up in three months; continue current medication.',
+    ]
+
+
+def make_text_pdf(pages):
+    """A minimal PDF with a Helvetica text layer per page, one list of lines per page."""
+    def escape(line):
+        return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects  = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [' + ' '.join(f'{p} 0 R' for p in page_ids)
+         + f'] /Count {len(pages)} >>').encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for page_id, lines in zip(page_ids, pages):
+        stream = 'BT /F1 11 Tf 14 TL 50 800 Td ' + ' '.join(f'({escape(l)}) Tj T*' for l in lines) + ' ET'
+        objects.append((
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>'
+        ).encode())
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream'.encode())
+
+    out     = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+
+def make_page_image(rng, lines, dpi=300, noise_sigma=12):
+    """An A4 greyscale scan of `lines` at `dpi`, with sensor noise and a slight skew."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new('L', (width, height), color=245)
+    draw  = ImageDraw.Draw(image)
+    font  = ImageFont.load_default(size=dpi // 7)
+    y = dpi // 2
+    for line in lines:
+        draw.text((dpi // 2, y), line, fill=20, font=font)
+        y += int(dpi / 4.5)
+
+    image = image.rotate(0.8, fillcolor=245)
+    noisy = np.asarray(image, dtype=np.float32) + rng.normal(0, noise_sigma, size=(height, width))
+    image = Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+    image.info['dpi'] = (dpi, dpi)
+    return image
+
+
+def png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', dpi=image.info.get('dpi', (300, 300)))
+    return buffer.getvalue()
+
+
+def upload(data, filename):
+    """The Werkzeug FileStorage a Flask route would hand to process_medical_report."""
+    from werkzeug.datastructures import FileStorage
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+# MEASUREMENT
+
+
+class Case:
+    """One benchmark: `fn()` is timed `iterations` times; each call handles `items` items."""
+
+    def __init__(self, name, fn, iterations, items=1, warmup=3, unit='calls', details=None):
+        self.name       = name
+        self.fn         = fn
+        self.iterations = iterations
+        self.items      = items
+        self.warmup     = warmup
+        self.unit       = unit
+        self.details    = details or {}
+
+
+class Skipped:
+    def __init__(self, name, reason):
+        self.name   = name
+        self.reason = reason
+
+
+def run_case(case, scale=1.0):
+    iterations = max(3, int(case.iterations * scale))
+
+    with quiet():
+        for _ in range(case.warmup):
+            case.fn()
+
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter_ns()
+            case.fn()
+            samples.append(time.perf_counter_ns() - started)
+
+        # Separate pass: tracemalloc slows every allocation down
+        tracemalloc.start()
+        case.fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return summarise(samples, case.items, case.unit, peak)
+
+
+def summarise(samples_ns, items=1, unit='calls', peak_bytes=0):
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    total_seconds = ms.sum() / 1000
+    return {
+        'iterations':      len(ms),
+        'items_per_call':  items,
+        'p50_ms':          round(float(np.percentile(ms, 50)), 4),
+        'p90_ms':          round(float(np.percentile(ms, 90)), 4),
+        'p95_ms':          round(float(np.percentile(ms, 95)), 4),
+        'p99_ms':          round(float(np.percentile(ms, 99)), 4),
+        'mean_ms':         round(float(ms.mean()), 4),
+        'stdev_ms':        round(float(statistics.pstdev(ms)), 4),
+        'min_ms':          round(float(ms.min()), 4),
+        'max_ms':          round(float(ms.max()), 4),
+        'throughput':      round(len(ms) * items / total_seconds, 2) if total_seconds else None,
+        'throughput_unit': f'{unit}/s',
+        'peak_alloc_kb':   round(peak_bytes / 1024, 1),
+        'peak_rss_mb':     peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Cases whose p50 regressed against `baseline` (a previous run's 'results')."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or 'p50_ms' not in previous or 'p50_ms' not in current:
+            continue
+        before, after = previous['p50_ms'], current['p50_ms']
+        if after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS:
+            regressions.append({
+                'case':      name,
+                'before_ms': before,
+                'after_ms':  after,
+                'change':    round(after / before - 1, 3) if before else None,
+            })
+    return regressions
+
+
+# CASES
+
+
+def model_cases(rng, models_dir=None):
+    """
+    Feature mapping and prediction, on the trained models when they load
+    and otherwise on a synthetic set (see synthetic_model_set), so the
+    model path is always measured. Each result records which was used.
+    """
+    import app as ml_app
+
+    if models_dir:
+        ml_app.MODELS_DIR = models_dir
+    with quiet():
+        loaded = ml_app.load_models()
+    if loaded:
+        details = {'models': 'trained'}
+    else:
+        print(f"[WARN] Trained models not loaded ({ml_app.model_registry.last_error}); "
+              f"benchmarking a synthetic forest")
+        with quiet():
+            ml_app.model_registry.swap(synthetic_model_set(rng, ml_app))
+        details = {'models': 'synthetic'}
+
+    model_set = ml_app.model_registry.active
+    columns   = model_set.metadata['feature_columns']
+    payloads  = make_payloads(rng, 1000)
+    single    = payloads[0]
+    model_in  = ml_app.map_frontend_to_model(single)
+    matrix    = model_set.feature_builder.build(payloads)
+    row       = matrix[:1]
+
+    # Prediction cases measure the model, not the memo cache
+    ml_app.prediction_cache.max_entries = 0
+
+    def cache_hit():
+        ml_app.prediction_cache.max_entries = 4096
+        try:
+            ml_app.predict_macros(row, model_set)
+        finally:
+            ml_app.prediction_cache.max_entries = 0
+
+    return [
+        Case('map_frontend_to_model', lambda: ml_app.map_frontend_to_model(single), 2000, details=details),
+        Case('create_feature_vector', lambda: ml_app.create_feature_vector(model_in, columns), 5000, details=details),
+        Case('feature_builder_batch_256', lambda: model_set.feature_builder.build(payloads[:256]), 200,
+             items=256, unit='rows', details=details),
+        Case('predict_single', lambda: ml_app.predict_macros(row, model_set), 2000, details=details),
+        Case('predict_batch_256', lambda: ml_app.predict_macros(matrix[:256], model_set), 200,
+             items=256, unit='rows', details=details),
+        Case('predict_batch_1000', lambda: ml_app.predict_macros(matrix, model_set), 50,
+             items=1000, unit='rows', details=details),
+        Case('predict_macros_cache_hit', cache_hit, 5000, details=details),
+    ]
+
+
+def synthetic_model_set(rng, ml_app, n_estimators=300, max_depth=6):
+    """
+    A ModelSet for checkouts without trained .ubj files: four XGBoost
+    regressors of roughly production size, trained on seeded synthetic
+    payloads, with the committed feature schema (metadata.json) and
+    encoder tables (label_encoders_classes.json).
+    """
+    import xgboost as xgb
+    from encoders import CompiledEncoders
+    from features import FeatureBuilder
+    from inference import MACRO_TARGETS, MacroPredictor
+    from model_registry import ModelSet
+
+    models_dir = os.path.join(BASE_DIR, 'models')
+    with open(os.path.join(models_dir, 'metadata.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    with open(os.path.join(models_dir, 'label_encoders_classes.json'), 'r', encoding='utf-8') as f:
+        encoders = CompiledEncoders(json.load(f))
+    columns = metadata['feature_columns']
+    builder = FeatureBuilder(columns, encoders, engineered=ml_app.ENGINEERED_FEATURES)
+
+    X = builder.build(make_payloads(rng, 4000))
+    intake = ['Caloric_Intake', 'Protein_Intake', 'Carbohydrate_Intake', 'Fat_Intake']
+    boosters = {}
+    for i, (name, column) in enumerate(zip(MACRO_TARGETS, intake)):
+        y = X[:, columns.index(column)] * rng.uniform(0.85, 1.05, size=len(X))
+        model = xgb.XGBRegressor(n_estimators=n_estimators, max_depth=max_depth, learning_rate=0.1, random_state=i)
+        model.fit(X, y)
+        boosters[name] = model.get_booster()
+
+    predictor = MacroPredictor(boosters, MACRO_TARGETS, backend=ml_app.INFERENCE_BACKEND)
+    return ModelSet('synthetic', predictor, metadata, None, encoders, builder)
+
+
+def text_cases(rng):
+    import ocr_processor
+
+    texts = ['\n'.join(make_report_lines(rng)) for _ in range(50)]
+    long_text = '\n\n'.join(texts[:20])
+    index = iter(range(10 ** 9))
+
+    def next_text():
+        return texts[next(index) % len(texts)]
+
+    return [
+        Case('find_diseases_in_text', lambda: ocr_processor.find_diseases_in_text(next_text()), 2000),
+        Case('find_diseases_in_text_20_pages', lambda: ocr_processor.find_diseases_in_text(long_text), 200,
+             items=20, unit='pages'),
+        Case('extract_numerical_values', lambda: ocr_processor.extract_numerical_values(next_text()), 2000),
+        Case('extract_medical_info', lambda: ocr_processor.extract_medical_info(next_text()), 500),
+    ]
+
+
+def ocr_cases(rng):
+    import ocr_processor
+
+    # Every call must do the work
+    ocr_processor.ocr_cache = ocr_processor.OCRResultCache(max_entries=0)
+
+    # A clean scan skips denoising; the noisy one takes the NL-means path
+    clean    = make_page_image(rng, make_report_lines(rng), noise_sigma=3)
+    page     = make_page_image(rng, make_report_lines(rng))
+    page_png = png_bytes(page)
+    pdf_1    = make_text_pdf([make_report_lines(rng)])
+    pdf_10   = make_text_pdf([make_report_lines(rng) for _ in range(10)])
+
+    cases = [
+        Case('preprocess_image_clean_a4_300dpi', lambda: ocr_processor.preprocess_image(clean, 300), 20, warmup=1),
+        Case('preprocess_image_noisy_a4_300dpi', lambda: ocr_processor.preprocess_image(page, 300), 10, warmup=1),
+        Case('process_medical_report_text_pdf_1_page',
+             lambda: ocr_processor.process_medical_report(upload(pdf_1, 'report.pdf')), 100),
+        Case('process_medical_report_text_pdf_10_pages',
+             lambda: ocr_processor.process_medical_report(upload(pdf_10, 'report.pdf')), 30,
+             items=10, unit='pages'),
+    ]
+
+    try:
+        with quiet():
+            ocr_processor.get_ocr_engine().version()
+    except Exception as e:
+        cases.append(Skipped('process_medical_report_scanned_png', f'Tesseract unavailable: {e}'))
+    else:
+        cases.append(Case('process_medical_report_scanned_png',
+                          lambda: ocr_processor.process_medical_report(upload(page_png, 'report.png')), 5,
+                          warmup=1))
+    return cases
+
+
+# RUNNER
+
+
+def run(only=None, scale=1.0, seed=0, models_dir=None):
+    rng     = np.random.default_rng(seed)
+    cases   = model_cases(rng, models_dir) + text_cases(rng) + ocr_cases(rng)
+    results = {}
+
+    for case in cases:
+        if only and not any(pattern in case.name for pattern in only):
+            continue
+        if isinstance(case, Skipped):
+            results[case.name] = {'skipped': case.reason}
+            print(f"[WARN] {case.name:45s} skipped: {case.reason}")
+            continue
+
+        result = {**run_case(case, scale), **case.details}
+        results[case.name] = result
+        print(f"[OK] {case.name:45s} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+              f"{result['throughput']:>12,.1f} {result['throughput_unit']}")
+    return results
+
+
+def environment():
+    versions = {}
+    for module in ('numpy', 'xgboost', 'cv2', 'PIL', 'PyPDF2'):
+        if module in sys.modules:
+            versions[module] = getattr(sys.modules[module], '__version__', None)
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python':     platform.python_version(),
+        'platform':   platform.platform(),
+        'cpu_count':  os.cpu_count(),
+        'git_commit': commit,
+        'versions':   versions,
+        'env':        {
+            name: os.environ[name] for name in (
+                'OMP_NUM_THREADS', 'INFERENCE_BACKEND', 'MODEL_FORMAT', 'OCR_PREPROCESS_MODE', 'OCR_WORKERS'
+            ) if name in os.environ
+        },
+    }
+
+
+def peak_rss_mb():
+    """Process peak RSS in MB, or None where the resource module is missing (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the service's progress prints while timing."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ML service hot paths.')
+    parser.add_argument('--only', help='comma-separated substrings of case names to run')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every case\'s iteration count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--models-dir', help='model directory (default ml/models)')
+    parser.add_argument('--output', help='results file (default benchmarks/results-<timestamp>.json)')
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='p50 growth that counts as a regression (default 0.15)')
+    args = parser.parse_args(argv)
+
+    only    = [p.strip() for p in args.only.split(',')] if args.only else None
+    started = datetime.now(timezone.utc)
+    results = run(only=only, scale=args.scale, seed=args.seed, models_dir=args.models_dir)
+
+    report = {
+        'timestamp':   started.isoformat(),
+        'seed':        args.seed,
+        'scale':       args.scale,
+        'environment': environment(),
+        'results':     results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get('results', {}), args.threshold)
+        report['baseline']    = {'path': args.baseline, 'timestamp': baseline.get('timestamp')}
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"[WARN] Regression in {regression['case']}: p50 {regression['before_ms']} ms -> "
+                  f"{regression['after_ms']} ms ({regression['change']:+.0%})")
+        if not regressions:
+            print(f"[OK] No regressions against {args.baseline}")
+        exit_code = 1 if regressions else 0
+
+    output = args.output or os.path.join(
+        BASE_DIR, 'benchmarks', f"results-{started.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[OK] Results written to {output}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import json
+import numpy as np
+
+
+# CONFIGURATION
+
+
+# Class used when a value was never seen at training time. Columns whose
+# default isn't one of their classes fall back to the first class.
+DEFAULT_CLASSES = {
+    'Gender':                'Other',
+    'Chronic_Disease':       'None',
+    'Allergies':             'None',
+    'Dietary_Habits':        'Regular',
+    'Genetic_Risk_Factor':   'No',
+    'Alcohol_Consumption':   'No',
+    'Smoking_Habit':         'No',
+    'Preferred_Cuisine':     'Western',
+    'Food_Aversions':        'None',
+    'BMI_Category':          'Normal',
+    'Age_Group':             'Adult',
+    'Recommended_Meal_Plan': 'Balanced Diet',
+}
+
+
+# COMPILED ENCODERS
+
+
+class EncoderTable:
+    """Lookup tables for one categorical column."""
+
+    def __init__(self, column, classes):
+        self.column  = column
+        self.classes = np.asarray([str(c) for c in classes], dtype=str)
+        self.codes   = {c: i for i, c in enumerate(self.classes.tolist())}
+
+        # searchsorted needs sorted keys; LabelEncoder classes already are
+        self.sorter         = np.argsort(self.classes, kind='stable').astype(np.int64)
+        self.sorted_classes = self.classes[self.sorter]
+
+        default = DEFAULT_CLASSES.get(column)
+        self.default_class = default if default in self.codes else self.classes[0]
+        self.default       = self.codes[self.default_class]
+
+    def encode(self, value):
+        return self.codes.get(value, self.default)
+
+    def encode_many(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind != 'U':
+            values = values.astype(object).astype(str)
+        if values.size == 0:
+            return np.zeros(values.shape, dtype=np.int64)
+
+        pos = np.searchsorted(self.sorted_classes, values)
+        pos = np.minimum(pos, len(self.sorted_classes) - 1)
+        hit = self.sorted_classes[pos] == values
+        return np.where(hit, self.sorter[pos], self.default)
+
+    def decode(self, code):
+        return str(self.classes[code])
+
+
+class CompiledEncoders:
+    """
+    Plain dict/array replacement for the fitted LabelEncoders. Built once
+    at load time; unknown values map to an explicit default code instead
+    of raising.
+    """
+
+    def __init__(self, classes_by_column):
+        self.tables = {
+            column: EncoderTable(column, classes)
+            for column, classes in classes_by_column.items()
+        }
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders):
+        return cls({column: enc.classes_.tolist() for column, enc in label_encoders.items()})
+
+    @classmethod
+    def from_classes_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __contains__(self, column):
+        return column in self.tables
+
+    def classes(self, column):
+        return self.tables[column].classes.tolist()
+
+    def encode(self, column, value):
+        return self.tables[column].encode(value)
+
+    def encode_many(self, column, values):
+        return self.tables[column].encode_many(values)
+
+    def default(self, column):
+        return self.tables[column].default
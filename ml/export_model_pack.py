@@ -0,0 +1,32 @@
+import json
+import os
+import joblib
+import xgboost as xgb
+
+from inference import MACRO_TARGETS, CompiledForest
+from model_pack import write_model_pack
+from model_registry import files_version
+
+MODELS_DIR = os.environ.get("MODELS_DIR", "models")
+PACK_PATH  = os.environ.get("MODEL_PACK_PATH", os.path.join(MODELS_DIR, "model_pack.bin"))
+
+model_paths = [os.path.join(MODELS_DIR, f"{name}_model.ubj") for name in MACRO_TARGETS]
+meta_path   = os.path.join(MODELS_DIR, "metadata.json")
+enc_path    = os.path.join(MODELS_DIR, "label_encoders.joblib")
+
+# Same version the server derives from these files, so a pack and the
+# files it came from report the same model_version
+version = files_version(model_paths + [meta_path, enc_path])
+
+boosters = [xgb.Booster(model_file=path) for path in model_paths]
+forest   = CompiledForest(boosters)
+
+with open(meta_path, "r", encoding="utf-8") as f:
+    metadata = json.load(f)
+
+label_encoders  = joblib.load(enc_path)
+encoder_classes = {key: [str(c) for c in encoder.classes_.tolist()] for key, encoder in label_encoders.items()}
+
+size = write_model_pack(PACK_PATH, forest, MACRO_TARGETS, metadata, encoder_classes, version)
+
+print(f"Exported model version {version} to {PACK_PATH} ({size / 1024:.0f} KB, {len(forest.roots)} trees)")
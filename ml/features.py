@@ -0,0 +1,263 @@
+import numpy as np
+
+
+# CONFIGURATION
+
+
+ACTIVITY_EXERCISE = {
+    'sedentary': 0, 'light': 2, 'moderate': 4, 'very': 6, 'extra': 6
+}
+ACTIVITY_STEPS = {
+    'sedentary': 3000, 'light': 6000, 'moderate': 9000, 'very': 12000, 'extra': 15000
+}
+ACTIVITY_MULTIPLIER = {
+    'sedentary': 1.2, 'light': 1.375, 'moderate': 1.55, 'very': 1.725, 'extra': 1.9
+}
+
+GENETIC_RISK_DISEASES = ('Heart Disease', 'Diabetes', 'Hypertension')
+HIGH_CHOLESTEROL_DISEASES = ('High Cholesterol', 'Heart Disease')
+
+# Engineered columns. The training notebook is not in the tree, so these
+# formulas are reconstructions from the column names, not a copy of what
+# the models were trained on. They stay at 0 (as they always have been)
+# unless ENGINEERED_FEATURES is enabled, which should wait until
+# engineered_mismatches() finds no differences against features exported
+# from the training pipeline (see test_features.py):
+#   BMI_Category        Underweight <18.5 | Normal <25 | Overweight <30 | Obese
+#   Age_Group           Young <30 | Adult <45 | MiddleAge <60 | Senior
+#   Calorie_Density     Caloric_Intake / Weight_kg
+#   Macro_Balance       Protein_Intake / (Carbohydrate_Intake + Fat_Intake + 1)
+#   BP_Pulse_Pressure   Systolic - Diastolic
+#   Exercise_BMI        Exercise_Frequency * BMI
+#   Prot/Carb/Fat_ratio share of Caloric_Intake (4/4/9 kcal per gram)
+#   Weight_Height_ratio Weight_kg / Height_cm
+#   Cal_per_exercise    Caloric_Intake / (Exercise_Frequency + 1)
+#   Protein_BMI         Protein_Intake / BMI
+#   Age_BMI             Age * BMI
+#   Sugar_Chol_ratio    Blood_Sugar_Level / Cholesterol_Level
+BASE_COLUMNS = [
+    'Age', 'Gender', 'Height_cm', 'Weight_kg', 'BMI', 'Chronic_Disease',
+    'Blood_Pressure_Systolic', 'Blood_Pressure_Diastolic', 'Cholesterol_Level',
+    'Blood_Sugar_Level', 'Genetic_Risk_Factor', 'Allergies', 'Daily_Steps',
+    'Exercise_Frequency', 'Sleep_Hours', 'Alcohol_Consumption', 'Smoking_Habit',
+    'Dietary_Habits', 'Caloric_Intake', 'Protein_Intake', 'Carbohydrate_Intake',
+    'Fat_Intake', 'Preferred_Cuisine', 'Food_Aversions',
+]
+ENGINEERED_COLUMNS = [
+    'BMI_Category', 'Age_Group', 'Calorie_Density', 'Macro_Balance',
+    'BP_Pulse_Pressure', 'Exercise_BMI', 'Prot_ratio', 'Carb_ratio', 'Fat_ratio',
+    'Weight_Height_ratio', 'Cal_per_exercise', 'Protein_BMI', 'Age_BMI',
+    'Sugar_Chol_ratio',
+]
+
+BMI_BINS    = [18.5, 25, 30]
+BMI_LABELS  = ['Underweight', 'Normal', 'Overweight', 'Obese']
+AGE_BINS    = [30, 45, 60]
+AGE_LABELS  = ['Young', 'Adult', 'MiddleAge', 'Senior']
+
+
+# PAYLOAD PARSING
+
+
+def parse_record(data):
+    """
+    Pull the raw fields out of one frontend payload. This is the only
+    per-row step; it raises ValueError/TypeError for unusable values so
+    callers can reject a single row before the batch is built.
+    """
+    diseases = data.get('diseases', [])
+    chronic  = diseases[0] if diseases and diseases[0] != 'None' else 'None'
+
+    return (
+        int(data.get('age', 30)),
+        float(data.get('height', 170)),
+        float(data.get('weight', 70)),
+        float(data.get('bmi', 24.0)),
+        data.get('gender', 'Other'),
+        chronic,
+        data.get('allergies', '').strip() or 'None',
+        data.get('dietPreference', 'Regular'),
+        data.get('activityLevel', 'moderate'),
+    )
+
+
+# FEATURE BUILDER
+
+
+class FeatureBuilder:
+    """
+    Builds the model input matrix for N payloads at once.
+
+    The column order from metadata.json is resolved to indices when the
+    builder is created; every base and engineered column is computed as
+    a NumPy array over all rows and written straight into its slot.
+    Engineered columns are left at 0 unless `engineered` is set.
+    """
+
+    def __init__(self, feature_columns, encoders, engineered=False):
+        self.feature_columns = list(feature_columns)
+        self.encoders        = encoders
+        self.engineered      = engineered
+
+        # Constant categorical inputs are encoded once
+        self.constants = {
+            'Alcohol_Consumption': encoders.encode('Alcohol_Consumption', 'No'),
+            'Smoking_Habit':       encoders.encode('Smoking_Habit', 'No'),
+            'Food_Aversions':      encoders.encode('Food_Aversions', 'None'),
+            'Preferred_Cuisine':   encoders.encode('Preferred_Cuisine', 'Western'),
+        }
+
+        defined  = set(BASE_COLUMNS + ENGINEERED_COLUMNS)
+        produced = set(BASE_COLUMNS + (ENGINEERED_COLUMNS if engineered else []))
+        self.column_index = [
+            (col, i) for i, col in enumerate(self.feature_columns) if col in produced
+        ]
+        self.missing_columns = [col for col in self.feature_columns if col not in defined]
+        self.uses_engineered = engineered and any(col in ENGINEERED_COLUMNS for col in self.feature_columns)
+        if self.missing_columns:
+            print(f"  [WARN] No feature definition for: {', '.join(self.missing_columns)} (filled with 0)")
+
+    def build(self, records):
+        """Payload dicts -> (n_rows, n_features) float matrix."""
+        return self.build_parsed([parse_record(r) for r in records])
+
+    def build_parsed(self, parsed):
+        """Rows from parse_record -> (n_rows, n_features) float matrix."""
+        matrix = np.zeros((len(parsed), len(self.feature_columns)), dtype=float)
+        if not parsed:
+            return matrix
+
+        columns = self.compute_columns(parsed)
+        for col, i in self.column_index:
+            matrix[:, i] = columns[col]
+        return matrix
+
+    def compute_columns(self, parsed):
+        """Rows from parse_record -> {column name: array over rows}."""
+        age, height, weight, bmi, gender, chronic, allergies, diet, activity = zip(*parsed)
+        raw = {
+            'age':       np.asarray(age, dtype=float),
+            'height':    np.asarray(height, dtype=float),
+            'weight':    np.asarray(weight, dtype=float),
+            'bmi':       np.asarray(bmi, dtype=float),
+            'gender':    _as_str(gender),
+            'chronic':   _as_str(chronic),
+            'allergies': _as_str(allergies),
+            'diet':      _as_str(diet),
+            'activity':  _as_str(activity),
+        }
+        return self._columns(raw)
+
+    def _columns(self, raw):
+        n        = len(raw['age'])
+        chronic  = raw['chronic']
+        activity = raw['activity']
+
+        cols = {}
+        cols['Age']       = raw['age']
+        cols['Height_cm'] = raw['height']
+        cols['Weight_kg'] = raw['weight']
+        cols['BMI']       = raw['bmi']
+
+        encode = self.encoders.encode_many
+        cols['Gender']          = encode('Gender', raw['gender'])
+        cols['Chronic_Disease'] = encode('Chronic_Disease', chronic)
+        cols['Allergies']       = encode('Allergies', raw['allergies'])
+        cols['Dietary_Habits']  = encode('Dietary_Habits', raw['diet'])
+
+        cols['Exercise_Frequency'] = _lookup(activity, ACTIVITY_EXERCISE, 3)
+
+        hypertensive = chronic == 'Hypertension'
+        cols['Blood_Pressure_Systolic']  = np.where(hypertensive, 140, 120)
+        cols['Blood_Pressure_Diastolic'] = np.where(hypertensive, 90, 80)
+        cols['Cholesterol_Level'] = np.where(np.isin(chronic, HIGH_CHOLESTEROL_DISEASES), 250, 200)
+        cols['Blood_Sugar_Level'] = np.where(chronic == 'Diabetes', 180, 95)
+
+        genetic_risk = np.where(np.isin(chronic, GENETIC_RISK_DISEASES), 'Yes', 'No')
+        cols['Genetic_Risk_Factor'] = encode('Genetic_Risk_Factor', genetic_risk)
+
+        cols['Daily_Steps'] = _lookup(activity, ACTIVITY_STEPS, 7000)
+        cols['Sleep_Hours'] = np.full(n, 7.0)
+
+        # Mifflin-St Jeor BMR -> TDEE
+        bmr  = 10 * cols['Weight_kg'] + 6.25 * cols['Height_cm'] - 5 * cols['Age']
+        bmr  = bmr + np.where(raw['gender'] == 'Male', 5, -161)
+        tdee = bmr * _lookup(activity, ACTIVITY_MULTIPLIER, 1.55)
+
+        cols['Caloric_Intake']      = np.trunc(tdee)
+        cols['Protein_Intake']      = np.trunc(tdee * 0.25 / 4)
+        cols['Carbohydrate_Intake'] = np.trunc(tdee * 0.45 / 4)
+        cols['Fat_Intake']          = np.trunc(tdee * 0.30 / 9)
+
+        for col, code in self.constants.items():
+            cols[col] = np.full(n, code)
+
+        if self.uses_engineered:
+            self._add_engineered(cols)
+        return cols
+
+    def _add_engineered(self, cols):
+        bmi      = cols['BMI']
+        calories = cols['Caloric_Intake']
+        protein  = cols['Protein_Intake']
+        carbs    = cols['Carbohydrate_Intake']
+        fats     = cols['Fat_Intake']
+        exercise = cols['Exercise_Frequency']
+
+        bmi_category = np.asarray(BMI_LABELS)[np.digitize(bmi, BMI_BINS)]
+        age_group    = np.asarray(AGE_LABELS)[np.digitize(cols['Age'], AGE_BINS)]
+        cols['BMI_Category'] = self.encoders.encode_many('BMI_Category', bmi_category)
+        cols['Age_Group']    = self.encoders.encode_many('Age_Group', age_group)
+
+        cols['Calorie_Density']     = _safe_div(calories, cols['Weight_kg'])
+        cols['Macro_Balance']       = _safe_div(protein, carbs + fats + 1)
+        cols['BP_Pulse_Pressure']   = cols['Blood_Pressure_Systolic'] - cols['Blood_Pressure_Diastolic']
+        cols['Exercise_BMI']        = exercise * bmi
+        cols['Prot_ratio']          = _safe_div(protein * 4, calories)
+        cols['Carb_ratio']          = _safe_div(carbs * 4, calories)
+        cols['Fat_ratio']           = _safe_div(fats * 9, calories)
+        cols['Weight_Height_ratio'] = _safe_div(cols['Weight_kg'], cols['Height_cm'])
+        cols['Cal_per_exercise']    = _safe_div(calories, exercise + 1)
+        cols['Protein_BMI']         = _safe_div(protein, bmi)
+        cols['Age_BMI']             = cols['Age'] * bmi
+        cols['Sugar_Chol_ratio']    = _safe_div(cols['Blood_Sugar_Level'], cols['Cholesterol_Level'])
+
+
+# PARITY
+
+
+def engineered_mismatches(columns, encoders, rtol=1e-6):
+    """
+    Recompute the engineered columns from the base columns of an exported
+    training feature frame (`columns`: name -> array, categoricals already
+    label-encoded) and return the engineered columns that disagree with
+    the exported values.
+    """
+    cols = {col: np.asarray(columns[col], dtype=float) for col in BASE_COLUMNS}
+    FeatureBuilder(ENGINEERED_COLUMNS, encoders)._add_engineered(cols)
+    return [
+        col for col in ENGINEERED_COLUMNS
+        if col in columns and not np.allclose(cols[col], np.asarray(columns[col], dtype=float), rtol=rtol)
+    ]
+
+
+# HELPERS
+
+
+def _as_str(values):
+    return np.asarray(values, dtype=object).astype(str)
+
+
+def _lookup(values, mapping, default):
+    """Map a string array through a small dict, one lookup per distinct value."""
+    keys, inverse = np.unique(values, return_inverse=True)
+    table = np.array([mapping.get(k, default) for k in keys], dtype=float)
+    return table[inverse.reshape(-1)]
+
+
+def _safe_div(numerator, denominator):
+    numerator   = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
@@ -0,0 +1,103 @@
+"""
+gunicorn settings for the ML service.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Models and encoders are loaded once in the master (preload_app) and
+shared copy-on-write with the forked workers. MODEL_WARMUP=background
+or lazy defers loading to each worker instead (see wsgi.py).
+
+ML_SERVER_ROLE picks the worker profile:
+    api  - JSON routes (/api/predict, /api/predict/batch, /api/health):
+           threaded workers, short timeout
+    ocr  - upload routes (/api/process-report, /api/predict with a file):
+           sync workers, one request each, long timeout
+    all  - one group serving everything (default)
+
+To keep OCR bursts from slowing predictions, run an api group and an ocr
+group on different ports and route the upload paths to the ocr group at
+the reverse proxy.
+"""
+import gc
+import multiprocessing
+import os
+
+
+# One BLAS/OpenMP thread per worker; parallelism comes from the workers
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+CPU_COUNT = multiprocessing.cpu_count()
+ROLE      = os.environ.get('ML_SERVER_ROLE', 'all').lower()
+
+PROFILES = {
+    'api': {
+        'worker_class': 'gthread',
+        'workers':      CPU_COUNT,
+        'threads':      4,
+        'timeout':      30,
+    },
+    'ocr': {
+        # Fewer workers, each fanning pages out to its own OCR process pool
+        'worker_class': 'sync',
+        'workers':      max(2, CPU_COUNT // 2),
+        'threads':      1,
+        'timeout':      180,
+    },
+    'all': {
+        'worker_class': 'gthread',
+        'workers':      max(2, CPU_COUNT),
+        'threads':      4,
+        'timeout':      180,
+    },
+}
+
+if ROLE not in PROFILES:
+    raise ValueError(f'ML_SERVER_ROLE must be one of {sorted(PROFILES)}, got {ROLE!r}')
+
+profile = PROFILES[ROLE]
+
+
+# SERVER
+
+
+bind             = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+preload_app      = True
+worker_class     = os.environ.get('GUNICORN_WORKER_CLASS', profile['worker_class'])
+workers          = int(os.environ.get('GUNICORN_WORKERS', profile['workers']))
+threads          = int(os.environ.get('GUNICORN_THREADS', profile['threads']))
+timeout          = int(os.environ.get('GUNICORN_TIMEOUT', profile['timeout']))
+keepalive        = 5
+
+# Every worker starts its own OCR pool of OCR_WORKERS processes; split the
+# CPUs between them instead of giving each worker a pool of CPU_COUNT, but
+# keep at least two so pages are still OCR'd in parallel
+os.environ.setdefault('OCR_WORKERS', str(max(2, CPU_COUNT // workers)))
+graceful_timeout = 30
+
+# No max_requests: recycling a worker would kill the report jobs its
+# background threads are running
+
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog  = '-'
+
+
+# HOOKS
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach, so GC
+    # passes in the workers don't write to (and un-share) those pages
+    gc.freeze()
+    server.log.info(
+        f"[OK] ML server role={ROLE} worker_class={worker_class} "
+        f"workers={workers} threads={threads} ocr_workers={os.environ['OCR_WORKERS']}"
+    )
+
+
+def post_fork(server, worker):
+    import app as ml_app
+    ml_app.reset_after_fork()
@@ -0,0 +1,257 @@
+import json
+import os
+import numpy as np
+
+
+# CONFIGURATION
+
+
+MACRO_TARGETS = ['calories', 'protein', 'carbs', 'fats']
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = {
+    'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror'
+}
+
+# Upper bound on (rows x trees) node indices held in memory at once
+MAX_CELLS_PER_CHUNK = 2_000_000
+
+
+# COMPILED FOREST
+
+
+class CompiledForest:
+    """
+    All trees of several single-output boosters flattened into NumPy
+    arrays, so every target is evaluated in one vectorised traversal.
+
+    Leaves point back at themselves, which lets the traversal run a fixed
+    number of steps (the deepest tree) without masking finished rows.
+    """
+
+    # Arrays that fully describe a forest (see model_pack.py)
+    ARRAY_FIELDS = (
+        'feature', 'threshold', 'left', 'right', 'default_left', 'value',
+        'roots', 'tree_starts', 'tree_ends', 'base_scores',
+    )
+
+    def __init__(self, boosters):
+        feature      = []
+        threshold    = []
+        left         = []
+        right        = []
+        default_left = []
+        value        = []
+        roots        = []
+        tree_starts  = []
+        base_scores  = []
+        num_features = 0
+        max_depth    = 0
+        offset       = 0
+
+        for booster in boosters:
+            model  = json.loads(booster.save_raw('json'))
+            trees, base_score, n_feat = _parse_booster(model, booster)
+            num_features = max(num_features, n_feat)
+            tree_starts.append(len(roots))
+            base_scores.append(base_score)
+
+            for tree in trees:
+                lc = np.asarray(tree['left_children'], dtype=np.int64)
+                rc = np.asarray(tree['right_children'], dtype=np.int64)
+                node_ids = np.arange(len(lc))
+                is_leaf  = lc == -1
+
+                left.append(np.where(is_leaf, node_ids, lc) + offset)
+                right.append(np.where(is_leaf, node_ids, rc) + offset)
+                feature.append(np.where(is_leaf, 0, np.asarray(tree['split_indices'], dtype=np.int64)))
+                threshold.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+                default_left.append(np.asarray(tree['default_left'], dtype=bool))
+                value.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float32), 0))
+                roots.append(offset)
+
+                max_depth = max(max_depth, _tree_depth(lc, rc))
+                offset += len(lc)
+
+        self.num_targets  = len(boosters)
+        self.num_features = num_features
+        self.max_depth    = max_depth
+        self.feature      = np.concatenate(feature).astype(np.int32)
+        self.threshold    = np.concatenate(threshold)
+        self.left         = np.concatenate(left).astype(np.int32)
+        self.right        = np.concatenate(right).astype(np.int32)
+        self.default_left = np.concatenate(default_left)
+        self.value        = np.concatenate(value).astype(np.float32)
+        self.roots        = np.asarray(roots, dtype=np.int32)
+        self.tree_ends    = np.asarray(tree_starts[1:] + [len(roots)], dtype=np.intp)
+        self.tree_starts  = np.asarray(tree_starts, dtype=np.intp)
+        self.base_scores  = np.asarray(base_scores, dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, arrays, num_features, max_depth):
+        """Rebuild a forest from its arrays (e.g. read-only views of a mapped file)."""
+        forest = cls.__new__(cls)
+        for name in cls.ARRAY_FIELDS:
+            setattr(forest, name, arrays[name])
+        forest.num_targets  = len(forest.base_scores)
+        forest.num_features = int(num_features)
+        forest.max_depth    = int(max_depth)
+        return forest
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] < self.num_features:
+            raise ValueError(f'Expected {self.num_features} features, got {X.shape[1]}')
+
+        out   = np.empty((X.shape[0], self.num_targets), dtype=np.float32)
+        chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, len(self.roots)))
+        for start in range(0, X.shape[0], chunk):
+            out[start:start + chunk] = self._predict_chunk(X[start:start + chunk])
+        return out
+
+    def _predict_chunk(self, X):
+        rows  = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+
+        for _ in range(self.max_depth):
+            x       = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.threshold[nodes])
+            nodes   = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # XGBoost adds leaves to the base score one tree at a time in
+        # float32; cumsum accumulates in the same order, so results match
+        # bit for bit rather than drifting by an ulp.
+        leaves = self.value[nodes]
+        out    = np.empty((X.shape[0], self.num_targets), dtype=np.float32)
+        for j in range(self.num_targets):
+            block = leaves[:, self.tree_starts[j]:self.tree_ends[j]]
+            if block.shape[1] == 0:
+                out[:, j] = self.base_scores[j]
+                continue
+            block = np.concatenate([np.full((X.shape[0], 1), self.base_scores[j], dtype=np.float32), block], axis=1)
+            out[:, j] = np.cumsum(block, axis=1, dtype=np.float32)[:, -1]
+        return out
+
+
+def _parse_booster(model, booster):
+    """
+    Pull the trees that `XGBRegressor.predict` would use out of a JSON
+    model dump. Raises ValueError for anything the compiled path can't
+    reproduce exactly.
+    """
+    learner = model['learner']
+    gbm     = learner['gradient_booster']
+
+    if gbm.get('name') != 'gbtree':
+        raise ValueError(f"Unsupported booster type: {gbm.get('name')}")
+
+    objective = learner['objective']['name']
+    if objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f'Unsupported objective: {objective}')
+
+    params = learner['learner_model_param']
+    if int(params.get('num_target', 1)) > 1 or int(params.get('num_class', 0)) > 1:
+        raise ValueError('Only single-output regressors can be compiled')
+
+    trees = gbm['model']['trees']
+    for tree in trees:
+        if any(int(t) != 0 for t in tree.get('split_type', [])):
+            raise ValueError('Categorical splits are not supported')
+
+    # Honour early stopping the same way XGBRegressor.predict does
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        indptr = gbm['model'].get('iteration_indptr')
+        if indptr:
+            trees = trees[:int(indptr[int(best_iteration) + 1])]
+        else:
+            per_iter = int(gbm['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees = trees[:(int(best_iteration) + 1) * per_iter]
+
+    base_score = float(str(params['base_score']).strip('[]'))
+    return trees, base_score, int(params.get('num_feature', 0))
+
+
+def _tree_depth(left_children, right_children):
+    depth = 0
+    level = [0]
+    while level:
+        nxt = []
+        for node in level:
+            if left_children[node] != -1:
+                nxt.extend((left_children[node], right_children[node]))
+        level = nxt
+        depth += 1 if nxt else 0
+    return depth
+
+
+# MACRO PREDICTOR
+
+
+class MacroPredictor:
+    """
+    Loads the four macro boosters once and returns all targets together
+    as an (n_rows, n_targets) array.
+
+    backend='compiled' evaluates a CompiledForest; backend='booster' calls
+    `Booster.inplace_predict` per target. Compilation falls back to the
+    booster path when a model uses features the forest doesn't support.
+    """
+
+    def __init__(self, boosters, targets=MACRO_TARGETS, backend='compiled'):
+        self.targets  = list(targets)
+        self.boosters = {name: boosters[name] for name in self.targets}
+        self.forest   = None
+        self.backend  = 'booster'
+
+        if backend == 'compiled':
+            try:
+                self.forest  = CompiledForest([self.boosters[name] for name in self.targets])
+                self.backend = 'compiled'
+            except (ValueError, KeyError) as e:
+                print(f"  [WARN] Could not compile boosters ({e}); using inplace_predict")
+
+    @classmethod
+    def from_dir(cls, models_dir, targets=MACRO_TARGETS, backend='compiled'):
+        # Imported here: xgboost (and the sklearn it pulls in) takes over a
+        # second to import, and only loading needs it
+        import xgboost as xgb
+
+        boosters = {}
+        for name in targets:
+            path = os.path.join(models_dir, f'{name}_model.ubj')
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            boosters[name] = xgb.Booster(model_file=path)
+        return cls(boosters, targets, backend)
+
+    @classmethod
+    def from_forest(cls, forest, targets=MACRO_TARGETS):
+        """A compiled-only predictor, with no boosters (and no xgboost import)."""
+        predictor = cls.__new__(cls)
+        predictor.targets  = list(targets)
+        predictor.boosters = {}
+        predictor.forest   = forest
+        predictor.backend  = 'compiled'
+        return predictor
+
+    def predict(self, X):
+        if self.forest is not None:
+            return self.forest.predict(X)
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty((X.shape[0], len(self.targets)), dtype=np.float32)
+        for j, name in enumerate(self.targets):
+            booster = self.boosters[name]
+            best_iteration = booster.attr('best_iteration')
+            iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+            out[:, j] = booster.inplace_predict(X, iteration_range=iteration_range)
+        return out
+
+    def predict_dict(self, X):
+        outputs = self.predict(X)
+        return {name: outputs[:, j] for j, name in enumerate(self.targets)}
@@ -0,0 +1,116 @@
+import os
+import json
+import mmap
+import struct
+import tempfile
+
+import numpy as np
+
+from inference import CompiledForest
+
+
+# CONFIGURATION
+
+
+MAGIC          = b'MLPACK01'
+FORMAT_VERSION = 1
+ALIGNMENT      = 64
+
+# MAGIC, then the JSON header length as little-endian uint64
+PREAMBLE = struct.Struct('<8sQ')
+
+
+# WRITING
+
+
+def write_model_pack(path, forest, targets, metadata, encoder_classes, version):
+    """
+    Write a packed model artifact: a JSON header (targets, feature schema,
+    metadata, encoder classes, array offsets) followed by the compiled
+    forest's arrays, each 64-byte aligned. Written to a temp file and
+    renamed, so readers never see a partial pack.
+    """
+    arrays = {name: np.ascontiguousarray(getattr(forest, name)) for name in CompiledForest.ARRAY_FIELDS}
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        'format_version':  FORMAT_VERSION,
+        'version':         version,
+        'targets':         list(targets),
+        'feature_columns': list(metadata['feature_columns']),
+        'metadata':        metadata,
+        'encoder_classes': encoder_classes,
+        'forest': {
+            'num_features': forest.num_features,
+            'max_depth':    forest.max_depth,
+        },
+        'arrays':          layout,
+    }).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as tmp:
+        try:
+            tmp.write(PREAMBLE.pack(MAGIC, len(header)))
+            tmp.write(header)
+            for name, array in arrays.items():
+                tmp.seek(data_start + layout[name]['offset'])
+                tmp.write(array.tobytes())
+            tmp.truncate(data_start + offset)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    os.replace(tmp.name, path)
+    return data_start + offset
+
+
+# READING
+
+
+class ModelPack:
+    """
+    A packed artifact mapped read-only. The forest arrays are views of the
+    mapping, so every process that opens the same file shares one copy of
+    the trees in the page cache instead of holding its own.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self._mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = PREAMBLE.unpack_from(self._mapping, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a model pack')
+        header = json.loads(self._mapping[PREAMBLE.size:PREAMBLE.size + header_length].decode('utf-8'))
+        if header['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model pack format {header['format_version']}")
+
+        data_start = _align(PREAMBLE.size + header_length)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            arrays[name] = np.frombuffer(
+                self._mapping, dtype=dtype, count=count, offset=data_start + spec['offset']
+            ).reshape(spec['shape'])
+
+        self.path            = path
+        self.version         = header['version']
+        self.targets         = header['targets']
+        self.feature_columns = header['feature_columns']
+        self.metadata        = header['metadata']
+        self.encoder_classes = header['encoder_classes']
+        self.forest          = CompiledForest.from_arrays(arrays, **header['forest'])
+
+
+# HELPERS
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
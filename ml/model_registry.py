@@ -0,0 +1,248 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+
+class ModelsUnavailable(Exception):
+    """No model set has been loaded yet."""
+
+
+# MODEL SET
+
+
+class ModelSet:
+    """
+    One loaded generation of models: the macro predictor with the
+    metadata, encoders and feature builder it was trained with. Never
+    modified after loading; a reload builds a new set.
+    """
+
+    def __init__(self, version, predictor, metadata, label_encoders, encoders, feature_builder):
+        self.version         = version
+        self.predictor       = predictor
+        self.metadata        = metadata
+        self.label_encoders  = label_encoders
+        self.encoders        = encoders
+        self.feature_builder = feature_builder
+        self.loaded_at       = time.time()
+        self.refs            = 0
+        self.retired         = False
+
+    def close(self):
+        """Drop the models so their memory is freed once no request holds the set."""
+        self.predictor       = None
+        self.label_encoders  = None
+        self.encoders        = None
+        self.feature_builder = None
+
+
+# MODEL REGISTRY
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelSet and swaps in new ones without a restart.
+
+    reload() calls `loader()` for a candidate set, runs `validate(set)`
+    (which raises on a bad set), switches it in atomically and calls
+    `on_swap(new, previous)`. Requests take the active set with
+    acquire(); a replaced set is only closed once the last request
+    holding it has finished.
+
+    watch() polls `watch_paths` and reloads once a change has been stable
+    for one poll, so a retrain that is still copying files is not picked
+    up halfway. request_reload() touches `trigger_path`, which every
+    process watching the same directory sees.
+    """
+
+    def __init__(self, loader, validate=None, watch_paths=(), trigger_path=None, on_swap=None, clock=time.monotonic):
+        self.loader         = loader
+        self.validate       = validate
+        self.on_swap        = on_swap
+        self.trigger_path   = trigger_path
+        self.watch_paths    = list(watch_paths) + ([trigger_path] if trigger_path else [])
+        self.clock          = clock
+        self.reloads        = 0
+        self.failed_reloads = 0
+        self.last_error     = None
+
+        self._active      = None
+        self._retiring    = []
+        self._lock        = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._fingerprint = None
+        self._pending     = None
+        self._watcher     = None
+        self._stop        = threading.Event()
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def version(self):
+        return self._active.version if self._active is not None else None
+
+    @contextmanager
+    def acquire(self):
+        """The active set, held for the duration of the block."""
+        with self._lock:
+            model_set = self._active
+            if model_set is None:
+                raise ModelsUnavailable('No models loaded')
+            model_set.refs += 1
+        try:
+            yield model_set
+        finally:
+            self._release(model_set)
+
+    def reload(self, reason='manual'):
+        """
+        Load, validate and switch to a new model set. Returns True when
+        it was switched in; on failure the current set keeps serving.
+        A reload already in progress makes this a no-op (False).
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            fingerprint = self.file_fingerprint()
+            started     = self.clock()
+            try:
+                candidate = self.loader()
+                if self.validate is not None:
+                    self.validate(candidate)
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error      = f'{type(e).__name__}: {e}'
+                self._fingerprint    = fingerprint
+                print(f"[ERROR] Model reload ({reason}) failed; keeping version {self.version}: {e}")
+                return False
+
+            previous = self.swap(candidate)
+            self._fingerprint = fingerprint
+            self.reloads     += 1
+            self.last_error   = None
+            if self.on_swap is not None:
+                self.on_swap(candidate, previous)
+            print(f"[OK] Model version {candidate.version} active ({reason}, "
+                  f"{(self.clock() - started) * 1000:.0f} ms)"
+                  + (f"; replaced {previous.version}" if previous is not None else ""))
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def swap(self, model_set):
+        """Make `model_set` active; returns the set it replaced."""
+        with self._lock:
+            previous, self._active = self._active, model_set
+            if previous is not None:
+                previous.retired = True
+                if previous.refs == 0:
+                    previous.close()
+                else:
+                    self._retiring.append(previous)
+        return previous
+
+    def request_reload(self):
+        """
+        Reload in this process now and touch the trigger file so other
+        processes watching the models directory follow.
+        """
+        if self.trigger_path:
+            try:
+                with open(self.trigger_path, 'a'):
+                    os.utime(self.trigger_path)
+            except OSError as e:
+                print(f"[WARN] Could not touch {self.trigger_path}: {e}")
+        return self.reload(reason='admin')
+
+    def check_for_changes(self):
+        """One watcher poll: reload once a changed fingerprint holds steady."""
+        fingerprint = self.file_fingerprint()
+        if self._fingerprint is None or fingerprint == self._fingerprint:
+            self._pending = None
+            return False
+        if fingerprint != self._pending:
+            self._pending = fingerprint
+            return False
+        self._pending = None
+        return self.reload(reason='files changed')
+
+    def watch(self, interval):
+        """Poll for model file changes every `interval` seconds on a daemon thread."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"[WARN] Model watcher: {e}")
+
+        self._watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reset_after_fork(self):
+        """Forked workers get their own locks; the watcher is restarted by the caller."""
+        self._lock        = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher     = None
+        self._stop        = threading.Event()
+
+    def stats(self):
+        active = self._active
+        with self._lock:
+            in_flight = {s.version: s.refs for s in [active] + self._retiring if s is not None}
+        return {
+            'active_version': active.version if active is not None else None,
+            'loaded_at':      active.loaded_at if active is not None else None,
+            'reloads':        self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'last_error':     self.last_error,
+            'reloading':      self._reload_lock.locked(),
+            'watching':       self._watcher is not None and self._watcher.is_alive(),
+            'in_flight':      in_flight,
+        }
+
+    def file_fingerprint(self):
+        return file_fingerprint(self.watch_paths)
+
+    def _release(self, model_set):
+        with self._lock:
+            model_set.refs -= 1
+            if model_set.retired and model_set.refs == 0 and model_set in self._retiring:
+                self._retiring.remove(model_set)
+                model_set.close()
+
+
+# HELPERS
+
+
+def file_fingerprint(paths):
+    """(path, mtime_ns, size) for each path, None for missing files; cheap enough to poll."""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+def files_version(paths, length=12):
+    """Content hash of the model files, identical in every process that loads them."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:length]
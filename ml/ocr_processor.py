@@ -1,13 +1,31 @@
 import os
 import re
 import io
+import copy
+import json
+import time
+import atexit
+import hashlib
+import mmap
+import threading
+import subprocess
+import multiprocessing
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
 import pytesseract
 import PyPDF2
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
 import cv2
 import numpy as np
 from fuzzywuzzy import fuzz, process
+from spooling import SpooledUpload, upload_path
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
 
 # CONFIGURATION
@@ -87,6 +105,72 @@ ALLERGY_KEYWORDS = [
     'penicillin', 'aspirin', 'sulfa'
 ]
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump whenever OCR settings or extraction logic change what a report
+# produces, so stale cached results are never served
+OCR_CONFIG_VERSION = '5'
+
+# The disk tier is opt-in: each entry is an unencrypted JSON file holding
+# the full extraction result (patient_details, diseases, allergies, lab
+# values and the first 500 characters of raw OCR text) for up to
+# OCR_CACHE_TTL_SECONDS (24 h by default). Only enable it where
+# OCR_CACHE_DIR is on storage cleared for patient data.
+OCR_CACHE_MAX_ENTRIES      = int(os.environ.get('OCR_CACHE_MAX_ENTRIES', 256))
+OCR_CACHE_TTL_SECONDS      = int(os.environ.get('OCR_CACHE_TTL_SECONDS', 24 * 60 * 60))
+OCR_CACHE_DISK             = os.environ.get('OCR_CACHE_DISK', 'false').lower() == 'true'
+OCR_CACHE_DIR              = os.environ.get('OCR_CACHE_DIR', os.path.join(BASE_DIR, 'uploads', 'ocr_cache'))
+OCR_CACHE_DISK_MAX_ENTRIES = int(os.environ.get('OCR_CACHE_DISK_MAX_ENTRIES', 2048))
+
+# Page-level OCR parallelism. OCR_WORKERS <= 1 keeps OCR in-process;
+# OCR_MAX_CONCURRENT_PAGES caps pages in flight across all requests.
+OCR_WORKERS              = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+OCR_MAX_CONCURRENT_PAGES = int(os.environ.get('OCR_MAX_CONCURRENT_PAGES', max(1, OCR_WORKERS)))
+OCR_POOL_START_METHOD    = os.environ.get('OCR_POOL_START_METHOD', 'spawn')
+
+# Scanned PDFs are rasterised a window of pages at a time; pages past
+# OCR_PDF_MAX_PAGES are not OCR'd
+OCR_PDF_DPI         = int(os.environ.get('OCR_PDF_DPI', 200))
+OCR_PDF_MAX_PAGES   = int(os.environ.get('OCR_PDF_MAX_PAGES', 50))
+OCR_PDF_PAGE_WINDOW = int(os.environ.get('OCR_PDF_PAGE_WINDOW', max(1, OCR_WORKERS)))
+
+# A PDF page whose embedded text layer has fewer characters than this is
+# treated as scanned and OCR'd
+OCR_PDF_TEXT_MIN_CHARS = int(os.environ.get('OCR_PDF_TEXT_MIN_CHARS', 50))
+
+# 'exhaustive' OCRs every page; 'early_exit' stops once every field in
+# OCR_REQUIRED_FIELDS has been extracted from the pages read so far
+OCR_EXTRACTION_POLICY = os.environ.get('OCR_EXTRACTION_POLICY', 'exhaustive').lower()
+OCR_REQUIRED_FIELDS   = [
+    f.strip() for f in os.environ.get(
+        'OCR_REQUIRED_FIELDS',
+        'name,age,blood_pressure_systolic,total_cholesterol,blood_sugar,hba1c'
+    ).split(',') if f.strip()
+]
+
+
+# 'adaptive' measures each page and only denoises when it needs it;
+# 'legacy' always runs full-resolution NL-means on the binarised page
+OCR_PREPROCESS_MODE = os.environ.get('OCR_PREPROCESS_MODE', 'adaptive').lower()
+OCR_TARGET_DPI      = int(os.environ.get('OCR_TARGET_DPI', 300))
+OCR_DESKEW          = os.environ.get('OCR_DESKEW', 'true').lower() == 'true'
+
+# 'auto' uses an in-process tesserocr handle when installed, else pipes
+# images to the tesseract CLI; 'pytesseract' keeps the temp-file path
+OCR_ENGINE      = os.environ.get('OCR_ENGINE', 'auto').lower()
+OCR_LANG        = os.environ.get('OCR_LANG', 'eng')
+OCR_CLI_TIMEOUT = float(os.environ.get('OCR_CLI_TIMEOUT', 120))
+
+# 'regions' OCRs only detected text blocks, 'page' the whole page,
+# 'auto' uses regions for images of at least OCR_REGION_MIN_PIXELS
+OCR_LAYOUT            = os.environ.get('OCR_LAYOUT', 'auto').lower()
+OCR_REGION_MIN_PIXELS = int(os.environ.get('OCR_REGION_MIN_PIXELS', 4_000_000))
+OCR_MAX_REGIONS       = int(os.environ.get('OCR_MAX_REGIONS', 40))
+
+# Estimated noise sigma (grey levels) above which median / NL-means run
+OCR_NOISE_MEDIAN  = float(os.environ.get('OCR_NOISE_MEDIAN', 4.0))
+OCR_NOISE_NLMEANS = float(os.environ.get('OCR_NOISE_NLMEANS', 10.0))
+
 
 # TESSERACT PATH CONFIGURATION
 
@@ -117,28 +201,669 @@ def setup_tesseract():
 setup_tesseract()
 
 
+# OCR ENGINES
+
+
+class TesseractUnavailable(RuntimeError):
+    """No usable Tesseract installation was found."""
+
+
+class OCREngine:
+    """Runs Tesseract on a page. One long-lived instance per process."""
+
+    name = 'base'
+
+    def __init__(self):
+        self._version = None
+
+    def version(self):
+        """Tesseract version, looked up once per process."""
+        if self._version is None:
+            self._version = self._detect_version()
+        return self._version
+
+    def image_to_string(self, image, config=''):
+        raise NotImplementedError
+
+    def _detect_version(self):
+        raise NotImplementedError
+
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process tesserocr API handles, initialised once and reused for
+    every page. Handles aren't thread-safe, so each thread gets its own.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, lang=None):
+        super().__init__()
+        self.lang   = lang or OCR_LANG
+        self._local = threading.local()
+
+    def _api(self, oem):
+        handles = getattr(self._local, 'handles', None)
+        if handles is None:
+            handles = self._local.handles = {}
+        if oem not in handles:
+            kwargs = {'lang': self.lang}
+            if oem is not None:
+                kwargs['oem'] = oem
+            handles[oem] = tesserocr.PyTessBaseAPI(**kwargs)
+        return handles[oem]
+
+    def image_to_string(self, image, config=''):
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        psm, oem, variables = parse_tesseract_config(config)
+        api = self._api(oem)
+        api.SetPageSegMode(psm if psm is not None else tesserocr.PSM.AUTO)
+        for name, value in variables.items():
+            api.SetVariable(name, value)
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def _detect_version(self):
+        return tesserocr.tesseract_version().split()[1]
+
+
+class TesseractCLIEngine(OCREngine):
+    """
+    The tesseract binary fed over stdin/stdout: the page is piped in as
+    an uncompressed PNM, so nothing is written to temp files.
+    """
+
+    name = 'cli'
+
+    def __init__(self, cmd=None, lang=None, timeout=None):
+        super().__init__()
+        self.cmd     = cmd or pytesseract.pytesseract.tesseract_cmd
+        self.lang    = lang or OCR_LANG
+        self.timeout = timeout or OCR_CLI_TIMEOUT
+
+    def image_to_string(self, image, config=''):
+        args = [self.cmd, 'stdin', 'stdout', '-l', self.lang, *config.split()]
+        try:
+            process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as e:
+            raise TesseractUnavailable(f'tesseract not found at {self.cmd!r}') from e
+
+        try:
+            # Arrays are written straight from their buffer, PIL images via PNM encode
+            if isinstance(image, np.ndarray):
+                header, pixels = _pnm_header(image), memoryview(np.ascontiguousarray(image)).cast('B')
+                process.stdin.write(header)
+                process.stdin.write(pixels)
+            else:
+                if image.mode not in ('1', 'L', 'RGB'):
+                    image = image.convert('RGB')
+                image.save(process.stdin, format='PPM')
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except BrokenPipeError:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+
+        if process.returncode != 0:
+            raise RuntimeError(f"tesseract failed: {stderr.decode(errors='replace').strip()}")
+        return stdout.decode('utf-8', errors='replace')
+
+    def _detect_version(self):
+        try:
+            completed = subprocess.run([self.cmd, '--version'], capture_output=True, timeout=30)
+        except FileNotFoundError as e:
+            raise TesseractUnavailable(f'tesseract not found at {self.cmd!r}') from e
+        output = (completed.stdout or completed.stderr).decode(errors='replace')
+        return output.split()[1] if len(output.split()) > 1 else output.strip()
+
+
+class PytesseractEngine(OCREngine):
+    """The original pytesseract path (temp file + process per call)."""
+
+    name = 'pytesseract'
+
+    def image_to_string(self, image, config=''):
+        return pytesseract.image_to_string(image, config=config)
+
+    def _detect_version(self):
+        try:
+            return str(pytesseract.get_tesseract_version())
+        except pytesseract.TesseractNotFoundError as e:
+            raise TesseractUnavailable(str(e)) from e
+
+
+def _pnm_header(array):
+    """PGM (greyscale) or PPM (RGB) header for a uint8 array."""
+    height, width = array.shape[:2]
+    magic = b'P5' if array.ndim == 2 else b'P6'
+    return magic + f'\n{width} {height}\n255\n'.encode()
+
+
+OCR_ENGINES = {
+    'tesserocr':   TesserocrEngine,
+    'cli':         TesseractCLIEngine,
+    'pytesseract': PytesseractEngine,
+}
+
+_ocr_engine      = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine():
+    """The process-wide OCR engine, created on first use."""
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            name = OCR_ENGINE
+            if name == 'auto':
+                name = 'tesserocr' if tesserocr is not None else 'cli'
+            if name == 'tesserocr' and tesserocr is None:
+                print("  [WARN] OCR_ENGINE=tesserocr but tesserocr is not installed; using the CLI engine")
+                name = 'cli'
+            if name not in OCR_ENGINES:
+                raise ValueError(f'Unknown OCR_ENGINE {OCR_ENGINE!r}; expected auto or one of {sorted(OCR_ENGINES)}')
+            _ocr_engine = OCR_ENGINES[name]()
+        return _ocr_engine
+
+
+def parse_tesseract_config(config):
+    """Split a CLI-style config ('--psm 6 --oem 1 -c k=v') into (psm, oem, variables)."""
+    psm, oem, variables = None, None, {}
+    tokens = config.split()
+    for i, token in enumerate(tokens[:-1]):
+        value = tokens[i + 1]
+        if token == '--psm':
+            psm = int(value)
+        elif token == '--oem':
+            oem = int(value)
+        elif token == '-c' and '=' in value:
+            name, _, setting = value.partition('=')
+            variables[name] = setting
+    return psm, oem, variables
+
+
 # IMAGE PREPROCESSING
 
 
-def preprocess_image(image):
+def preprocess_image(image, dpi=None):
+    """Preprocessed page as a PIL image; see preprocess_image_with_report."""
+    processed, _ = preprocess_image_with_report(image, dpi)
+    return processed
 
-    # Convert PIL Image to numpy array
-    img_array = np.array(image)
-    
-    # Convert to grayscale if needed
-    if len(img_array.shape) == 3:
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+
+def preprocess_image_with_report(image, dpi=None):
+    """PIL-in, PIL-out wrapper around preprocess_array."""
+    processed, report = preprocess_array(np.asarray(image), dpi or _image_dpi(image))
+    return Image.fromarray(processed), report
+
+
+def preprocess_array(img_array, dpi=None, inplace=False):
+    """
+    Greyscale, rescale to OCR_TARGET_DPI, deskew, binarise and denoise a
+    page. The denoising stage is picked from cheap quality metrics:
+
+        noise <  OCR_NOISE_MEDIAN   -> none
+        noise <  OCR_NOISE_NLMEANS  -> 3x3 median (skipped on blurry pages)
+        otherwise                   -> NL-means at half resolution
+
+    Works on a single uint8 buffer: with inplace=True a greyscale input
+    is binarised in place instead of copied, so an upload decoded
+    straight to greyscale stays one array from decode to OCR.
+
+    Returns (array, report) where report holds the quality metrics,
+    chosen stages and per-stage timings in milliseconds.
+    """
+    report  = {'mode': OCR_PREPROCESS_MODE, 'timings_ms': {}}
+    timings = report['timings_ms']
+
+    start = time.perf_counter()
+    gray  = _to_gray(img_array)
+    owned = inplace or gray is not img_array
+    timings['grayscale'] = _ms_since(start)
+
+    if OCR_PREPROCESS_MODE == 'legacy':
+        start = time.perf_counter()
+        _, threshold = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        timings['threshold'] = _ms_since(start)
+
+        start = time.perf_counter()
+        denoised = cv2.fastNlMeansDenoising(threshold, None, 10, 7, 21)
+        timings['denoise'] = _ms_since(start)
+        report['denoise']  = 'nlmeans_full'
+        return denoised, report
+
+    start = time.perf_counter()
+    resized, scale = _resize_to_target_dpi(gray, dpi)
+    owned = owned or resized is not gray
+    gray  = resized
+    timings['resize'] = _ms_since(start)
+    report['scale']   = round(scale, 3)
+
+    # Measured before deskewing, whose interpolation smooths the noise away
+    start   = time.perf_counter()
+    quality = measure_image_quality(gray)
+    timings['quality'] = _ms_since(start)
+    report['quality']  = quality
+
+    if OCR_DESKEW:
+        start = time.perf_counter()
+        gray, angle = _deskew(gray)
+        owned = owned or angle != 0.0
+        timings['deskew']    = _ms_since(start)
+        report['skew_angle'] = angle
+
+    # Stretch washed-out scans before Otsu picks a threshold
+    if quality['contrast'] < 100:
+        gray  = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+        owned = True
+
+    start = time.perf_counter()
+    flags = cv2.THRESH_BINARY + cv2.THRESH_OTSU
+    if owned and gray.flags.writeable and gray.flags.c_contiguous:
+        _, threshold = cv2.threshold(gray, 0, 255, flags, dst=gray)
     else:
-        gray = img_array
-    
-    # Apply thresholding to get black text on white background
-    _, threshold = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    # Denoise
-    denoised = cv2.fastNlMeansDenoising(threshold, None, 10, 7, 21)
-    
-    # Convert back to PIL Image
-    return Image.fromarray(denoised)
+        _, threshold = cv2.threshold(gray, 0, 255, flags)
+    timings['threshold'] = _ms_since(start)
+
+    start  = time.perf_counter()
+    method = choose_denoise(quality)
+    if method == 'median':
+        threshold = cv2.medianBlur(threshold, 3)
+    elif method == 'nlmeans':
+        threshold = _nlmeans_downscaled(threshold)
+    timings['denoise'] = _ms_since(start)
+    report['denoise']  = method
+
+    return threshold, report
+
+
+def measure_image_quality(gray):
+    """
+    Cheap page-quality metrics on a greyscale page:
+
+    noise    - Immerkaer noise sigma, taken from the quietest full-resolution
+               tiles so text edges don't count as noise
+    blur     - variance of the Laplacian on a downscaled copy (low = blurry)
+    contrast - spread between the darkest and lightest grey levels
+               (0.1th to 99.9th percentile)
+    """
+    small     = _downscale(gray, 1000)
+    low, high = np.percentile(small, [0.1, 99.9])
+    return {
+        'noise':    round(_tile_noise_sigma(gray), 2),
+        'blur':     round(float(cv2.Laplacian(small, cv2.CV_64F).var()), 1),
+        'contrast': round(float(high - low), 1),
+    }
+
+
+def choose_denoise(quality):
+    if quality['noise'] < OCR_NOISE_MEDIAN:
+        return 'none'
+    if quality['noise'] < OCR_NOISE_NLMEANS:
+        # A median filter would only soften an already blurry page further
+        return 'none' if quality['blur'] < 100 else 'median'
+    return 'nlmeans'
+
+
+def load_image_gray(source):
+    """
+    Decode an image upload (path, SpooledUpload or file object) straight
+    to one greyscale uint8 array, reading the file through mmap.
+    Returns (array, dpi or None).
+    """
+    with upload_path(source, '.png') as path:
+        with open(path, 'rb') as handle:
+            header = Image.open(handle)
+            dpi    = _image_dpi(header)
+            header.close()
+
+        gray = None
+        if os.path.getsize(path):
+            with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                encoded = np.frombuffer(mapping, dtype=np.uint8)
+                gray    = cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE)
+                del encoded
+
+        if gray is None:
+            # Formats OpenCV can't decode
+            with Image.open(path) as image:
+                gray = np.array(image.convert('L'))
+    return gray, dpi
+
+
+def format_preprocess_report(report):
+    """One-line summary of a preprocessing report for the log."""
+    stages = ', '.join(f"{stage} {ms:.1f}ms" for stage, ms in report['timings_ms'].items())
+    return f"denoise={report.get('denoise')} skew={report.get('skew_angle', 0)} | {stages}"
+
+
+def _to_gray(img_array):
+    if img_array.ndim == 3:
+        code = cv2.COLOR_RGBA2GRAY if img_array.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        return cv2.cvtColor(img_array, code)
+    if img_array.dtype == bool:
+        return img_array.astype(np.uint8) * 255
+    return img_array
+
+
+def _image_dpi(image):
+    dpi = getattr(image, 'info', {}).get('dpi')
+    if not dpi:
+        return None
+    try:
+        return float(dpi[0])
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _resize_to_target_dpi(gray, dpi):
+    """Upscale low-DPI pages (at most 2x) and shrink oversampled ones."""
+    if not dpi or dpi <= 1:
+        return gray, 1.0
+    scale = OCR_TARGET_DPI / dpi
+    if 1 / 1.5 <= scale <= 1.25:
+        return gray, 1.0
+    scale  = min(scale, 2.0)
+    interp = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interp), scale
+
+
+def _deskew(gray, max_angle=10.0):
+    """
+    Straighten a page rotated by up to `max_angle` degrees. The angle is
+    the one whose horizontal projection profile of a downscaled,
+    inverted page has the sharpest row-to-row changes (text lines level).
+    """
+    small = _downscale(gray, 600)
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    height, width = ink.shape
+    center = (width / 2, height / 2)
+
+    def score(angle):
+        matrix  = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST)
+        profile = rotated.sum(axis=1, dtype=np.float64)
+        return float(np.sum(np.diff(profile) ** 2))
+
+    coarse = max(np.arange(-max_angle, max_angle + 0.01, 1.0), key=score)
+    angle  = float(max(np.arange(coarse - 0.8, coarse + 0.81, 0.2), key=score))
+    angle  = round(angle, 1)
+    if abs(angle) < 0.5:
+        return gray, 0.0
+
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    rotated = cv2.warpAffine(gray, matrix, (width, height),
+                             flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return rotated, angle
+
+
+def _tile_noise_sigma(gray, tiles=4, size=128):
+    height, width = gray.shape
+    if height < size or width < size:
+        return _noise_sigma(gray)
+    ys = np.linspace(0, height - size, tiles).astype(int)
+    xs = np.linspace(0, width - size, tiles).astype(int)
+    estimates = sorted(_noise_sigma(gray[y:y + size, x:x + size]) for y in ys for x in xs)
+    return estimates[len(estimates) // 4]
+
+
+def _noise_sigma(gray):
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return 0.0
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = cv2.filter2D(gray.astype(np.float32), -1, kernel)[1:-1, 1:-1]
+    return float(np.sqrt(np.pi / 2) * np.abs(response).sum() / (6 * (width - 2) * (height - 2)))
+
+
+def _nlmeans_downscaled(binary):
+    """NL-means at half resolution (about 4x cheaper), then re-binarised."""
+    height, width = binary.shape
+    small    = cv2.resize(binary, (max(1, width // 2), max(1, height // 2)), interpolation=cv2.INTER_AREA)
+    denoised = cv2.fastNlMeansDenoising(small, None, 10, 7, 21)
+    restored = cv2.resize(denoised, (width, height), interpolation=cv2.INTER_LINEAR)
+    _, binary = cv2.threshold(restored, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def _downscale(gray, max_side):
+    scale = max_side / max(gray.shape)
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def _ms_since(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+# PARALLEL OCR
+
+
+_ocr_pool       = None
+_ocr_pool_lock  = threading.Lock()
+_ocr_page_slots = threading.BoundedSemaphore(max(1, OCR_MAX_CONCURRENT_PAGES))
+
+
+def ocr_page(image, config=''):
+    """Preprocess and OCR a single page image. Runs inside pool workers."""
+    processed_image, report = preprocess_image_with_report(image)
+    print(f"  Preprocessed page: {format_preprocess_report(report)}")
+    return get_ocr_engine().image_to_string(processed_image, config=config)
+
+
+def get_ocr_pool():
+    """Process pool shared by every request, created on first use."""
+    global _ocr_pool
+    if OCR_WORKERS <= 1:
+        return None
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context(OCR_POOL_START_METHOD)
+            )
+        return _ocr_pool
+
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            _ocr_pool = None
+
+atexit.register(shutdown_ocr_pool)
+
+
+def reset_ocr_pool_after_fork():
+    """Forget the pool and OCR engine inherited from the parent; the child makes its own on demand."""
+    global _ocr_pool, _ocr_pool_lock, _ocr_engine, _ocr_engine_lock
+    _ocr_pool        = None
+    _ocr_pool_lock   = threading.Lock()
+    _ocr_engine      = None
+    _ocr_engine_lock = threading.Lock()
+
+
+def ocr_region(image, config=''):
+    """OCR an already preprocessed crop. Runs inside pool workers."""
+    return get_ocr_engine().image_to_string(image, config=config)
+
+
+def ocr_pages(images, config='', worker=None):
+    """
+    OCR several page images, fanning them out across the process pool.
+    Returns the texts in page order. A global semaphore bounds the
+    number of pages queued or running, so concurrent requests share the
+    pool instead of oversubscribing the CPU. `worker` defaults to
+    ocr_page; pass ocr_region for crops that are already preprocessed.
+    """
+    worker = worker or ocr_page
+    images = list(images)
+    pool = get_ocr_pool()
+    if pool is None or len(images) == 0:
+        return [worker(image, config) for image in images]
+
+    futures = []
+    try:
+        for image in images:
+            _ocr_page_slots.acquire()
+            try:
+                future = pool.submit(worker, image, config)
+            except BaseException:
+                _ocr_page_slots.release()
+                raise
+            future.add_done_callback(lambda _: _ocr_page_slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    except BrokenProcessPool:
+        print("  [WARN] OCR worker pool crashed; restarting it and OCR'ing in-process")
+        shutdown_ocr_pool()
+        return [worker(image, config) for image in images]
+
+
+# LAYOUT ANALYSIS
+
+
+# Words that mark the parts of a report the extractors read
+REGION_KEYWORDS = [
+    'name', 'patient', 'age', 'sex', 'gender', 'height', 'weight', 'bmi',
+    'cholesterol', 'ldl', 'hdl', 'triglyceride', 'glucose', 'sugar', 'fbs',
+    'hba1c', 'a1c', 'blood pressure', 'bp', 'allerg', 'diagnosis', 'creatinine',
+    'hemoglobin', 'haemoglobin', 'vitamin',
+]
+REGION_KEYWORD_PATTERN = re.compile(r'\b(?:' + '|'.join(map(re.escape, REGION_KEYWORDS)) + ')', re.IGNORECASE)
+
+
+def detect_text_regions(binary, max_regions=None):
+    """
+    Bounding boxes (x, y, w, h) of text blocks on a binarised page (dark
+    text on white). Words are smeared into lines and lines into blocks
+    with a morphological close; blobs too small to be text or too dense
+    to be text (photos, logos, filled boxes) are dropped.
+
+    Blocks that share a row band are merged, so a table whose label and
+    value columns are detected apart is OCR'd as one block with each
+    label still next to its value. Boxes come back in layout priority:
+    the header band first, then top-to-bottom, left-to-right reading
+    order.
+    """
+    max_regions = max_regions or OCR_MAX_REGIONS
+    height, width = binary.shape
+    ink = (binary < 128).astype(np.uint8) * 255
+
+    kernel  = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 40), max(3, height // 100)))
+    blocks  = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    pad   = max(4, min(width, height) // 200)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 16 or h < 8:
+            continue
+        fill = cv2.countNonZero(ink[y:y + h, x:x + w]) / float(w * h)
+        if fill < 0.02 or fill > 0.6:
+            continue
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        boxes.append((x0, y0, min(width, x + w + pad) - x0, min(height, y + h + pad) - y0))
+
+    boxes = merge_row_bands(boxes)
+    if len(boxes) > max_regions:
+        return []
+
+    header_band = height * 0.2
+    return sorted(boxes, key=lambda b: (b[1] >= header_band, b[1] // max(1, height // 50), b[0]))
+
+
+def merge_row_bands(boxes, min_overlap=0.5):
+    """
+    Union boxes whose vertical extents overlap by at least `min_overlap`
+    of the shorter box, repeated until no two boxes share a row band.
+    """
+    merged = sorted(boxes, key=lambda b: b[1])
+    changed = True
+    while changed:
+        changed = False
+        out = []
+        for box in merged:
+            for i, other in enumerate(out):
+                overlap = min(box[1] + box[3], other[1] + other[3]) - max(box[1], other[1])
+                if overlap >= min_overlap * min(box[3], other[3]):
+                    x0, y0 = min(box[0], other[0]), min(box[1], other[1])
+                    x1 = max(box[0] + box[2], other[0] + other[2])
+                    y1 = max(box[1] + box[3], other[1] + other[3])
+                    out[i]  = (x0, y0, x1 - x0, y1 - y0)
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+    return merged
+
+
+def region_keyword_score(text):
+    return len(REGION_KEYWORD_PATTERN.findall(text))
+
+
+def order_region_texts(texts):
+    """Region texts with the most report keywords first (stable for ties)."""
+    ranked = sorted(enumerate(texts), key=lambda item: -region_keyword_score(item[1]))
+    return [text for _, text in ranked if text.strip()]
+
+
+def ocr_image_regions(processed_image, config='--psm 6', policy=None, required_fields=None):
+    """
+    OCR only the text blocks of a preprocessed page, in parallel, and
+    join them keyword-richest first so extract_medical_info sees the
+    header, lab table and allergy section ahead of boilerplate.
+
+    Returns None when no usable layout was found, so the caller can OCR
+    the whole page instead. With policy='early_exit' regions are OCR'd a
+    pool-width at a time in layout order and the rest are skipped once
+    every required field has been found.
+    """
+    policy          = (policy or OCR_EXTRACTION_POLICY).lower()
+    required_fields = set(required_fields or OCR_REQUIRED_FIELDS)
+    binary = processed_image if isinstance(processed_image, np.ndarray) else np.asarray(processed_image)
+    boxes  = detect_text_regions(binary)
+    if not boxes:
+        return None
+
+    region_pixels = sum(w * h for _, _, w, h in boxes)
+    print(f"  Layout: {len(boxes)} text region(s), "
+          f"{100.0 * region_pixels / binary.size:.0f}% of the page")
+
+    crops  = [Image.fromarray(binary[y:y + h, x:x + w]) for x, y, w, h in boxes]
+    batch  = len(crops) if policy != 'early_exit' else max(1, OCR_WORKERS)
+    texts  = []
+    found  = set()
+    for start in range(0, len(crops), batch):
+        batch_texts = ocr_pages(crops[start:start + batch], config, worker=ocr_region)
+        texts.extend(batch_texts)
+        if policy == 'early_exit' and start + batch < len(crops):
+            found |= report_fields_found("\n".join(batch_texts))
+            if required_fields <= found:
+                print(f"  [OK] All required fields found after {len(texts)} of {len(crops)} region(s)")
+                break
+
+    return "\n".join(order_region_texts(texts))
+
+
+def use_region_layout(image_size):
+    if OCR_LAYOUT == 'regions':
+        return True
+    if OCR_LAYOUT == 'auto':
+        return image_size[0] * image_size[1] >= OCR_REGION_MIN_PIXELS
+    return False
 
 
 # TEXT EXTRACTION
@@ -146,19 +871,16 @@ def preprocess_image(image):
 
 def extract_text_from_image(image_file):
     """
-    Extract text from image file using OCR
+    Extract text from image file using OCR. `image_file` may be a path,
+    a SpooledUpload or a file object; the page is decoded once to a
+    greyscale array that is preprocessed and OCR'd without further copies.
     """
     try:
-        print("\n→ Opening image file...")
-        # Open image
-        image = Image.open(image_file)
-        print(f"  Image size: {image.size}")
-        print(f"  Image mode: {image.mode}")
-        
         # Check if Tesseract is available
         try:
-            version = pytesseract.get_tesseract_version()
-            print(f"  Tesseract version: {version}")
+            engine  = get_ocr_engine()
+            version = engine.version()
+            print(f"  Tesseract version: {version} ({engine.name} engine)")
         except Exception as e:
             print(f"  [WARN]  WARNING: Tesseract not found!")
             print(f"     Error: {str(e)}")
@@ -167,14 +889,24 @@ def extract_text_from_image(image_file):
             print(f"       Mac: brew install tesseract")
             print(f"       Linux: sudo apt-get install tesseract-ocr")
             return ""
+
+        print("\n→ Opening image file...")
+        gray, dpi = load_image_gray(image_file)
+        print(f"  Image size: {gray.shape[1]}x{gray.shape[0]} (decoded to greyscale)")
         
         print("\n→ Preprocessing image...")
         # Preprocess for better OCR
-        processed_image = preprocess_image(image)
+        processed, report = preprocess_array(gray, dpi, inplace=True)
+        print(f"  Quality: {report.get('quality')}")
+        print(f"  {format_preprocess_report(report)}")
         
         print("\n→ Running Tesseract OCR...")
-        # Extract text using Tesseract
-        text = pytesseract.image_to_string(processed_image, config='--psm 6')
+        # Large pages: OCR just the text blocks; fall back to the whole page
+        text = None
+        if use_region_layout((processed.shape[1], processed.shape[0])):
+            text = ocr_image_regions(processed)
+        if not text or len(text.strip()) < 10:
+            text = engine.image_to_string(processed, config='--psm 6')
         
         print(f"\n✓ Extracted {len(text)} characters")
         if len(text) > 0:
@@ -193,43 +925,162 @@ def extract_text_from_image(image_file):
         traceback.print_exc()
         return ""
 
-def extract_text_from_pdf(pdf_file):
+def iter_pdf_page_windows(pdf_path, dpi=None, window=None, max_pages=None, pages=None):
+    """
+    Rasterise a PDF a few pages at a time. Yields (page_numbers, images)
+    for at most `window` pages; each window is rendered only after the
+    caller has finished with the previous one. `pages` (1-based) limits
+    rendering to those pages, e.g. just the scanned ones.
+    """
+    dpi       = dpi or OCR_PDF_DPI
+    window    = max(1, window or OCR_PDF_PAGE_WINDOW)
+    max_pages = max_pages or OCR_PDF_MAX_PAGES
+
+    if pages is None:
+        pages = range(1, int(pdfinfo_from_path(pdf_path).get('Pages', 0)) + 1)
+    pages = sorted(pages)
+    if len(pages) > max_pages:
+        print(f"  [WARN] {len(pages)} pages need OCR; only the first {max_pages} will be OCR'd")
+        pages = pages[:max_pages]
+
+    for start in range(0, len(pages), window):
+        page_numbers = pages[start:start + window]
+        images = []
+        for first_page, last_page in _page_runs(page_numbers):
+            images.extend(convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page))
+        yield page_numbers, images
+
+
+def _page_runs(page_numbers):
+    """Consecutive (first, last) runs in a sorted page list: [1, 2, 3, 7] -> (1, 3), (7, 7)."""
+    runs = []
+    for page in page_numbers:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return [tuple(run) for run in runs]
 
+
+def report_fields_found(text):
+    """Names of the patient-detail and lab-value fields present in `text`."""
+    text_lower = text.lower()
+    return set(_extract_patient_details(text_lower)) | set(_extract_numerical_values(text_lower))
+
+
+def ocr_pdf_file(pdf_file, policy=None, required_fields=None):
+    """
+    OCR an image-based PDF page window by page window. `pdf_file` is a
+    path, a SpooledUpload or a file object (spooled to a temp file once).
+    """
+    with upload_path(pdf_file, '.pdf') as pdf_path:
+        page_texts = ocr_pdf_pages(pdf_path, policy=policy, required_fields=required_fields)
+        return "\n".join(page_texts.values()).strip()
+
+
+def ocr_pdf_pages(pdf_path, pages=None, policy=None, required_fields=None, found_fields=None):
+    """
+    OCR `pages` of a PDF on disk (all pages when None) a window at a time,
+    in parallel within each window. Every window's images are released
+    before the next is rendered. Returns {page_number: text} in page order.
+
+    With policy='early_exit' the extractors run after every window and
+    OCR stops as soon as all `required_fields` have been found, counting
+    any `found_fields` already seen elsewhere (e.g. on text-layer pages).
+    """
+    policy          = (policy or OCR_EXTRACTION_POLICY).lower()
+    required_fields = set(required_fields or OCR_REQUIRED_FIELDS)
+    found_fields    = set(found_fields or ())
+
+    page_texts = OrderedDict()
+    if policy == 'early_exit' and required_fields <= found_fields:
+        return page_texts
+
+    for page_numbers, images in iter_pdf_page_windows(pdf_path, pages=pages):
+        print(f"  OCR'ing page(s) {', '.join(map(str, page_numbers))} "
+              f"on {max(1, OCR_WORKERS)} OCR worker(s)...")
+        texts = ocr_pages(images)
+        page_texts.update(zip(page_numbers, texts))
+        for image in images:
+            image.close()
+        del images
+
+        if policy == 'early_exit':
+            found_fields |= report_fields_found("\n".join(texts))
+            if required_fields <= found_fields:
+                print(f"  [OK] All required fields found after {len(page_texts)} OCR'd page(s); skipping the rest")
+                break
+    return page_texts
+
+
+def extract_text_from_pdf(pdf_file, page_report=None):
+    """
+    Text of a PDF, page by page: pages with an embedded text layer of at
+    least OCR_PDF_TEXT_MIN_CHARS characters use it, and only the other
+    pages are rasterised and OCR'd (in parallel). When `page_report` is a
+    list, one {'page', 'source', 'chars'} entry per page is appended,
+    with source 'text', 'ocr', 'skipped' (over the OCR page cap, or
+    not needed under the early-exit policy) or 'failed' (rasterising or
+    OCR raised; the text-layer pages are still returned).
+    """
     try:
-        # Try reading as text-based PDF first
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        # If we got substantial text, return it
-        if len(text.strip()) > 100:
-            return text.strip()
-        
-        # Otherwise, PDF is image-based, use OCR
-        print("PDF appears to be image-based, using OCR...")
-        pdf_file.seek(0)  # Reset file pointer
-        
-        # Convert PDF pages to images
-        images = convert_from_bytes(pdf_file.read())
-        
-        text = ""
-        for i, image in enumerate(images):
-            print(f"  Processing page {i+1}/{len(images)}...")
-            processed_image = preprocess_image(image)
-            page_text = pytesseract.image_to_string(processed_image)
-            text += page_text + "\n"
-        
-        return text.strip()
+        with upload_path(pdf_file, '.pdf') as pdf_path:
+            # Text layer first, parsing from an mmap of the file
+            with open(pdf_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                pdf_reader  = PyPDF2.PdfReader(mapping)
+                layer_texts = [page.extract_text() or '' for page in pdf_reader.pages]
+                del pdf_reader
+
+            text_pages = {
+                number: text for number, text in enumerate(layer_texts, start=1)
+                if len(text.strip()) >= OCR_PDF_TEXT_MIN_CHARS
+            }
+            scanned = [number for number in range(1, len(layer_texts) + 1) if number not in text_pages]
+
+            ocr_texts  = {}
+            ocr_failed = False
+            if scanned:
+                print(f"  {len(text_pages)} page(s) have a text layer; "
+                      f"{len(scanned)} scanned page(s) need OCR")
+                found = set()
+                if OCR_EXTRACTION_POLICY == 'early_exit':
+                    found = report_fields_found("\n".join(text_pages.values()))
+                try:
+                    ocr_texts = ocr_pdf_pages(pdf_path, pages=scanned, found_fields=found)
+                except Exception as e:
+                    print(f"  [WARN] OCR of scanned pages failed; keeping the text-layer pages: {e}")
+                    ocr_failed = True
+
+            parts   = []
+            sources = []
+            for number in range(1, len(layer_texts) + 1):
+                if number in text_pages:
+                    source, page_text = 'text', text_pages[number]
+                elif number in ocr_texts:
+                    source, page_text = 'ocr', ocr_texts[number]
+                elif ocr_failed:
+                    source, page_text = 'failed', ''
+                else:
+                    source, page_text = 'skipped', ''
+                if page_text.strip():
+                    parts.append(page_text)
+                sources.append(f"{number}:{source}")
+                if page_report is not None:
+                    page_report.append({'page': number, 'source': source, 'chars': len(page_text.strip())})
+
+            print("  Page sources: " + ", ".join(sources))
+            return "\n".join(parts).strip()
     
     except Exception as e:
         print(f"Error extracting text from PDF: {str(e)}")
         return ""
 
-def extract_text_from_file(file):
+def extract_text_from_file(file, page_report=None):
+
+    # Spool once; every reader below works from the spooled file
+    if not isinstance(file, SpooledUpload):
+        with SpooledUpload(file) as upload:
+            return extract_text_from_file(upload, page_report)
 
     filename = file.filename.lower()
     
@@ -237,11 +1088,8 @@ def extract_text_from_file(file):
     print(f"Extracting text from: {file.filename}")
     print(f"{'='*50}")
     
-    # Reset file pointer
-    file.seek(0)
-    
     if filename.endswith('.pdf'):
-        text = extract_text_from_pdf(file)
+        text = extract_text_from_pdf(file, page_report)
     elif filename.endswith(('.jpg', '.jpeg', '.png')):
         text = extract_text_from_image(file)
     else:
@@ -252,162 +1100,285 @@ def extract_text_from_file(file):
     return text
 
 
+# EXTRACTION PATTERNS
+
+
+class FieldPattern:
+    """
+    Prioritised regex alternatives for one field, compiled once at import.
+
+    Alternatives are searched one after another rather than as a single
+    combined alternation: CPython's re engine jumps straight to a literal
+    prefix such as 'cholesterol', which a combined pattern disables, and
+    measured 10-35x slower on long reports. Each search is a linear scan,
+    and later alternatives are only tried when the caller asks for them.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = [re.compile(p, flags) for p in patterns]
+
+    def iter_matches(self, text_lower):
+        """First match of each alternative, in priority order."""
+        for index, pattern in enumerate(self.patterns):
+            match = pattern.search(text_lower)
+            if match:
+                yield index, match.groups()
+
+    def first_match(self, text_lower):
+        return next(self.iter_matches(text_lower), (None, None))
+
+    def iter_all(self, text_lower):
+        """Every match of every alternative, pattern by pattern."""
+        for index, pattern in enumerate(self.patterns):
+            for match in pattern.finditer(text_lower):
+                yield index, match.groups()
+
+
+NAME_PATTERN = FieldPattern([
+    r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|$)',
+    r'patient\s*name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+    r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+    r'patient\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+    r'mr\.\s*([a-zA-Z]+)',
+    r'mrs\.\s*([a-zA-Z]+)',
+    r'ms\.\s*([a-zA-Z]+)',
+], re.IGNORECASE)
+
+AGE_PATTERN = FieldPattern([
+    r'age\s*[-:–]?\s*(\d{1,3})\s*(?:years?|yrs?)?',
+    r'(\d{1,3})\s*(?:years?|yrs?)\s*old',
+    r'age\s*[-:–]\s*(\d{1,3})',
+    r'[-–]\s*(\d{1,3})\s*years?',  # Handles "- 56 years"
+])
+
+GENDER_PATTERN = FieldPattern([
+    r'gender\s*:?\s*(male|female|m\/f|m|f)',
+    r'sex\s*:?\s*(male|female|m\/f|m|f)',
+    r'\b(male|female)\b',
+])
+
+HEIGHT_PATTERN = FieldPattern([
+    r'height\s*:?\s*(\d{2,3})\s*cm',
+    r'height\s*:?\s*(\d)\s*[\']\s*(\d{1,2})',  # feet'inches
+])
+
+WEIGHT_PATTERN = FieldPattern([
+    r'weight\s*:?\s*(\d{2,3})\s*kg',
+    r'weight\s*:?\s*(\d{2,3})\s*lbs?',
+])
+
+# Lab values: the first alternative that matches wins
+LAB_VALUE_PATTERNS = {
+    'total_cholesterol': FieldPattern([
+        r'total\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'total\s*chol[:\s-]*(\d{2,3}\.?\d*)',
+    ]),
+    'ldl_cholesterol': FieldPattern([
+        r'ldl[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'ldl\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)',
+    ]),
+    'hdl_cholesterol': FieldPattern([
+        r'hdl[:\s-]*(\d{1,3}\.?\d*)\s*mg',
+        r'hdl\s*cholesterol[:\s-]*(\d{1,3}\.?\d*)',
+    ]),
+    'triglycerides': FieldPattern([
+        r'triglycerides?[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'tg[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+    ]),
+    'blood_sugar': FieldPattern([
+        r'fasting\s*blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'fbs[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'glucose[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'blood\s*glucose[:\s-]*(\d{2,3}\.?\d*)',
+    ]),
+    'hba1c': FieldPattern([
+        r'hba1c[:\s-]*(\d{1,2}\.?\d*)\s*%',
+        r'a1c[:\s-]*(\d{1,2}\.?\d*)',
+    ]),
+}
+
+BLOOD_PRESSURE_PATTERN = FieldPattern([
+    r'blood\s*pressure[:\s-]*(\d{2,3})[/\\](\d{2,3})',
+    r'bp[:\s-]*(\d{2,3})[/\\](\d{2,3})',
+])
+
+# Allergy section headers plus free-form "allergic to X"
+ALLERGIC_TO_INDEX = 5
+ALLERGY_PATTERN = FieldPattern([
+    r'allergies?:\s*([^\n]+)',
+    r'allergic to:\s*([^\n]+)',
+    r'known allergies?:\s*([^\n]+)',
+    r'drug allergies?:\s*([^\n]+)',
+    r'food allergies?:\s*([^\n]+)',
+    r'allergic to ([a-z\s,]+)',
+])
+
+
 # DISEASE EXTRACTION
 
 
+class DiseaseMatcher:
+    """
+    Precompiled form of the keyword search in find_diseases_in_text.
+
+    A disease is reported when one of its keywords occurs anywhere in the
+    lower-cased text, or when a word longer than 3 characters scores above
+    `threshold` against a keyword with fuzz.ratio. Exact hits come from
+    one combined regex; fuzzy candidates are limited to distinct words
+    whose length can reach the threshold for a given keyword.
+    """
+
+    def __init__(self, disease_keywords, threshold=85):
+        self.threshold = threshold
+        self.diseases  = set(disease_keywords)
+
+        pairs = [(kw.lower(), disease) for disease, kws in disease_keywords.items() for kw in kws]
+        keywords = sorted({kw for kw, _ in pairs}, key=len, reverse=True)
+
+        # Zero-width lookahead, so every start position is tried and the
+        # longest keyword starting there is reported
+        self._exact = re.compile('(?=(' + '|'.join(re.escape(kw) for kw in keywords) + '))')
+
+        # Any shorter keyword matching at the same position is a prefix of
+        # the reported one, so its disease is implied too
+        self._implied = {
+            kw: {disease for other, disease in pairs if kw.startswith(other)}
+            for kw in keywords
+        }
+
+        self._by_length = defaultdict(list)
+        for kw, disease in pairs:
+            self._by_length[len(kw)].append((kw, disease))
+        self._candidates = {}
+
+    def _candidates_for(self, word_length):
+        """
+        Keywords that could score above the threshold against a word of
+        this length. fuzz.ratio can't exceed 1 - |a-b| / (a+b) for
+        lengths a and b, so everything else is skipped unscored.
+        """
+        cached = self._candidates.get(word_length)
+        if cached is None:
+            cutoff = self.threshold + 0.5
+            cached = [
+                pair
+                for kw_length, bucket in self._by_length.items()
+                if 100 * (1 - abs(kw_length - word_length) / (kw_length + word_length)) >= cutoff - 1e-9
+                for pair in bucket
+            ]
+            self._candidates[word_length] = cached
+        return cached
+
+    def find(self, text):
+        return self.find_lower(text.lower())
+
+    def find_lower(self, text_lower):
+        found = set()
+
+        for match in self._exact.finditer(text_lower):
+            found |= self._implied[match.group(1)]
+            if found == self.diseases:
+                return found
+
+        for word in set(text_lower.split()):
+            if len(word) <= 3:
+                continue
+            for keyword, disease in self._candidates_for(len(word)):
+                if disease not in found and fuzz.ratio(keyword, word) > self.threshold:
+                    found.add(disease)
+                    if found == self.diseases:
+                        return found
+        return found
+
+
+disease_matcher = DiseaseMatcher(DISEASE_KEYWORDS)
+
+
 def find_diseases_in_text(text):
     
-    text_lower = text.lower()
-    found_diseases = set()
-    
-    # Check each disease and its variations
-    for disease, keywords in DISEASE_KEYWORDS.items():
-        for keyword in keywords:
-            # Use fuzzy matching for flexibility
-            if keyword.lower() in text_lower:
-                found_diseases.add(disease)
-                break
-            
-            # Also try fuzzy matching for misspellings
-            words = text_lower.split()
-            for word in words:
-                if len(word) > 3:  # Only check substantial words
-                    similarity = fuzz.ratio(keyword.lower(), word)
-                    if similarity > 85:  # 85% similarity threshold
-                        found_diseases.add(disease)
-                        break
-    
-    return list(found_diseases)
+    return list(disease_matcher.find(text))
 
 def find_allergies_in_text(text):
     """
     Find allergy mentions in extracted text
     """
-    text_lower = text.lower()
+    return _find_allergies(text.lower())
+
+
+def _find_allergies(text_lower):
     found_allergies = []
-    
-    # Look for allergy section
-    allergy_patterns = [
-        r'allergies?:\s*([^\n]+)',
-        r'allergic to:\s*([^\n]+)',
-        r'known allergies?:\s*([^\n]+)',
-        r'drug allergies?:\s*([^\n]+)',
-        r'food allergies?:\s*([^\n]+)'
-    ]
-    
-    for pattern in allergy_patterns:
-        matches = re.finditer(pattern, text_lower)
-        for match in matches:
-            allergy_text = match.group(1)
-            
-            # Check for specific allergy keywords
+
+    for index, (allergy_text,) in ALLERGY_PATTERN.iter_all(text_lower):
+        if index == ALLERGIC_TO_INDEX:
+            # "allergic to X, Y" — take the listed items as-is
+            for item in allergy_text.split(','):
+                item = item.strip()
+                if item and len(item) > 2:
+                    found_allergies.append(item.title())
+        else:
+            # Allergy section — look for known allergens
             for allergy_keyword in ALLERGY_KEYWORDS:
                 if allergy_keyword in allergy_text:
                     found_allergies.append(allergy_keyword.title())
-    
-    # Also check for "allergic to X" patterns
-    allergic_pattern = r'allergic to ([a-z\s,]+)'
-    matches = re.finditer(allergic_pattern, text_lower)
-    for match in matches:
-        items = match.group(1).split(',')
-        for item in items:
-            item = item.strip()
-            if item and len(item) > 2:
-                found_allergies.append(item.title())
-    
+
     return list(set(found_allergies))  # Remove duplicates
 
 def extract_patient_details(text):
 
+    return _extract_patient_details(text.lower())
+
+
+def _extract_patient_details(text_lower):
     info = {}
-    text_lower = text.lower()
     
     # Extract Name
-    name_patterns = [
-        r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|$)',
-        r'patient\s*name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
-        r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
-        r'patient\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
-        r'mr\.\s*([a-zA-Z]+)',
-        r'mrs\.\s*([a-zA-Z]+)',
-        r'ms\.\s*([a-zA-Z]+)',
-    ]
-    for pattern in name_patterns:
-        match = re.search(pattern, text_lower, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            # Clean up the name
-            name = re.sub(r'\s+', ' ', name)  # Remove multiple spaces
-            name = name.replace('.', '').strip()
-            if len(name) > 2 and len(name) < 50:  # Reasonable name length
-                info['name'] = name.title()
-                break
+    for _, (name,) in NAME_PATTERN.iter_matches(text_lower):
+        name = name.strip()
+        # Clean up the name
+        name = re.sub(r'\s+', ' ', name)  # Remove multiple spaces
+        name = name.replace('.', '').strip()
+        if len(name) > 2 and len(name) < 50:  # Reasonable name length
+            info['name'] = name.title()
+            break
     
     # Extract Age
-    age_patterns = [
-        r'age\s*[-:–]?\s*(\d{1,3})\s*(?:years?|yrs?)?',
-        r'(\d{1,3})\s*(?:years?|yrs?)\s*old',
-        r'age\s*[-:–]\s*(\d{1,3})',
-        r'[-–]\s*(\d{1,3})\s*years?',  # Handles "- 56 years"
-    ]
-    for pattern in age_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            age = int(match.group(1))
-            if 1 <= age <= 120:  # Reasonable age range
-                info['age'] = age
-                break
+    for _, (age,) in AGE_PATTERN.iter_matches(text_lower):
+        age = int(age)
+        if 1 <= age <= 120:  # Reasonable age range
+            info['age'] = age
+            break
     
     # Extract Gender
-    gender_patterns = [
-        r'gender\s*:?\s*(male|female|m\/f|m|f)',
-        r'sex\s*:?\s*(male|female|m\/f|m|f)',
-        r'\b(male|female)\b',
-    ]
-    for pattern in gender_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            gender_text = match.group(1).lower()
-            if gender_text in ['male', 'm']:
-                info['gender'] = 'Male'
-            elif gender_text in ['female', 'f']:
-                info['gender'] = 'Female'
-            else:
-                info['gender'] = 'Other'
-            break
+    _, groups = GENDER_PATTERN.first_match(text_lower)
+    if groups:
+        gender_text = groups[0].lower()
+        if gender_text in ['male', 'm']:
+            info['gender'] = 'Male'
+        elif gender_text in ['female', 'f']:
+            info['gender'] = 'Female'
+        else:
+            info['gender'] = 'Other'
     
     # Extract Height 
-    height_patterns = [
-        r'height\s*:?\s*(\d{2,3})\s*cm',
-        r'height\s*:?\s*(\d)\s*[\']\s*(\d{1,2})',  # feet'inches
-    ]
-    for pattern in height_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            if 'cm' in pattern:
-                info['height'] = int(match.group(1))
-            else:
-                # Convert feet'inches to cm
-                feet = int(match.group(1))
-                inches = int(match.group(2))
-                height_cm = int((feet * 12 + inches) * 2.54)
-                info['height'] = height_cm
-            break
+    index, groups = HEIGHT_PATTERN.first_match(text_lower)
+    if index == 0:
+        info['height'] = int(groups[0])
+    elif index == 1:
+        # Convert feet'inches to cm
+        feet = int(groups[0])
+        inches = int(groups[1])
+        info['height'] = int((feet * 12 + inches) * 2.54)
     
     # Extract Weight 
-    weight_patterns = [
-        r'weight\s*:?\s*(\d{2,3})\s*kg',
-        r'weight\s*:?\s*(\d{2,3})\s*lbs?',
-    ]
-    for pattern in weight_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            weight = int(match.group(1))
-            if 'lb' in pattern:
-                # Convert lbs to kg
-                weight = int(weight * 0.453592)
-            info['weight'] = weight
-            break
+    index, groups = WEIGHT_PATTERN.first_match(text_lower)
+    if groups:
+        weight = int(groups[0])
+        if index == 1:
+            # Convert lbs to kg
+            weight = int(weight * 0.453592)
+        info['weight'] = weight
     
     return info
 def extract_medical_info(text):
@@ -415,15 +1386,18 @@ def extract_medical_info(text):
     print(f"\n{'='*50}")
     print("Analyzing medical text...")
     print(f"{'='*50}")
+
+    # Lower-case once; every extractor below works on the same copy
+    text_lower = text.lower()
     
     # Extract patient details (name, age, gender, height, weight)
-    patient_details = extract_patient_details(text)
+    patient_details = _extract_patient_details(text_lower)
     print(f"\n[OK] Patient Details:")
     for key, value in patient_details.items():
         print(f"  - {key.title()}: {value}")
     
     # Extract numerical values first
-    numerical_info = extract_numerical_values(text)
+    numerical_info = _extract_numerical_values(text_lower)
     if numerical_info:
         print(f"\n[OK] Extracted Lab Values:")
         for key, value in numerical_info.items():
@@ -433,7 +1407,7 @@ def extract_medical_info(text):
     diseases_from_labs = detect_diseases_from_lab_values(numerical_info)
     
     # Extract diseases from text
-    diseases_from_text = find_diseases_in_text(text)
+    diseases_from_text = list(disease_matcher.find_lower(text_lower))
     
     # Combine both sources, remove duplicates
     all_diseases = list(set(diseases_from_text + diseases_from_labs))
@@ -444,7 +1418,7 @@ def extract_medical_info(text):
         print(f"  - {disease} ({source})")
     
     # Extract allergies
-    allergies = find_allergies_in_text(text)
+    allergies = _find_allergies(text_lower)
     print(f"\n[OK] Found {len(allergies)} allergy/ies:")
     for allergy in allergies:
         print(f"  - {allergy}")
@@ -461,90 +1435,23 @@ def extract_medical_info(text):
 
 def extract_numerical_values(text):
     """Extract numerical health values from text"""
+    return _extract_numerical_values(text.lower())
+
+
+def _extract_numerical_values(text_lower):
     values = {}
-    text_lower = text.lower()
     
     # Blood Pressure (systolic/diastolic)
-    bp_patterns = [
-        r'blood\s*pressure[:\s-]*(\d{2,3})[/\\](\d{2,3})',
-        r'bp[:\s-]*(\d{2,3})[/\\](\d{2,3})',
-    ]
-    for pattern in bp_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['blood_pressure_systolic'] = int(match.group(1))
-            values['blood_pressure_diastolic'] = int(match.group(2))
-            break
-    
-    # Cholesterol - more flexible patterns
-    cholesterol_patterns = [
-        r'total\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'total\s*chol[:\s-]*(\d{2,3}\.?\d*)',
-    ]
-    for pattern in cholesterol_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['total_cholesterol'] = float(match.group(1))
-            break
-    
-    # LDL Cholesterol
-    ldl_patterns = [
-        r'ldl[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'ldl\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)',
-    ]
-    for pattern in ldl_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['ldl_cholesterol'] = float(match.group(1))
-            break
-    
-    # HDL Cholesterol
-    hdl_patterns = [
-        r'hdl[:\s-]*(\d{1,3}\.?\d*)\s*mg',
-        r'hdl\s*cholesterol[:\s-]*(\d{1,3}\.?\d*)',
-    ]
-    for pattern in hdl_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['hdl_cholesterol'] = float(match.group(1))
-            break
-    
-    # Triglycerides
-    trig_patterns = [
-        r'triglycerides?[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'tg[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-    ]
-    for pattern in trig_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['triglycerides'] = float(match.group(1))
-            break
-    
-    # Blood Sugar / Glucose - more flexible
-    sugar_patterns = [
-        r'fasting\s*blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'fbs[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'glucose[:\s-]*(\d{2,3}\.?\d*)\s*mg',
-        r'blood\s*glucose[:\s-]*(\d{2,3}\.?\d*)',
-    ]
-    for pattern in sugar_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['blood_sugar'] = float(match.group(1))
-            break
+    _, groups = BLOOD_PRESSURE_PATTERN.first_match(text_lower)
+    if groups:
+        values['blood_pressure_systolic'] = int(groups[0])
+        values['blood_pressure_diastolic'] = int(groups[1])
     
-    # HbA1c
-    hba1c_patterns = [
-        r'hba1c[:\s-]*(\d{1,2}\.?\d*)\s*%',
-        r'a1c[:\s-]*(\d{1,2}\.?\d*)',
-    ]
-    for pattern in hba1c_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            values['hba1c'] = float(match.group(1))
-            break
+    # Cholesterol, lipids, blood sugar, HbA1c
+    for field, pattern in LAB_VALUE_PATTERNS.items():
+        _, groups = pattern.first_match(text_lower)
+        if groups:
+            values[field] = float(groups[0])
     
     return values
 
@@ -624,14 +1531,176 @@ def extract_numerical_values_old(text):
     return info
 
 
+# RESULT CACHE
+
+
+class OCRResultCache:
+    """
+    Content-addressed cache of processed reports.
+
+    Keys are a SHA-256 of the uploaded bytes, the file type and
+    OCR_CONFIG_VERSION. Entries live in a size-bounded in-memory LRU and,
+    optionally, as JSON files in `cache_dir` so they survive restarts and
+    are shared between workers. Both tiers expire entries after
+    `ttl_seconds` (0 disables expiry).
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=86400, cache_dir=None, disk_max_entries=2048):
+        self.max_entries      = max_entries
+        self.ttl_seconds      = ttl_seconds
+        self.cache_dir        = cache_dir
+        self.disk_max_entries = disk_max_entries
+        self.hits             = 0
+        self.misses           = 0
+        self._entries         = OrderedDict()
+        self._lock            = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data, filename=''):
+        return OCRResultCache.make_key_from_digest(hashlib.sha256(data).hexdigest(), filename)
+
+    @staticmethod
+    def make_key_from_digest(content_sha256, filename=''):
+        """Key for an upload whose SHA-256 is already known (e.g. a SpooledUpload)."""
+        ext = os.path.splitext(filename or '')[1].lower()
+        digest = hashlib.sha256()
+        digest.update(f'{OCR_CONFIG_VERSION}:{OCR_EXTRACTION_POLICY}:{OCR_PREPROCESS_MODE}:{OCR_LAYOUT}:{ext}:'.encode())
+        digest.update(content_sha256.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry, now):
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry['value'])
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_memory(key, entry)
+        return copy.deepcopy(entry['value'])
+
+    def put(self, key, value):
+        entry = {'created_at': time.time(), 'value': copy.deepcopy(value)}
+        with self._lock:
+            self._store_memory(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds > 0 and now - entry['created_at'] > self.ttl_seconds
+
+    def _store_memory(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _read_disk(self, key, now):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry, now):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        try:
+            tmp_path = f'{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"  [WARN] Could not write OCR cache entry: {e}")
+
+    def _prune_disk(self):
+        """Drop the oldest files once the disk tier exceeds its bound."""
+        names = [n for n in os.listdir(self.cache_dir) if n.endswith('.json')]
+        excess = len(names) - self.disk_max_entries
+        if excess <= 0:
+            return
+        paths = sorted(
+            (os.path.join(self.cache_dir, n) for n in names),
+            key=lambda p: os.path.getmtime(p)
+        )
+        for path in paths[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+ocr_cache = OCRResultCache(
+    max_entries=OCR_CACHE_MAX_ENTRIES,
+    ttl_seconds=OCR_CACHE_TTL_SECONDS,
+    cache_dir=OCR_CACHE_DIR if OCR_CACHE_DISK else None,
+    disk_max_entries=OCR_CACHE_DISK_MAX_ENTRIES
+)
+
+
 # MAIN PROCESSING FUNCTION
 
 
 def process_medical_report(file):
-
+    """
+    OCR and extract an uploaded report. `file` is a Werkzeug FileStorage
+    (or any file object with a filename) or an already SpooledUpload,
+    which the caller keeps ownership of.
+    """
+    upload = None
     try:
-        # Extract text from file
-        text = extract_text_from_file(file)
+        # Spool the upload to disk once, hashing it for the cache on the way
+        upload = file if isinstance(file, SpooledUpload) else SpooledUpload(file)
+        cache_key = ocr_cache.make_key_from_digest(upload.sha256, upload.filename)
+
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            print(f"\n[OK] OCR cache hit for {upload.filename} ({cache_key[:12]})")
+            return cached['result']
+
+        # Extract text from file; PDFs also report how each page was read
+        page_report = []
+        text = extract_text_from_file(upload, page_report=page_report)
         
         if not text or len(text) < 10:
             return {
@@ -644,6 +1713,10 @@ def process_medical_report(file):
         # Extract medical information
         medical_info = extract_medical_info(text)
         medical_info['success'] = True
+        if page_report:
+            medical_info['pdf_pages'] = page_report
+
+        ocr_cache.put(cache_key, {'text': text, 'result': medical_info})
         
         return medical_info
     
@@ -659,6 +1732,10 @@ def process_medical_report(file):
             'allergies': ''
         }
 
+    finally:
+        if upload is not None and upload is not file:
+            upload.close()
+
 
 # UTILITY FUNCTIONS
 
@@ -674,9 +1751,10 @@ def test_ocr():
         test_image = Image.new('RGB', (200, 50), color='white')
         
         # Try to extract text (will be empty, but tests if OCR works)
-        pytesseract.image_to_string(test_image)
+        engine = get_ocr_engine()
+        engine.image_to_string(test_image)
         
-        return True, "OCR is working!"
+        return True, f"OCR is working! (Tesseract {engine.version()}, {engine.name} engine)"
     except Exception as e:
         return False, f"OCR test failed: {str(e)}"
 
@@ -0,0 +1,567 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# HTTP
+
+
+class PersistenceError(Exception):
+    """The Node.js API did not store the plan."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(PersistenceError):
+    """The call was skipped because the backend circuit is open."""
+
+
+def make_session(pool_size=4):
+    """requests.Session with keep-alive connections to the Node.js API."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Content-Type': 'application/json'})
+    return session
+
+
+def post_diet_plan(session, url, payload, timeout=10):
+    """POST one plan; returns the MongoDB id or raises PersistenceError."""
+    headers = {}
+    if payload.get('idempotencyKey'):
+        headers['Idempotency-Key'] = payload['idempotencyKey']
+
+    try:
+        response = session.post(url, json=payload, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise PersistenceError(f'Could not reach Node.js backend: {e}') from e
+
+    if response.status_code in [200, 201]:
+        try:
+            result = response.json()
+        except ValueError as e:
+            raise PersistenceError(f'Unreadable response from Node.js backend: {e}') from e
+        if not isinstance(result, dict):
+            raise PersistenceError(f'Unexpected response from Node.js backend: {result!r}')
+        if result.get('success'):
+            return result.get('data', {}).get('_id')
+        raise PersistenceError(f"MongoDB save failed: {result.get('message')}", retryable=False)
+
+    raise PersistenceError(
+        f'MongoDB API error: {response.status_code}  {response.text}',
+        retryable=response.status_code >= 500 or response.status_code == 429
+    )
+
+
+def with_idempotency_key(payload, key=None):
+    """Copy of the payload carrying an idempotency key (a new one if unset)."""
+    key = key or payload.get('idempotencyKey') or uuid.uuid4().hex
+    return {**payload, 'idempotencyKey': key}
+
+
+# CIRCUIT BREAKER
+
+
+class CircuitBreaker:
+    """
+    closed    - calls go through; `failure_threshold` consecutive failures open it
+    open      - calls are refused without touching the network
+    half_open - after `reset_seconds` one probe call is let through; its
+                outcome closes the circuit or opens it for another period
+    """
+
+    CLOSED    = 'closed'
+    OPEN      = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds     = reset_seconds
+        self.clock             = clock
+        self.failures          = 0
+        self.opened_at         = None
+        self.times_opened      = 0
+
+        self._state   = self.CLOSED
+        self._probing = False
+        self._lock    = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+            self._state   = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self):
+        """True if a call may be made now (claims the probe when half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print("[OK] Node.js backend reachable again — circuit closed")
+            self._state    = self.CLOSED
+            self._probing  = False
+            self.failures  = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"[WARN] Node.js backend circuit opened after {self.failures} failure(s)")
+                self._state    = self.OPEN
+                self._probing  = False
+                self.opened_at = self.clock()
+
+    def snapshot(self):
+        with self._lock:
+            state    = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_seconds - (self.clock() - self.opened_at)), 1)
+            return {
+                'state':             state,
+                'failures':          self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_seconds':     self.reset_seconds,
+                'retry_in_seconds':  retry_in,
+                'times_opened':      self.times_opened,
+            }
+
+
+# OUTBOX
+
+
+class PlanOutbox:
+    """
+    Append-only SQLite (WAL) store of plans that could not be delivered.
+
+    Rows are keyed by idempotency key, so adding the same plan twice is a
+    no-op, and are removed only once the Node.js API has confirmed them.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            ' idempotency_key TEXT PRIMARY KEY,'
+            ' payload TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' last_error TEXT)'
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def add(self, payload, error=None):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO outbox (idempotency_key, payload, created_at, last_error) VALUES (?, ?, ?, ?)',
+                (payload['idempotencyKey'], json.dumps(payload), time.time(), error)
+            )
+
+    def peek(self, limit):
+        """Oldest `limit` payloads, in the order they were added."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT payload FROM outbox ORDER BY created_at LIMIT ?', (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def remove(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM outbox WHERE idempotency_key = ?', (key,))
+
+    def record_failure(self, key, error):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE idempotency_key = ?',
+                (error, key)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def reopen(self):
+        """Fresh connection, e.g. in a forked worker (SQLite handles can't cross fork)."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+
+
+# STATUS STORE
+
+
+class PlanStatusStore:
+    """
+    Outcome of each submitted plan by pending id, in SQLite (WAL) so that
+    every worker process can answer for plans another worker queued.
+    Keeps the most recently updated `max_entries` rows.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path, max_entries=10000):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path        = path
+        self.max_entries = max_entries
+        self._writes     = 0
+        self._lock       = threading.Lock()
+        self._conn       = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS plan_status ('
+            ' pending_id TEXT PRIMARY KEY,'
+            ' status TEXT NOT NULL,'
+            ' diet_plan_id TEXT,'
+            ' error TEXT,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS plan_status_updated ON plan_status (updated_at)')
+
+    def put(self, pending_id, result):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO plan_status (pending_id, status, diet_plan_id, error, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (pending_id, result['status'], result.get('diet_plan_id'), result.get('error'), time.time())
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._conn.execute(
+                    'DELETE FROM plan_status WHERE pending_id IN ('
+                    ' SELECT pending_id FROM plan_status ORDER BY updated_at DESC, rowid DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+
+    def update(self, pending_id, result):
+        """Like put(), but only for a pending id that is still tracked."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE plan_status SET status = ?, diet_plan_id = ?, error = ?, updated_at = ? WHERE pending_id = ?',
+                (result['status'], result.get('diet_plan_id'), result.get('error'), time.time(), pending_id)
+            )
+
+    def get(self, pending_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, diet_plan_id, error FROM plan_status WHERE pending_id = ?', (pending_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        result = {'status': row[0], 'diet_plan_id': row[1]}
+        if row[2] is not None:
+            result['error'] = row[2]
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def reopen(self):
+        """Fresh connection, e.g. in a forked worker (SQLite handles can't cross fork)."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+
+
+# BACKGROUND WRITER
+
+
+class DietPlanWriter:
+    """
+    Bounded queue of diet plans written to the Node.js API by a
+    background thread, so /api/predict never waits on the database.
+
+    The worker takes up to `batch_size` plans at a time and sends them
+    over one pooled keep-alive session, retrying connection errors and
+    5xx responses with exponential backoff. Each submitted plan gets a
+    pending id, which doubles as its idempotency key, whose outcome can
+    be looked up with status(). Outcomes are kept in `status_store` when
+    one is given (shared by every process), otherwise in memory.
+
+    With an outbox, plans that still fail (or arrive while the queue is
+    full) are written to disk instead of dropped, and replayed every
+    `replay_seconds` and whenever a live save succeeds again.
+
+    With a circuit breaker, calls are skipped outright while the backend
+    is known to be down, so plans go straight to the outbox.
+    """
+
+    def __init__(self, url, max_queue=1000, batch_size=20, max_retries=3,
+                 backoff_seconds=0.5, timeout=10, max_tracked=10000,
+                 outbox=None, replay_seconds=30, breaker=None, status_store=None):
+        self.url             = url
+        self.batch_size      = batch_size
+        self.max_retries     = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout         = timeout
+        self.max_tracked     = max_tracked
+        self.outbox          = outbox
+        self.replay_seconds  = replay_seconds
+        self.breaker         = breaker
+        self.status_store    = status_store
+        self.session         = make_session()
+        self.saved           = 0
+        self.failed          = 0
+        self.replayed        = 0
+
+        self._queue       = queue.Queue(maxsize=max_queue)
+        self._results     = OrderedDict()
+        self._lock        = threading.Lock()
+        self._thread      = None
+        self._stop        = threading.Event()
+        self._last_replay = 0.0
+
+    def submit(self, payload):
+        """
+        Queue a plan; returns its pending id. If the queue is full the plan
+        goes to the outbox, or None is returned when there is no outbox.
+        """
+        payload    = with_idempotency_key(payload)
+        pending_id = payload['idempotencyKey']
+        try:
+            self._queue.put_nowait((pending_id, payload))
+        except queue.Full:
+            if self.outbox is None:
+                return None
+            self.outbox.add(payload, 'persistence queue full')
+            self._track(pending_id, {'status': 'outboxed', 'diet_plan_id': None})
+            self.start()
+            return pending_id
+        self._track(pending_id, {'status': 'pending', 'diet_plan_id': None})
+        self.start()
+        return pending_id
+
+    def status(self, pending_id):
+        if self.status_store is not None:
+            return self.status_store.get(pending_id)
+        with self._lock:
+            result = self._results.get(pending_id)
+            return dict(result) if result else None
+
+    def stats(self):
+        return {
+            'queued':   self._queue.qsize(),
+            'saved':    self.saved,
+            'failed':   self.failed,
+            'replayed': self.replayed,
+            'outbox':   len(self.outbox) if self.outbox is not None else None,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='diet-plan-writer', daemon=True)
+                self._thread.start()
+
+    def reset_after_fork(self):
+        """
+        Give a forked child its own queue, thread, HTTP session and SQLite
+        handle; the parent's may hold locks or sockets mid-use.
+        """
+        self.session = make_session()
+        self._queue  = queue.Queue(maxsize=self._queue.maxsize)
+        self._lock   = threading.Lock()
+        self._thread = None
+        self._stop   = threading.Event()
+        if self.outbox is not None:
+            self.outbox.reopen()
+        if self.status_store is not None:
+            self.status_store.reopen()
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been attempted."""
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+    def stop(self, timeout=5):
+        self.flush(timeout)
+        self._stop.set()
+
+    def _track(self, pending_id, result):
+        if self.status_store is not None:
+            self.status_store.put(pending_id, result)
+            return
+        with self._lock:
+            self._results[pending_id] = result
+            self._results.move_to_end(pending_id)
+            while len(self._results) > self.max_tracked:
+                self._results.popitem(last=False)
+
+    def _update_tracked(self, pending_id, result):
+        if self.status_store is not None:
+            self.status_store.update(pending_id, result)
+            return
+        with self._lock:
+            if pending_id in self._results:
+                self._results[pending_id] = result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                if time.monotonic() - self._last_replay >= self.replay_seconds:
+                    try:
+                        self.replay_outbox()
+                    except Exception as e:
+                        print(f"[ERROR] Outbox replay: {e}")
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"[ERROR] Diet plan writer: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def write_batch(self, batch):
+        delivered = False
+        for pending_id, payload in batch:
+            try:
+                diet_plan_id = self._post_with_retry(payload)
+                self.saved += 1
+                delivered   = True
+                self._track(pending_id, {'status': 'saved', 'diet_plan_id': diet_plan_id})
+                print(f"[OK] Diet plan saved to MongoDB!  ID: {diet_plan_id}")
+            except PersistenceError as e:
+                if e.retryable and self.outbox is not None:
+                    self.outbox.add(payload, str(e))
+                    self._track(pending_id, {'status': 'outboxed', 'diet_plan_id': None, 'error': str(e)})
+                    print(f"[WARN] {e} — plan kept in outbox for replay")
+                else:
+                    self.failed += 1
+                    self._track(pending_id, {'status': 'failed', 'diet_plan_id': None, 'error': str(e)})
+                    print(f"[ERROR] {e}")
+            except Exception as e:
+                # A bug or bad payload fails this plan, not the writer thread
+                self.failed += 1
+                self._track(pending_id, {'status': 'failed', 'diet_plan_id': None, 'error': str(e)})
+                print(f"[ERROR] Could not save diet plan {pending_id}: {type(e).__name__}: {e}")
+
+        # The backend is reachable again: drain what piled up while it was not
+        if delivered and self.outbox is not None and len(self.outbox):
+            self.replay_outbox()
+
+    def replay_outbox(self):
+        """
+        Send outboxed plans oldest first, one attempt each. Stops at the
+        first plan the backend still can't take, so an outage costs one
+        failed request per replay rather than one per stored plan.
+        """
+        self._last_replay = time.monotonic()
+        if self.outbox is None:
+            return 0
+
+        replayed = 0
+        while True:
+            batch = self.outbox.peek(self.batch_size)
+            if not batch:
+                break
+            for payload in batch:
+                key = payload['idempotencyKey']
+                try:
+                    diet_plan_id = self.send(payload)
+                except CircuitOpenError:
+                    return self._finish_replay(replayed)
+                except PersistenceError as e:
+                    if e.retryable:
+                        self.outbox.record_failure(key, str(e))
+                        return self._finish_replay(replayed)
+                    self.outbox.remove(key)
+                    self.failed += 1
+                    self._update_tracked(key, {'status': 'failed', 'diet_plan_id': None, 'error': str(e)})
+                    print(f"[ERROR] Dropping outboxed plan {key}: {e}")
+                    continue
+                self.outbox.remove(key)
+                self._update_tracked(key, {'status': 'saved', 'diet_plan_id': diet_plan_id})
+                replayed += 1
+        return self._finish_replay(replayed)
+
+    def _finish_replay(self, replayed):
+        if replayed:
+            self.replayed += replayed
+            print(f"[OK] Replayed {replayed} outboxed diet plan(s)")
+        return replayed
+
+    def send(self, payload):
+        """One POST, routed through the circuit breaker when there is one."""
+        if self.breaker is None:
+            return post_diet_plan(self.session, self.url, payload, self.timeout)
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Node.js backend circuit is open — save skipped')
+        try:
+            diet_plan_id = post_diet_plan(self.session, self.url, payload, self.timeout)
+        except PersistenceError as e:
+            # A 4xx still means the backend is up
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception:
+            # Anything else counts as a failure so a half-open probe is never left claimed
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return diet_plan_id
+
+    def _post_with_retry(self, payload):
+        attempt = 0
+        while True:
+            try:
+                return self.send(payload)
+            except CircuitOpenError:
+                raise
+            except PersistenceError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff_seconds * (2 ** attempt))
+                attempt += 1
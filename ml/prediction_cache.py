@@ -0,0 +1,108 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from model_registry import file_fingerprint
+
+
+class PredictionCache:
+    """
+    LRU cache of macro predictions keyed by a hash of the final feature
+    vector. Form payloads collapse to a small discrete feature space, so
+    the same vector recurs across users and retries.
+
+    Entries expire after `ttl_seconds`, and the whole cache is dropped
+    when any of `watch_paths` (model files, metadata.json) changes on
+    disk, checked at most once every `check_seconds`. max_entries=0
+    disables caching.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=3600, watch_paths=(), check_seconds=1.0, clock=time.monotonic):
+        self.max_entries   = max_entries
+        self.ttl_seconds   = ttl_seconds
+        self.watch_paths   = list(watch_paths)
+        self.check_seconds = check_seconds
+        self.clock         = clock
+        self.hits          = 0
+        self.misses        = 0
+        self.invalidations = 0
+
+        self._entries     = OrderedDict()
+        self._lock        = threading.Lock()
+        self._fingerprint = file_fingerprint(self.watch_paths)
+        self._checked_at  = clock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(feature_row, model_version=''):
+        """Digest of one feature row's values, scoped to the model version that scores it."""
+        row    = np.ascontiguousarray(feature_row, dtype=np.float64).reshape(-1)
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16, person=b'macro-pred')
+        digest.update(str(model_version or '').encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        self._check_files()
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, predictions):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock(), dict(predictions))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fingerprint = file_fingerprint(self.watch_paths)
+            self._checked_at  = self.clock()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled':       self.enabled,
+            'entries':       len(self._entries),
+            'max_entries':   self.max_entries,
+            'ttl_seconds':   self.ttl_seconds,
+            'hits':          self.hits,
+            'misses':        self.misses,
+            'hit_rate':      round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+    def _check_files(self):
+        now = self.clock()
+        if now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+        fingerprint = file_fingerprint(self.watch_paths)
+        if fingerprint != self._fingerprint:
+            with self._lock:
+                self._entries.clear()
+                self._fingerprint = fingerprint
+            self.invalidations += 1
+            print("[OK] Model files changed — prediction cache cleared")
@@ -0,0 +1,228 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from spooling import SpooledUpload
+
+
+class JobQueueFull(Exception):
+    """No room for another report; the caller should retry later."""
+
+
+# JOB STORE
+
+
+class JobStore:
+    """
+    Job state in a local SQLite (WAL) file, so every worker process on
+    the host can answer a status poll, whichever one ran the job.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.reopen()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS report_jobs ('
+            ' job_id TEXT PRIMARY KEY,'
+            ' status TEXT NOT NULL,'
+            ' filename TEXT,'
+            ' pid INTEGER,'
+            ' created_at REAL NOT NULL,'
+            ' started_at REAL,'
+            ' finished_at REAL,'
+            ' result TEXT,'
+            ' error TEXT)'
+        )
+
+    def reopen(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+
+    def create(self, job_id, filename):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO report_jobs (job_id, status, filename, pid, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, 'queued', filename, os.getpid(), time.time())
+            )
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE report_jobs SET {columns} WHERE job_id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            row = self._conn.execute('SELECT * FROM report_jobs WHERE job_id = ?', (job_id,)).fetchone()
+            self._conn.row_factory = None
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def prune(self, older_than):
+        """Drop finished jobs whose results are older than `older_than` (epoch seconds)."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM report_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (older_than,)
+            )
+
+
+# JOB QUEUE
+
+
+class ReportJobQueue:
+    """
+    Bounded queue of uploaded reports processed by a few background
+    threads, so OCR no longer runs inside the HTTP request.
+
+    Each thread calls `process(file)` (process_medical_report); the page
+    OCR itself already runs on the shared process pool. submit() raises
+    JobQueueFull once `max_pending` reports are waiting. `store` may be
+    set after construction, once the process that will use it is known.
+    """
+
+    def __init__(self, process, store=None, workers=2, max_pending=20, result_ttl=3600):
+        self.process     = process
+        self.store       = store
+        self.workers     = workers
+        self.max_pending = max_pending
+        self.result_ttl  = result_ttl
+        self.completed   = 0
+        self.failed      = 0
+        self.rejected    = 0
+
+        self._queue   = queue.Queue(maxsize=max_pending)
+        self._lock    = threading.Lock()
+        self._threads = []
+
+    def reset_after_fork(self):
+        """Forked workers get their own queue, threads and SQLite handle."""
+        self._queue   = queue.Queue(maxsize=self.max_pending)
+        self._lock    = threading.Lock()
+        self._threads = []
+        if self.store is not None:
+            self.store.reopen()
+
+    def submit(self, file, filename=None):
+        """
+        Spool an upload to disk and queue it; returns the job id or raises
+        JobQueueFull. Waiting jobs hold a temp file, not the upload bytes.
+        """
+        if self._queue.full():
+            self.rejected += 1
+            raise JobQueueFull(f'{self.max_pending} reports already waiting')
+
+        upload = SpooledUpload(file, filename=filename)
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, upload.filename)
+        try:
+            self._queue.put_nowait((job_id, upload))
+        except queue.Full:
+            upload.close()
+            self.rejected += 1
+            self.store.update(job_id, status='failed', finished_at=time.time(), error='queue full')
+            raise JobQueueFull(f'{self.max_pending} reports already waiting')
+
+        self._ensure_started()
+        self.store.prune(time.time() - self.result_ttl)
+        return job_id
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job['status'] in ('queued', 'running') and not _pid_alive(job['pid']):
+            job['status'] = 'failed'
+            job['error']  = 'Worker process exited before the job finished'
+        return job
+
+    def stats(self):
+        return {
+            'queued':      self._queue.qsize(),
+            'max_pending': self.max_pending,
+            'workers':     self.workers,
+            'completed':   self.completed,
+            'failed':      self.failed,
+            'rejected':    self.rejected,
+        }
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name='report-job', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job_id, upload = self._queue.get()
+            try:
+                self.run_job(job_id, upload)
+            except Exception as e:
+                print(f"[ERROR] Report job {job_id}: {e}")
+            finally:
+                upload.close()
+                self._queue.task_done()
+
+    def run_job(self, job_id, upload):
+        """
+        Process one upload and record the outcome. Any failure, including
+        one writing to the store, marks the job failed instead of leaving
+        it running.
+        """
+        filename = upload.filename
+        try:
+            self.store.update(job_id, status='running', started_at=time.time())
+            result = self.process(upload)
+
+            # process_medical_report reports its own errors in the result
+            status = 'done' if result.get('success') else 'failed'
+            self.store.update(
+                job_id,
+                status=status,
+                finished_at=time.time(),
+                result=result,
+                error=result.get('error')
+            )
+        except Exception as e:
+            self.failed += 1
+            print(f"[ERROR] Report job {job_id} failed: {e}")
+            self.store.update(job_id, status='failed', finished_at=time.time(), error=str(e))
+            return
+
+        if status == 'done':
+            self.completed += 1
+        else:
+            self.failed += 1
+        print(f"[OK] Report job {job_id} {status}: {filename}")
+
+
+# HELPERS
+
+
+def _pid_alive(pid):
+    if pid is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,104 @@
+import io
+import os
+import mmap
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+
+# Where uploads are spooled; None uses the system temp directory
+SPOOL_DIR  = os.environ.get('UPLOAD_SPOOL_DIR') or None
+CHUNK_SIZE = 1 << 20
+
+
+class SpooledUpload:
+    """
+    An upload copied once, a chunk at a time, to a temp file and hashed
+    on the way. Downstream code reads that file by path or through
+    mapped(), so the upload is never held whole in Python bytes.
+
+    Use as a context manager, or call close(), to delete the file.
+    """
+
+    def __init__(self, file, filename=None, spool_dir=None):
+        self.filename = filename or getattr(file, 'filename', '') or ''
+        self.size     = 0
+
+        suffix = os.path.splitext(self.filename)[1].lower()
+        digest = hashlib.sha256()
+        chunk  = memoryview(bytearray(CHUNK_SIZE))
+
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=spool_dir or SPOOL_DIR, delete=False) as tmp:
+            self.path = tmp.name
+            try:
+                while True:
+                    count = _read_into(file, chunk)
+                    if not count:
+                        break
+                    digest.update(chunk[:count])
+                    tmp.write(chunk[:count])
+                    self.size += count
+            except BaseException:
+                tmp.close()
+                os.remove(self.path)
+                raise
+
+        self.sha256 = digest.hexdigest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    @contextmanager
+    def mapped(self):
+        """Read-only mmap of the spooled file (empty bytes for an empty upload)."""
+        if self.size == 0:
+            yield b''
+            return
+        with open(self.path, 'rb') as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                yield mapping
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def upload_path(source, suffix=''):
+    """
+    Filesystem path for `source`: a path is used as is, a SpooledUpload
+    gives its file, and any other file-like object is spooled first.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+    elif isinstance(source, SpooledUpload):
+        yield source.path
+    else:
+        with SpooledUpload(source, filename=getattr(source, 'filename', None) or f'upload{suffix}') as upload:
+            yield upload.path
+
+
+# HELPERS
+
+
+def _read_into(file, buffer):
+    readinto = getattr(file, 'readinto', None)
+    if readinto is not None:
+        try:
+            return readinto(buffer)
+        except io.UnsupportedOperation:
+            pass
+    data = file.read(len(buffer))
+    buffer[:len(data)] = data
+    return len(data)
+
@@ -0,0 +1,88 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import app as ml_app
+from encoders import CompiledEncoders
+from features import FeatureBuilder
+from model_registry import ModelRegistry, ModelSet
+from prediction_cache import PredictionCache
+
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+
+class FixedPredictor:
+    def predict_dict(self, feature_matrix):
+        rows = feature_matrix.shape[0]
+        return {
+            'calories': np.full(rows, 2000.0),
+            'protein':  np.full(rows, 120.0),
+            'carbs':    np.full(rows, 220.0),
+            'fats':     np.full(rows, 70.0),
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    with open(os.path.join(MODELS_DIR, 'metadata.json')) as f:
+        metadata = json.load(f)
+    with open(os.path.join(MODELS_DIR, 'label_encoders_classes.json')) as f:
+        encoders = CompiledEncoders(json.load(f))
+    model_set = ModelSet('test', FixedPredictor(), metadata, None, encoders,
+                         FeatureBuilder(metadata['feature_columns'], encoders))
+
+    registry = ModelRegistry(loader=lambda: model_set)
+    registry.swap(model_set)
+    monkeypatch.setattr(ml_app, 'model_registry', registry)
+    monkeypatch.setattr(ml_app, 'prediction_cache', PredictionCache(max_entries=0))
+    monkeypatch.setattr(ml_app, 'MODEL_STATE', 'ready')
+    return ml_app.create_app(warm_up='lazy', watch=False, stores=False).test_client()
+
+
+def user(age, **overrides):
+    row = dict(ml_app.SMOKE_PAYLOADS[0], age=age)
+    row.update(overrides)
+    return row
+
+
+def test_mixed_batch_reports_errors_per_row_in_order(client):
+    invalid = user(31)
+    del invalid['weight']
+    rows = [user(30), invalid, 'not an object', user(33)]
+
+    body = client.post('/api/predict/batch', json=rows).get_json()
+
+    assert body['model_version'] == 'test'
+    assert (body['total'], body['succeeded'], body['failed']) == (4, 2, 2)
+    results = body['results']
+    assert [r['index'] for r in results] == [0, 1, 2, 3]
+    assert [r['success'] for r in results] == [True, False, False, True]
+    assert 'weight' in results[1]['error']
+    assert results[2]['error'] == 'Row must be a JSON object'
+    assert results[0]['user_info']['age'] == 30
+    assert results[3]['user_info']['age'] == 33
+
+
+def test_ndjson_malformed_line_fails_only_that_row(client):
+    lines = [json.dumps(user(40)), '{"age": 41,', '', json.dumps(user(42))]
+
+    response = client.post('/api/predict/batch', data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert (body['total'], body['succeeded'], body['failed']) == (3, 2, 1)
+    assert body['results'][1]['error'].startswith('Invalid JSON')
+    assert [r['user_info']['age'] for r in body['results'] if r['success']] == [40, 42]
+
+
+def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(ml_app, 'MAX_BATCH_SIZE', 2)
+
+    response = client.post('/api/predict/batch', json=[user(30)] * 3)
+
+    assert response.status_code == 413
+    assert 'max 2' in response.get_json()['error']
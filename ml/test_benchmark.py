@@ -0,0 +1,55 @@
+import io
+
+import numpy as np
+import PyPDF2
+
+import benchmark
+
+
+def test_summarise_percentiles_and_throughput():
+    samples = [1_000_000] * 99 + [11_000_000]   # 99 x 1 ms, one 11 ms outlier
+
+    result = benchmark.summarise(samples, items=10, unit='rows')
+
+    assert result['p50_ms'] == 1.0
+    assert result['max_ms'] == 11.0
+    assert result['throughput'] == round(100 * 10 / 0.11, 2)
+    assert result['throughput_unit'] == 'rows/s'
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'slow': {'p50_ms': 10.0}, 'tiny': {'p50_ms': 0.01}, 'fine': {'p50_ms': 5.0}}
+    current  = {'slow': {'p50_ms': 13.0}, 'tiny': {'p50_ms': 0.02}, 'fine': {'p50_ms': 5.2},
+                'new': {'p50_ms': 1.0}, 'gone': {'skipped': 'no models'}}
+
+    regressions = benchmark.compare(current, baseline)
+
+    assert [r['case'] for r in regressions] == ['slow']
+    assert regressions[0]['change'] == 0.3
+
+
+def test_synthetic_pdf_has_a_text_layer():
+    lines = benchmark.make_report_lines(np.random.default_rng(0))
+    pdf   = benchmark.make_text_pdf([lines, lines])
+
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf))
+
+    assert len(reader.pages) == 2
+    assert 'Total Cholesterol' in reader.pages[1].extract_text()
+
+
+def test_synthetic_models_stand_in_for_missing_ones():
+    import app as ml_app
+
+    model_set = benchmark.synthetic_model_set(np.random.default_rng(0), ml_app, n_estimators=5, max_depth=3)
+    matrix    = model_set.feature_builder.build(benchmark.make_payloads(np.random.default_rng(1), 8))
+
+    outputs = model_set.predictor.predict(matrix)
+    assert outputs.shape == (8, 4)
+    assert np.all(outputs[:, 0] > 0)
+
+
+def test_peak_rss_is_optional(monkeypatch):
+    monkeypatch.setattr(benchmark, 'resource', None)
+    assert benchmark.peak_rss_mb() is None
+    assert benchmark.summarise([1_000_000])['peak_rss_mb'] is None
@@ -0,0 +1,49 @@
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from encoders import CompiledEncoders
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+@pytest.fixture(scope='module')
+def label_encoders():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return joblib.load(os.path.join(MODELS_DIR, 'label_encoders.joblib'))
+
+
+@pytest.fixture(scope='module')
+def encoders(label_encoders):
+    return CompiledEncoders.from_label_encoders(label_encoders)
+
+
+def test_known_values_match_label_encoder(encoders, label_encoders):
+    for column, encoder in label_encoders.items():
+        classes = encoder.classes_.tolist()
+        expected = encoder.transform(classes)
+        np.testing.assert_array_equal(encoders.encode_many(column, classes), expected)
+        assert [encoders.encode(column, c) for c in classes] == expected.tolist()
+
+
+def test_unknown_values_use_default_code(encoders):
+    other = encoders.encode('Gender', 'Other')
+    assert encoders.encode('Gender', 'Unknown') == other
+    np.testing.assert_array_equal(
+        encoders.encode_many('Gender', ['Male', 'zzz', None, 'Female', '']),
+        [encoders.encode('Gender', 'Male'), other, other, encoders.encode('Gender', 'Female'), other])
+
+    # 'Low-Carb' is not a trained Dietary_Habits class; the form default is used
+    assert encoders.encode('Dietary_Habits', 'Low-Carb') == encoders.encode('Dietary_Habits', 'Regular')
+    assert encoders.encode_many('Allergies', []).shape == (0,)
+
+
+def test_classes_json_matches_joblib(encoders):
+    from_json = CompiledEncoders.from_classes_json(os.path.join(MODELS_DIR, 'label_encoders_classes.json'))
+    for column in encoders.tables:
+        assert from_json.classes(column) == encoders.classes(column)
+        assert from_json.default(column) == encoders.default(column)
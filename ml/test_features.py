@@ -0,0 +1,167 @@
+import json
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from encoders import CompiledEncoders
+from features import BASE_COLUMNS, ENGINEERED_COLUMNS, FeatureBuilder, engineered_mismatches, parse_record
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Feature frame exported from the training pipeline (CSV, one column per
+# metadata feature, categoricals label-encoded)
+TRAINING_FEATURES_CSV = os.environ.get('TRAINING_FEATURES_CSV', '')
+
+PAYLOADS = [
+    {'age': '25', 'gender': 'Male', 'height': '175', 'weight': '70', 'bmi': '22.86',
+     'diseases': ['None'], 'dietPreference': 'Regular', 'activityLevel': 'moderate', 'allergies': ''},
+    {'age': '30', 'gender': 'Female', 'height': '165', 'weight': '85', 'bmi': '31.22',
+     'diseases': ['Obesity'], 'dietPreference': 'Low-Carb', 'activityLevel': 'light', 'allergies': 'Nut Allergy'},
+    {'age': '55', 'gender': 'Male', 'height': '172', 'weight': '88', 'bmi': '29.75',
+     'diseases': ['Diabetes', 'Hypertension'], 'dietPreference': 'Vegetarian', 'activityLevel': 'very'},
+    {'age': 67, 'gender': 'Other', 'height': 158, 'weight': 45, 'bmi': 18.0,
+     'diseases': ['Hypertension'], 'dietPreference': 'Keto', 'activityLevel': 'sedentary'},
+    {'age': 41, 'gender': 'Unknown', 'height': 180, 'weight': 95, 'bmi': 29.3,
+     'diseases': ['Heart Disease'], 'activityLevel': 'unknown-level', 'allergies': 'Peanuts, dust'},
+    {'age': 19, 'gender': 'Female', 'height': 160, 'weight': 52, 'bmi': 20.3,
+     'diseases': [], 'dietPreference': 'Vegan', 'activityLevel': 'extra'},
+]
+
+
+@pytest.fixture(scope='module')
+def label_encoders():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return joblib.load(os.path.join(MODELS_DIR, 'label_encoders.joblib'))
+
+
+@pytest.fixture(scope='module')
+def builder(label_encoders):
+    with open(os.path.join(MODELS_DIR, 'metadata.json')) as f:
+        feature_columns = json.load(f)['feature_columns']
+    return FeatureBuilder(feature_columns, CompiledEncoders.from_label_encoders(label_encoders), engineered=True)
+
+
+def legacy_base_features(frontend_data, label_encoders):
+    """The original per-dict mapping, which only filled the base columns."""
+    def encode(column, value, fallback):
+        try:
+            return label_encoders[column].transform([value])[0]
+        except ValueError:
+            return label_encoders[column].transform([fallback])[0]
+
+    diseases = frontend_data.get('diseases', [])
+    chronic  = diseases[0] if diseases and diseases[0] != 'None' else 'None'
+    activity = frontend_data.get('activityLevel', 'moderate')
+    gender   = frontend_data.get('gender', 'Other')
+
+    out = {
+        'Age':       int(frontend_data.get('age', 30)),
+        'Height_cm': float(frontend_data.get('height', 170)),
+        'Weight_kg': float(frontend_data.get('weight', 70)),
+        'BMI':       float(frontend_data.get('bmi', 24.0)),
+        'Gender':          encode('Gender', gender, 'Other'),
+        'Chronic_Disease': encode('Chronic_Disease', chronic, 'None'),
+        'Allergies':       encode('Allergies', frontend_data.get('allergies', '').strip() or 'None', 'None'),
+        'Dietary_Habits':  encode('Dietary_Habits', frontend_data.get('dietPreference', 'Regular'), 'Regular'),
+        'Exercise_Frequency': {'sedentary': 0, 'light': 2, 'moderate': 4, 'very': 6, 'extra': 6}.get(activity, 3),
+        'Blood_Pressure_Systolic':  140 if chronic == 'Hypertension' else 120,
+        'Blood_Pressure_Diastolic': 90 if chronic == 'Hypertension' else 80,
+        'Cholesterol_Level': 250 if chronic in ['High Cholesterol', 'Heart Disease'] else 200,
+        'Blood_Sugar_Level': 180 if chronic == 'Diabetes' else 95,
+        'Genetic_Risk_Factor': encode(
+            'Genetic_Risk_Factor',
+            'Yes' if chronic in ['Heart Disease', 'Diabetes', 'Hypertension'] else 'No', 'No'),
+        'Daily_Steps': {'sedentary': 3000, 'light': 6000, 'moderate': 9000,
+                        'very': 12000, 'extra': 15000}.get(activity, 7000),
+        'Sleep_Hours': 7.0,
+        'Alcohol_Consumption': encode('Alcohol_Consumption', 'No', 'No'),
+        'Smoking_Habit':       encode('Smoking_Habit', 'No', 'No'),
+        'Preferred_Cuisine':   encode('Preferred_Cuisine', 'Western', 'Western'),
+        'Food_Aversions':      encode('Food_Aversions', 'None', 'None'),
+    }
+    bmr = 10 * out['Weight_kg'] + 6.25 * out['Height_cm'] - 5 * out['Age']
+    bmr += 5 if gender == 'Male' else -161
+    tdee = bmr * {'sedentary': 1.2, 'light': 1.375, 'moderate': 1.55,
+                  'very': 1.725, 'extra': 1.9}.get(activity, 1.55)
+    out['Caloric_Intake']      = int(tdee)
+    out['Protein_Intake']      = int(tdee * 0.25 / 4)
+    out['Carbohydrate_Intake'] = int(tdee * 0.45 / 4)
+    out['Fat_Intake']          = int(tdee * 0.30 / 9)
+    return out
+
+
+def test_every_metadata_column_is_defined(builder):
+    assert builder.missing_columns == []
+    assert set(builder.feature_columns) == set(BASE_COLUMNS + ENGINEERED_COLUMNS)
+
+
+def test_base_columns_match_legacy_mapping(builder, label_encoders):
+    matrix = builder.build(PAYLOADS)
+    for row, payload in zip(matrix, PAYLOADS):
+        expected = legacy_base_features(payload, label_encoders)
+        for col in BASE_COLUMNS:
+            assert row[builder.feature_columns.index(col)] == pytest.approx(expected[col]), col
+
+
+def test_engineered_columns(builder, label_encoders):
+    columns = builder.compute_columns([parse_record(p) for p in PAYLOADS])
+    bmi_classes = list(label_encoders['BMI_Category'].classes_)
+    age_classes = list(label_encoders['Age_Group'].classes_)
+
+    # 22.86 Normal, 31.22 Obese, 29.75 Overweight, 18.0 Underweight
+    assert [bmi_classes[c] for c in columns['BMI_Category'][:4]] == ['Normal', 'Obese', 'Overweight', 'Underweight']
+    # 25 Young, 30 Adult, 55 MiddleAge, 67 Senior
+    assert [age_classes[c] for c in columns['Age_Group'][:4]] == ['Young', 'Adult', 'MiddleAge', 'Senior']
+
+    np.testing.assert_allclose(columns['BP_Pulse_Pressure'][:4], [40, 40, 40, 50])
+    np.testing.assert_allclose(columns['Weight_Height_ratio'], columns['Weight_kg'] / columns['Height_cm'])
+    np.testing.assert_allclose(columns['Sugar_Chol_ratio'][2], 180 / 200)
+    np.testing.assert_allclose(
+        columns['Prot_ratio'] + columns['Carb_ratio'] + columns['Fat_ratio'], 1.0, atol=0.01)
+
+
+def test_batch_matches_single_rows(builder):
+    matrix = builder.build(PAYLOADS)
+    for i, payload in enumerate(PAYLOADS):
+        np.testing.assert_array_equal(builder.build([payload])[0], matrix[i])
+    assert builder.build([]).shape == (0, len(builder.feature_columns))
+
+
+def test_engineered_columns_off_by_default(builder):
+    plain  = FeatureBuilder(builder.feature_columns, builder.encoders)
+    matrix = plain.build(PAYLOADS)
+    for col in ENGINEERED_COLUMNS:
+        assert not matrix[:, plain.feature_columns.index(col)].any(), col
+    base = [builder.feature_columns.index(col) for col in BASE_COLUMNS]
+    np.testing.assert_array_equal(matrix[:, base], builder.build(PAYLOADS)[:, base])
+
+
+def test_engineered_mismatches_flags_a_wrong_formula(builder):
+    columns = builder.compute_columns([parse_record(p) for p in PAYLOADS])
+    assert engineered_mismatches(columns, builder.encoders) == []
+
+    columns['Macro_Balance'] = columns['Macro_Balance'] * 2
+    assert engineered_mismatches(columns, builder.encoders) == ['Macro_Balance']
+
+
+@pytest.mark.skipif(not os.path.exists(TRAINING_FEATURES_CSV),
+                    reason='set TRAINING_FEATURES_CSV to an exported training feature frame')
+def test_engineered_columns_match_training_features(builder):
+    data    = np.genfromtxt(TRAINING_FEATURES_CSV, delimiter=',', names=True)
+    columns = {name: data[name] for name in data.dtype.names}
+    assert engineered_mismatches(columns, builder.encoders) == []
+
+
+def test_engineered_columns_skipped_when_not_used(builder):
+    classes = {name: table.classes.tolist() for name, table in builder.encoders.tables.items()
+               if name not in ('BMI_Category', 'Age_Group')}
+    plain   = FeatureBuilder(BASE_COLUMNS, CompiledEncoders(classes), engineered=True)
+    columns = plain.compute_columns([parse_record(p) for p in PAYLOADS])
+
+    assert not plain.uses_engineered
+    assert 'BMI_Category' not in columns
+    assert plain.build(PAYLOADS).shape == (len(PAYLOADS), len(BASE_COLUMNS))
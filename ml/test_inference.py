@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from inference import MACRO_TARGETS, MacroPredictor
+
+
+N_FEATURES = 38
+
+
+def make_data(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, N_FEATURES)) * 50
+    X[rng.random(X.shape) < 0.05] = np.nan   # exercise default directions
+    return X
+
+
+@pytest.fixture(scope='module')
+def models_dir(tmp_path_factory):
+    """Train four small regressors and save them the way load_models() expects."""
+    path = tmp_path_factory.mktemp('models')
+    X = make_data(600, seed=0)
+    rng = np.random.default_rng(0)
+    for i, name in enumerate(MACRO_TARGETS):
+        y = np.nan_to_num(X[:, i]) * (i + 1) + np.nan_to_num(X[:, i + 4]) ** 2 / 100 + 1000
+        params = dict(n_estimators=40, max_depth=3 + i, learning_rate=0.2, random_state=i)
+        if name == 'fats':
+            # Early stopping on a noisy target leaves a best_iteration the
+            # predictor must honour
+            y = y + rng.normal(scale=200, size=len(y))
+            model = xgb.XGBRegressor(**params, early_stopping_rounds=5)
+            model.fit(X[:500], y[:500], eval_set=[(X[500:], y[500:])], verbose=False)
+        else:
+            model = xgb.XGBRegressor(**params)
+            model.fit(X, y)
+        model.save_model(str(path / f'{name}_model.ubj'))
+    return path
+
+
+def reference_predictions(models_dir, X):
+    """The previous path: one XGBRegressor.predict per target."""
+    columns = []
+    for name in MACRO_TARGETS:
+        model = xgb.XGBRegressor()
+        model.load_model(str(models_dir / f'{name}_model.ubj'))
+        columns.append(model.predict(X))
+    return np.column_stack(columns)
+
+
+@pytest.mark.parametrize('backend', ['compiled', 'booster'])
+def test_parity_with_four_model_predict(models_dir, backend):
+    predictor = MacroPredictor.from_dir(str(models_dir), backend=backend)
+    assert predictor.backend == backend
+
+    X = make_data(300, seed=1)
+    expected = reference_predictions(models_dir, X)
+    actual   = predictor.predict(X)
+
+    assert actual.shape == (300, len(MACRO_TARGETS))
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-3)
+
+
+def test_single_row_matches_batch(models_dir):
+    predictor = MacroPredictor.from_dir(str(models_dir))
+    X = make_data(5, seed=2)
+    batch = predictor.predict(X)
+    for i in range(len(X)):
+        np.testing.assert_array_equal(predictor.predict(X[i]), batch[i:i + 1])
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+import ocr_processor
+from ocr_processor import detect_text_regions, ocr_image_regions, order_region_texts
+
+
+def report_page():
+    """A4 page at 300 DPI: header, patient line, logo, lab table, filler, allergy line."""
+    image = Image.new('L', (2480, 3508), 255)
+    draw  = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 36)
+    except OSError:
+        pytest.skip('DejaVuSans font not available')
+    draw.text((150, 120), "CITY HOSPITAL LABORATORY", fill=0, font=font)
+    draw.text((150, 260), "Patient Name: John Perera    Age: 45", fill=0, font=font)
+    draw.rectangle((1700, 100, 2300, 600), fill=0)
+    for i in range(8):
+        draw.text((150, 900 + i * 60), f"Total Cholesterol {200 + i} mg/dL   LDL {100 + i}", fill=0, font=font)
+    for i in range(5):
+        draw.text((150, 2200 + i * 60), "Lorem ipsum dolor sit amet consectetur", fill=0, font=font)
+    draw.text((150, 3000), "Allergies: Penicillin", fill=0, font=font)
+    return np.array(image)
+
+
+# Stand-in OCR output for each block, keyed by its top edge
+BLOCK_TEXT = {
+    100:  "CITY HOSPITAL LABORATORY",
+    250:  "Patient Name: John Perera Age: 45",
+    890:  "Total Cholesterol: 240 mg/dL\nLDL: 160 mg/dL\nHbA1c: 6.8 %\nBlood Pressure: 140/90",
+    2190: "Lorem ipsum dolor sit amet consectetur",
+    2990: "Allergies: Penicillin",
+}
+
+
+class FakeEngine:
+    name = 'fake'
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []
+
+    def image_to_string(self, image, config=''):
+        width, height = image.size
+        box = next(b for b in self.boxes if (b[2], b[3]) == (width, height))
+        self.calls.append(box)
+        top = min(BLOCK_TEXT, key=lambda t: abs(t - box[1]))
+        return BLOCK_TEXT[top]
+
+    def version(self):
+        return 'fake'
+
+
+@pytest.fixture
+def page_and_engine(monkeypatch):
+    page   = report_page()
+    engine = FakeEngine(detect_text_regions(page))
+    monkeypatch.setattr(ocr_processor, 'OCR_WORKERS', 1)
+    monkeypatch.setattr(ocr_processor, '_ocr_engine', engine)
+    return page, engine
+
+
+def test_regions_cover_text_blocks_only():
+    page  = report_page()
+    boxes = detect_text_regions(page)
+
+    assert len(boxes) == 5
+    # Header band first, then reading order
+    assert [b[1] // 100 for b in boxes] == [1, 2, 8, 21, 29]
+    # The solid logo is not a text region
+    assert all(b[0] < 1600 for b in boxes)
+    assert sum(w * h for _, _, w, h in boxes) < 0.15 * page.size
+
+
+def test_regions_are_joined_keyword_richest_first(page_and_engine):
+    page, engine = page_and_engine
+    text = ocr_image_regions(Image.fromarray(page), policy='exhaustive')
+
+    blocks = text.split('\n')
+    assert blocks[0] == 'Total Cholesterol: 240 mg/dL'
+    assert len(engine.calls) == 5
+    assert ocr_processor.extract_medical_info(text)['allergies']
+
+
+def test_early_exit_skips_remaining_regions(page_and_engine, monkeypatch):
+    page, engine = page_and_engine
+    monkeypatch.setattr(ocr_processor, 'OCR_WORKERS', 3)
+    monkeypatch.setattr(ocr_processor, 'get_ocr_pool', lambda: None)
+
+    ocr_image_regions(Image.fromarray(page), policy='early_exit',
+                      required_fields=['name', 'age', 'total_cholesterol'])
+    assert len(engine.calls) == 3
+
+
+def test_blank_page_has_no_layout():
+    blank = np.full((1000, 800), 255, dtype=np.uint8)
+    assert detect_text_regions(blank) == []
+    assert ocr_image_regions(Image.fromarray(blank)) is None
+
+
+def test_order_region_texts_is_stable_for_ties():
+    assert order_region_texts(['a', 'Name: X', 'b', '', 'Age 4 Glucose 5']) == [
+        'Age 4 Glucose 5', 'Name: X', 'a', 'b'
+    ]
+
+
+def columnar_table_page():
+    """Lab table with the labels and values in columns far apart."""
+    image = Image.new('L', (2480, 3508), 255)
+    draw  = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 36)
+    except OSError:
+        pytest.skip('DejaVuSans font not available')
+    rows = [('Total Cholesterol', '245 mg/dl'), ('LDL Cholesterol', '160 mg/dl'),
+            ('HDL Cholesterol', '42 mg/dl'), ('Fasting Blood Sugar', '126 mg/dl')]
+    for i, (label, value) in enumerate(rows):
+        draw.text((150, 1000 + i * 60), label, fill=0, font=font)
+        draw.text((1400, 1000 + i * 60), value, fill=0, font=font)
+    return np.array(image)
+
+
+def test_table_columns_are_one_region():
+    boxes = detect_text_regions(columnar_table_page())
+
+    assert len(boxes) == 1
+    x, y, w, h = boxes[0]
+    assert x < 150 and x + w > 1500
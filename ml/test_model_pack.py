@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from inference import CompiledForest, MacroPredictor
+from model_pack import ModelPack, write_model_pack
+
+
+TARGETS = ['calories', 'protein']
+
+
+@pytest.fixture(scope='module')
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    boosters = []
+    for i, name in enumerate(TARGETS):
+        model = xgb.XGBRegressor(n_estimators=20, max_depth=3 + i, random_state=i)
+        model.fit(X, X[:, i] * 100 + 2000)
+        boosters.append(model.get_booster())
+    return CompiledForest(boosters)
+
+
+def write_pack(path, forest):
+    metadata = {'feature_columns': [f'f{i}' for i in range(6)], 'sklearn_version': '1.x'}
+    classes  = {'Gender': ['Female', 'Male', 'Other']}
+    write_model_pack(str(path), forest, TARGETS, metadata, classes, 'abc123')
+
+
+def test_round_trip_predicts_identically(tmp_path, forest):
+    write_pack(tmp_path / 'model_pack.bin', forest)
+    pack = ModelPack(str(tmp_path / 'model_pack.bin'))
+
+    X = np.random.default_rng(1).normal(size=(200, 6))
+    X[::7, 2] = np.nan
+    np.testing.assert_array_equal(pack.forest.predict(X), forest.predict(X))
+    assert MacroPredictor.from_forest(pack.forest, pack.targets).predict_dict(X).keys() == set(TARGETS)
+
+    assert pack.version == 'abc123'
+    assert pack.feature_columns[0] == 'f0'
+    assert pack.encoder_classes['Gender'] == ['Female', 'Male', 'Other']
+
+
+def test_arrays_are_read_only_views(tmp_path, forest):
+    write_pack(tmp_path / 'model_pack.bin', forest)
+    pack = ModelPack(str(tmp_path / 'model_pack.bin'))
+
+    for name in CompiledForest.ARRAY_FIELDS:
+        array = getattr(pack.forest, name)
+        assert not array.flags.writeable
+        assert array.ctypes.data % 64 == 0 or array.size == 0
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'model_pack.bin'
+    path.write_bytes(b'not a pack' * 10)
+
+    with pytest.raises(ValueError):
+        ModelPack(str(path))
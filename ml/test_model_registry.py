@@ -0,0 +1,85 @@
+import pytest
+
+from model_registry import ModelRegistry, ModelSet, ModelsUnavailable, files_version
+
+
+def model_set(version):
+    return ModelSet(version, predictor=object(), metadata={}, label_encoders={}, encoders={}, feature_builder=object())
+
+
+def loader_for(versions):
+    versions = iter(versions)
+    return lambda: model_set(next(versions))
+
+
+def test_reload_switches_active_version():
+    registry = ModelRegistry(loader_for(['v1', 'v2']))
+
+    with pytest.raises(ModelsUnavailable):
+        with registry.acquire():
+            pass
+
+    assert registry.reload()
+    assert registry.version == 'v1'
+    assert registry.reload()
+    assert registry.version == 'v2'
+
+
+def test_in_flight_request_keeps_old_set_until_released():
+    registry = ModelRegistry(loader_for(['v1', 'v2']))
+    registry.reload()
+
+    with registry.acquire() as held:
+        registry.reload()
+        assert registry.version == 'v2'
+        assert held.predictor is not None
+        assert registry.stats()['in_flight'] == {'v1': 1, 'v2': 0}
+
+    assert held.predictor is None
+    assert registry.stats()['in_flight'] == {'v2': 0}
+
+
+def test_failed_validation_keeps_current_set():
+    def validate(candidate):
+        if candidate.version == 'bad':
+            raise ValueError('smoke batch failed')
+
+    registry = ModelRegistry(loader_for(['v1', 'bad']), validate=validate)
+    registry.reload()
+
+    assert not registry.reload()
+    assert registry.version == 'v1'
+    assert registry.active.predictor is not None
+    assert 'smoke batch failed' in registry.stats()['last_error']
+
+
+def test_file_change_reloads_once_stable(tmp_path):
+    model = tmp_path / 'calories_model.ubj'
+    model.write_bytes(b'v1')
+    registry = ModelRegistry(loader_for(['v1', 'v2']), watch_paths=[str(model)])
+    registry.reload()
+
+    assert not registry.check_for_changes()
+    model.write_bytes(b'version 2')
+    assert not registry.check_for_changes()
+    assert registry.check_for_changes()
+    assert registry.version == 'v2'
+
+
+def test_admin_reload_touches_trigger(tmp_path):
+    trigger  = tmp_path / '.reload'
+    registry = ModelRegistry(loader_for(['v1', 'v2']), trigger_path=str(trigger))
+    registry.reload()
+
+    assert registry.request_reload()
+    assert trigger.exists()
+    assert not registry.check_for_changes()
+
+
+def test_files_version_follows_content(tmp_path):
+    model = tmp_path / 'calories_model.ubj'
+    model.write_bytes(b'v1')
+    first = files_version([str(model)])
+    model.write_bytes(b'v2')
+
+    assert files_version([str(model)]) != first
@@ -0,0 +1,64 @@
+import io
+
+import ocr_processor
+from ocr_processor import OCRResultCache
+
+
+class Upload(io.BytesIO):
+    """Minimal stand-in for werkzeug's FileStorage."""
+
+    def __init__(self, data, filename):
+        super().__init__(data)
+        self.filename = filename
+
+
+def test_key_depends_on_bytes_type_and_version(monkeypatch):
+    key = OCRResultCache.make_key(b'report', 'a.pdf')
+    assert key == OCRResultCache.make_key(b'report', 'other-name.PDF')
+    assert key != OCRResultCache.make_key(b'report', 'a.png')
+    assert key != OCRResultCache.make_key(b'report2', 'a.pdf')
+    monkeypatch.setattr(ocr_processor, 'OCR_CONFIG_VERSION', 'next')
+    assert key != OCRResultCache.make_key(b'report', 'a.pdf')
+
+
+def test_memory_lru_and_ttl(monkeypatch):
+    cache = OCRResultCache(max_entries=2, ttl_seconds=60)
+    cache.put('a', {'v': 1})
+    cache.put('b', {'v': 2})
+    assert cache.get('a') == {'v': 1}      # a is now most recent
+    cache.put('c', {'v': 3})               # evicts b
+    assert cache.get('b') is None
+    assert cache.get('c') == {'v': 3}
+
+    now = ocr_processor.time.time()
+    monkeypatch.setattr(ocr_processor.time, 'time', lambda: now + 61)
+    assert cache.get('a') is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    OCRResultCache(max_entries=4, cache_dir=str(tmp_path)).put('k', {'v': 1})
+    fresh = OCRResultCache(max_entries=4, cache_dir=str(tmp_path))
+    assert fresh.get('k') == {'v': 1}
+
+    small = OCRResultCache(max_entries=0, cache_dir=str(tmp_path), disk_max_entries=2)
+    for key in ('x', 'y', 'z'):
+        small.put(key, {'v': key})
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+
+def test_repeat_upload_skips_ocr(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'ocr_cache', OCRResultCache(max_entries=4))
+    calls = []
+
+    def fake_extract(file, page_report=None):
+        calls.append(file.filename)
+        return 'Patient Name: Jane Doe\nTotal Cholesterol: 250 mg/dl'
+
+    monkeypatch.setattr(ocr_processor, 'extract_text_from_file', fake_extract)
+
+    first  = ocr_processor.process_medical_report(Upload(b'%PDF-1 bytes', 'lab.pdf'))
+    second = ocr_processor.process_medical_report(Upload(b'%PDF-1 bytes', 'copy.pdf'))
+
+    assert calls == ['lab.pdf']
+    assert first == second
+    assert second['diseases'] == ['High Cholesterol']
@@ -0,0 +1,88 @@
+import stat
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import ocr_processor
+from ocr_processor import TesseractCLIEngine, TesseractUnavailable, get_ocr_engine, parse_tesseract_config
+
+
+FAKE_TESSERACT = '''#!{python}
+import sys
+if sys.argv[1:] == ['--version']:
+    print('tesseract 5.3.0')
+    sys.exit(0)
+data = sys.stdin.buffer.read()
+with open({calls!r}, 'a') as calls:
+    calls.write(' '.join(sys.argv[1:]) + '\\n')
+sys.stdout.write('header=%s bytes=%d' % (data[:2].decode(), len(data)))
+'''
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path):
+    calls = tmp_path / 'calls.txt'
+    path  = tmp_path / 'tesseract'
+    path.write_text(FAKE_TESSERACT.format(python=sys.executable, calls=str(calls)))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path), calls
+
+
+def test_cli_engine_pipes_pnm_without_temp_files(fake_tesseract, tmp_path, monkeypatch):
+    cmd, calls = fake_tesseract
+    monkeypatch.setenv('TMPDIR', str(tmp_path / 'unused'))
+
+    engine = TesseractCLIEngine(cmd=cmd, lang='eng')
+    text   = engine.image_to_string(Image.new('L', (40, 20), 255), config='--psm 6')
+
+    # Greyscale pages go over the pipe as binary PGM ("P5")
+    assert text.startswith('header=P5 bytes=')
+    assert calls.read_text().strip() == 'stdin stdout -l eng --psm 6'
+    assert not (tmp_path / 'unused').exists()
+
+
+def test_version_is_looked_up_once(fake_tesseract):
+    cmd, _ = fake_tesseract
+    engine = TesseractCLIEngine(cmd=cmd)
+    assert engine.version() == '5.3.0'
+
+    engine.cmd = '/nonexistent/tesseract'
+    assert engine.version() == '5.3.0'
+
+
+def test_missing_binary_raises_unavailable():
+    engine = TesseractCLIEngine(cmd='/nonexistent/tesseract')
+    with pytest.raises(TesseractUnavailable):
+        engine.version()
+    with pytest.raises(TesseractUnavailable):
+        engine.image_to_string(Image.new('L', (10, 10), 255))
+
+
+def test_engine_is_shared_per_process(monkeypatch):
+    monkeypatch.setattr(ocr_processor, '_ocr_engine', None)
+    monkeypatch.setattr(ocr_processor, 'OCR_ENGINE', 'auto')
+    monkeypatch.setattr(ocr_processor, 'tesserocr', None)
+
+    engine = get_ocr_engine()
+    assert engine.name == 'cli'
+    assert get_ocr_engine() is engine
+
+
+def test_parse_tesseract_config():
+    assert parse_tesseract_config('--psm 6') == (6, None, {})
+    assert parse_tesseract_config('--oem 1 --psm 4 -c preserve_interword_spaces=1') == (
+        4, 1, {'preserve_interword_spaces': '1'}
+    )
+    assert parse_tesseract_config('') == (None, None, {})
+
+
+def test_cli_engine_streams_arrays_from_their_buffer(fake_tesseract):
+    cmd, _ = fake_tesseract
+    engine = TesseractCLIEngine(cmd=cmd)
+    page   = np.full((20, 40), 255, dtype=np.uint8)
+
+    text = engine.image_to_string(page, config='--psm 6')
+    header = b'P5\n40 20\n255\n'
+    assert text == f'header=P5 bytes={len(header) + page.size}'
@@ -0,0 +1,68 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import ocr_processor
+from ocr_processor import ocr_pages
+
+
+def slow_echo(image, config=''):
+    """Pool worker: later pages finish first."""
+    time.sleep(0.05 * (4 - image))
+    return f'page {image}'
+
+
+def echo(image, config=''):
+    if image == 'bad':
+        raise ValueError('unreadable page')
+    return f'page {image}'
+
+
+class BrokenPool:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        return future
+
+
+@pytest.fixture
+def slots(monkeypatch):
+    slots = threading.BoundedSemaphore(2)
+    monkeypatch.setattr(ocr_processor, '_ocr_page_slots', slots)
+    return slots
+
+
+def test_pool_returns_pages_in_order(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'OCR_WORKERS', 4)
+    monkeypatch.setattr(ocr_processor, 'OCR_POOL_START_METHOD', 'fork')
+    monkeypatch.setattr(ocr_processor, '_ocr_pool', None)
+    try:
+        assert ocr_pages([0, 1, 2, 3], worker=slow_echo) == ['page 0', 'page 1', 'page 2', 'page 3']
+    finally:
+        ocr_processor.shutdown_ocr_pool()
+
+
+def test_failed_page_releases_its_slot(monkeypatch, slots):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(ocr_processor, 'get_ocr_pool', lambda: pool)
+
+    with pytest.raises(ValueError):
+        ocr_pages([1, 'bad', 3, 4], worker=echo)
+    pool.shutdown(wait=True)
+
+    # Every slot is back: both can be taken, and a BoundedSemaphore
+    # would have raised on a double release
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+
+
+def test_broken_pool_falls_back_to_serial(monkeypatch, slots):
+    shutdowns = []
+    monkeypatch.setattr(ocr_processor, 'get_ocr_pool', lambda: BrokenPool())
+    monkeypatch.setattr(ocr_processor, 'shutdown_ocr_pool', lambda: shutdowns.append(True))
+
+    assert ocr_pages([1, 2, 3], worker=echo) == ['page 1', 'page 2', 'page 3']
+    assert shutdowns == [True]
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
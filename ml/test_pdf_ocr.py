@@ -0,0 +1,156 @@
+import io
+
+from PIL import Image
+
+import ocr_processor
+
+
+def fake_pdf(monkeypatch, page_texts):
+    """Pretend every PDF has `page_texts` pages and record each render."""
+    renders = []
+
+    def fake_info(path):
+        return {'Pages': len(page_texts)}
+
+    def fake_convert(path, dpi, first_page, last_page):
+        renders.append((first_page, last_page, dpi))
+        return [Image.new('L', (10, 10), color=p) for p in range(first_page, last_page + 1)]
+
+    def fake_ocr_page(image, config=''):
+        return page_texts[image.getpixel((0, 0)) - 1]
+
+    monkeypatch.setattr(ocr_processor, 'pdfinfo_from_path', fake_info)
+    monkeypatch.setattr(ocr_processor, 'convert_from_path', fake_convert)
+    monkeypatch.setattr(ocr_processor, 'ocr_page', fake_ocr_page)
+    monkeypatch.setattr(ocr_processor, 'OCR_WORKERS', 1)
+    return renders
+
+
+def test_pages_rendered_in_windows_and_kept_in_order(monkeypatch):
+    renders = fake_pdf(monkeypatch, [f'page {i}' for i in range(1, 6)])
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_PAGE_WINDOW', 2)
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_DPI', 150)
+
+    text = ocr_processor.ocr_pdf_file(io.BytesIO(b'%PDF-1.4'))
+
+    assert text == 'page 1\npage 2\npage 3\npage 4\npage 5'
+    assert renders == [(1, 2, 150), (3, 4, 150), (5, 5, 150)]
+
+
+def test_page_cap(monkeypatch):
+    renders = fake_pdf(monkeypatch, [f'page {i}' for i in range(1, 8)])
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_PAGE_WINDOW', 4)
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_MAX_PAGES', 3)
+
+    assert ocr_processor.ocr_pdf_file(io.BytesIO(b'%PDF-1.4')) == 'page 1\npage 2\npage 3'
+    assert renders[-1][1] == 3
+
+
+REPORT_PAGES = [
+    'Patient Name: Jane Doe\nAge: 52 years\nBP: 150/95',
+    'Total Cholesterol: 245 mg/dl\nFasting Blood Sugar: 130 mg/dl\nHbA1c: 7.1 %',
+    'Physician notes: patient is allergic to penicillin',
+]
+
+
+def test_early_exit_stops_once_required_fields_found(monkeypatch):
+    renders = fake_pdf(monkeypatch, REPORT_PAGES)
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_PAGE_WINDOW', 1)
+
+    text = ocr_processor.ocr_pdf_file(io.BytesIO(b'%PDF-1.4'), policy='early_exit')
+
+    assert [r[0] for r in renders] == [1, 2]
+    assert 'penicillin' not in text
+    assert ocr_processor.report_fields_found(text) >= set(ocr_processor.OCR_REQUIRED_FIELDS)
+
+
+def test_exhaustive_reads_every_page(monkeypatch):
+    renders = fake_pdf(monkeypatch, REPORT_PAGES)
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_PAGE_WINDOW', 1)
+
+    text = ocr_processor.ocr_pdf_file(io.BytesIO(b'%PDF-1.4'), policy='exhaustive')
+
+    assert len(renders) == 3
+    assert 'penicillin' in text
+
+
+class FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        return self.text
+
+
+def fake_text_layer(monkeypatch, layer_texts):
+    """Pretend PyPDF2 finds `layer_texts` ('' for a scanned page)."""
+    class FakeReader:
+        def __init__(self, stream):
+            self.pages = [FakePage(text) for text in layer_texts]
+
+    monkeypatch.setattr(ocr_processor.PyPDF2, 'PdfReader', FakeReader)
+
+
+LAYER_TEXT = 'Typed discharge summary for the patient, with plenty of text on the page.'
+
+
+def test_hybrid_pdf_only_ocrs_scanned_pages(monkeypatch):
+    renders = fake_pdf(monkeypatch, ['', 'scan 2', 'scan 3', '', 'scan 5'])
+    fake_text_layer(monkeypatch, [LAYER_TEXT, '', '', LAYER_TEXT, ''])
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_PAGE_WINDOW', 4)
+
+    report = []
+    text = ocr_processor.extract_text_from_pdf(io.BytesIO(b'%PDF-1.4'), page_report=report)
+
+    assert text == '\n'.join([LAYER_TEXT, 'scan 2', 'scan 3', LAYER_TEXT, 'scan 5'])
+    assert [(r[0], r[1]) for r in renders] == [(2, 3), (5, 5)]
+    assert [r['source'] for r in report] == ['text', 'ocr', 'ocr', 'text', 'ocr']
+
+
+def test_short_text_layer_counts_as_scanned(monkeypatch):
+    renders = fake_pdf(monkeypatch, ['Scanned page with the real results'])
+    fake_text_layer(monkeypatch, ['CamScanner'])
+
+    text = ocr_processor.extract_text_from_pdf(io.BytesIO(b'%PDF-1.4'))
+
+    assert text == 'Scanned page with the real results'
+    assert len(renders) == 1
+
+
+def test_text_layer_pdf_is_never_rasterised(monkeypatch):
+    renders = fake_pdf(monkeypatch, ['', ''])
+    fake_text_layer(monkeypatch, [LAYER_TEXT, LAYER_TEXT])
+
+    report = []
+    ocr_processor.extract_text_from_pdf(io.BytesIO(b'%PDF-1.4'), page_report=report)
+
+    assert renders == []
+    assert {r['source'] for r in report} == {'text'}
+
+
+def test_early_exit_counts_text_layer_fields(monkeypatch):
+    renders = fake_pdf(monkeypatch, ['', '', REPORT_PAGES[2]])
+    fake_text_layer(monkeypatch, REPORT_PAGES[:2] + [''])
+    monkeypatch.setattr(ocr_processor, 'OCR_EXTRACTION_POLICY', 'early_exit')
+    monkeypatch.setattr(ocr_processor, 'OCR_PDF_TEXT_MIN_CHARS', 20)
+
+    report = []
+    ocr_processor.extract_text_from_pdf(io.BytesIO(b'%PDF-1.4'), page_report=report)
+
+    assert renders == []
+    assert report[2]['source'] == 'skipped'
+
+
+def test_failed_ocr_keeps_text_layer_pages(monkeypatch):
+    fake_text_layer(monkeypatch, [LAYER_TEXT, ''])
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('Unable to get page count. Is poppler installed and in PATH?')
+
+    monkeypatch.setattr(ocr_processor, 'ocr_pdf_pages', broken)
+
+    report = []
+    text = ocr_processor.extract_text_from_pdf(io.BytesIO(b'%PDF-1.4'), page_report=report)
+
+    assert text == LAYER_TEXT
+    assert [r['source'] for r in report] == ['text', 'failed']
@@ -0,0 +1,282 @@
+import requests
+
+from plan_writer import (
+    CircuitBreaker, DietPlanWriter, PlanOutbox, PlanStatusStore, PersistenceError, post_diet_plan, with_idempotency_key
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body        = body or {}
+        self.text        = str(body)
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Replays a script of responses / exceptions, one per POST."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.posted = []
+
+    def post(self, url, json=None, timeout=None, headers=None):
+        self.posted.append(json)
+        step = self.script.pop(0) if self.script else FakeResponse(201, {'success': True, 'data': {'_id': 'x'}})
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+def make_writer(script, **kwargs):
+    writer = DietPlanWriter('http://backend/api/diet-plans', backoff_seconds=0, **kwargs)
+    writer.session = FakeSession(script)
+    return writer
+
+
+def test_plans_are_saved_in_background():
+    writer = make_writer([FakeResponse(201, {'success': True, 'data': {'_id': f'id{i}'}}) for i in range(5)])
+    ids = [writer.submit({'n': i}) for i in range(5)]
+    writer.flush(timeout=5)
+
+    assert [writer.status(p)['diet_plan_id'] for p in ids] == [f'id{i}' for i in range(5)]
+    assert [p['n'] for p in writer.session.posted] == list(range(5))
+    assert [p['idempotencyKey'] for p in writer.session.posted] == ids
+    assert writer.stats()['saved'] == 5
+    writer.stop()
+
+
+def test_connection_errors_are_retried_with_backoff():
+    writer = make_writer([
+        requests.exceptions.ConnectionError('down'),
+        FakeResponse(503, 'busy'),
+        FakeResponse(201, {'success': True, 'data': {'_id': 'abc'}}),
+    ], max_retries=3)
+    pending_id = writer.submit({'n': 1})
+    writer.flush(timeout=5)
+
+    assert writer.status(pending_id) == {'status': 'saved', 'diet_plan_id': 'abc'}
+    assert len(writer.session.posted) == 3
+    writer.stop()
+
+
+def test_client_errors_are_not_retried():
+    writer = make_writer([FakeResponse(400, 'bad payload')], max_retries=3)
+    writer.write_batch([('p1', {'n': 1})])
+
+    assert writer.status('p1')['status'] == 'failed'
+    assert len(writer.session.posted) == 1
+
+
+def test_full_queue_rejects_without_blocking():
+    writer = make_writer([], max_queue=2)
+    writer.start = lambda: None
+
+    assert writer.submit({'n': 1}) is not None
+    assert writer.submit({'n': 2}) is not None
+    assert writer.submit({'n': 3}) is None
+
+
+def test_persistence_error_retryable_flag():
+    assert PersistenceError('x').retryable
+    assert not PersistenceError('x', retryable=False).retryable
+
+
+def test_undeliverable_plans_go_to_outbox_and_replay(tmp_path):
+    outbox = PlanOutbox(str(tmp_path / 'outbox.db'))
+    down   = requests.exceptions.ConnectionError('down')
+    writer = make_writer([down, down], max_retries=1, outbox=outbox)
+
+    writer.write_batch([('p1', with_idempotency_key({'n': 1}, 'p1'))])
+    assert writer.status('p1')['status'] == 'outboxed'
+    assert len(outbox) == 1
+
+    # Reopening the file sees the same rows
+    assert PlanOutbox(str(tmp_path / 'outbox.db')).peek(10) == [{'n': 1, 'idempotencyKey': 'p1'}]
+
+    assert writer.replay_outbox() == 1
+    assert len(outbox) == 0
+    assert writer.status('p1')['status'] == 'saved'
+    assert writer.session.posted[-1]['idempotencyKey'] == 'p1'
+
+
+def test_replay_stops_at_first_failure(tmp_path):
+    outbox = PlanOutbox(str(tmp_path / 'outbox.db'))
+    for i in range(3):
+        outbox.add(with_idempotency_key({'n': i}, f'k{i}'))
+
+    writer = make_writer([requests.exceptions.ConnectionError('down')], outbox=outbox)
+    assert writer.replay_outbox() == 0
+    assert len(writer.session.posted) == 1
+    assert len(outbox) == 3
+
+
+def test_full_queue_spills_to_outbox(tmp_path):
+    outbox = PlanOutbox(str(tmp_path / 'outbox.db'))
+    writer = make_writer([], max_queue=1, outbox=outbox)
+    writer.start = lambda: None
+
+    writer.submit({'n': 1})
+    pending_id = writer.submit({'n': 2})
+
+    assert writer.status(pending_id)['status'] == 'outboxed'
+    assert outbox.peek(10) == [{'n': 2, 'idempotencyKey': pending_id}]
+
+
+def test_outbox_ignores_duplicate_keys(tmp_path):
+    outbox = PlanOutbox(str(tmp_path / 'outbox.db'))
+    outbox.add({'n': 1, 'idempotencyKey': 'same'})
+    outbox.add({'n': 1, 'idempotencyKey': 'same'})
+    assert len(outbox) == 1
+
+
+def test_idempotency_key_is_sent_as_header():
+    session = FakeSession([FakeResponse(201, {'success': True, 'data': {'_id': 'a'}})])
+    seen    = {}
+    post    = session.post
+
+    def capture(url, json=None, timeout=None, headers=None):
+        seen.update(headers or {})
+        return post(url, json=json, timeout=timeout, headers=headers)
+
+    session.post = capture
+    post_diet_plan(session, 'http://backend', {'idempotencyKey': 'k1'})
+    assert seen == {'Idempotency-Key': 'k1'}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_states():
+    clock   = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    # One probe after the reset period; a failed probe reopens
+    clock.now = 10
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.snapshot()['times_opened'] == 2
+
+
+def test_open_circuit_skips_network_and_outboxes(tmp_path):
+    clock   = FakeClock()
+    outbox  = PlanOutbox(str(tmp_path / 'outbox.db'))
+    down    = requests.exceptions.ConnectionError('down')
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    writer  = make_writer([down] * 10, max_retries=5, outbox=outbox, breaker=breaker)
+
+    # Retries stop as soon as the circuit opens
+    writer.write_batch([(f'p{i}', with_idempotency_key({'n': i}, f'p{i}')) for i in range(3)])
+    assert len(writer.session.posted) == 2
+    assert len(outbox) == 3
+    assert writer.replay_outbox() == 0
+    assert len(writer.session.posted) == 2
+
+    # Backend back: the half-open probe succeeds and the outbox drains
+    writer.session.script = []
+    clock.now = 10
+    assert writer.replay_outbox() == 3
+    assert breaker.state == 'closed'
+    assert len(outbox) == 0
+
+
+def test_client_errors_do_not_open_circuit():
+    breaker = CircuitBreaker(failure_threshold=1)
+    writer  = make_writer([FakeResponse(400, 'bad')], breaker=breaker)
+    writer.write_batch([('p1', {'n': 1})])
+    assert breaker.state == 'closed'
+
+
+def test_unexpected_errors_map_to_retryable_failures():
+    class BadJSON(FakeResponse):
+        def json(self):
+            raise ValueError('Expecting value')
+
+    for step in [requests.exceptions.TooManyRedirects('loop'), BadJSON(200)]:
+        try:
+            post_diet_plan(FakeSession([step]), 'http://backend', {})
+        except PersistenceError as e:
+            assert e.retryable
+        else:
+            raise AssertionError('expected PersistenceError')
+
+
+def test_writer_thread_survives_unexpected_errors():
+    writer = make_writer([RuntimeError('bug'), FakeResponse(201, {'success': True, 'data': {'_id': 'ok'}})])
+    first  = writer.submit({'n': 1})
+    writer.flush(timeout=5)
+    second = writer.submit({'n': 2})
+    writer.flush(timeout=5)
+
+    assert writer.status(first) == {'status': 'failed', 'diet_plan_id': None, 'error': 'bug'}
+    assert writer.status(second) == {'status': 'saved', 'diet_plan_id': 'ok'}
+    assert writer._thread.is_alive()
+    writer.stop()
+
+
+def test_status_is_shared_through_the_store(tmp_path):
+    path   = str(tmp_path / 'status.db')
+    writer = make_writer([FakeResponse(201, {'success': True, 'data': {'_id': 'abc'}})],
+                         status_store=PlanStatusStore(path))
+    pending_id = writer.submit({'n': 1})
+    writer.flush(timeout=5)
+
+    # Another worker process opens the same database
+    other = DietPlanWriter('http://backend', status_store=PlanStatusStore(path))
+    assert other.status(pending_id) == {'status': 'saved', 'diet_plan_id': 'abc'}
+    assert other.status('unknown') is None
+    writer.stop()
+
+
+def test_status_store_keeps_the_newest_entries(tmp_path):
+    store = PlanStatusStore(str(tmp_path / 'status.db'), max_entries=5)
+    store.PRUNE_EVERY = 1
+    for i in range(8):
+        store.put(f'p{i}', {'status': 'pending', 'diet_plan_id': None})
+    store.update('p0', {'status': 'saved', 'diet_plan_id': 'x'})
+
+    assert store.get('p0') is None
+    assert store.get('p7') == {'status': 'pending', 'diet_plan_id': None}
+    store.update('p7', {'status': 'failed', 'diet_plan_id': None, 'error': 'bad'})
+    assert store.get('p7') == {'status': 'failed', 'diet_plan_id': None, 'error': 'bad'}
+
+
+def test_unexpected_error_releases_half_open_probe():
+    clock   = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    writer  = make_writer([RuntimeError('bug')], breaker=breaker)
+    breaker.record_failure()
+
+    clock.now = 10
+    try:
+        writer.send({'n': 1})
+    except RuntimeError:
+        pass
+    assert breaker.state == 'open'
+
+    # The next reset period gets a fresh probe
+    clock.now = 20
+    assert writer.send({'n': 2}) == 'x'
+    assert breaker.state == 'closed'
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+PREDICTIONS = {'recommended_calories': 2100, 'recommended_protein': 90}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_depends_only_on_feature_values():
+    row = np.array([25.0, 1.0, 175.0])
+
+    assert PredictionCache.make_key(row) == PredictionCache.make_key(np.array([25, 1, 175]))
+    assert PredictionCache.make_key(row) != PredictionCache.make_key(np.array([26.0, 1.0, 175.0]))
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', PREDICTIONS)
+    cache.put('b', PREDICTIONS)
+    assert cache.get('a') == PREDICTIONS
+    cache.put('c', PREDICTIONS)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == PREDICTIONS
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = PredictionCache(ttl_seconds=60, clock=clock)
+    cache.put('a', PREDICTIONS)
+
+    clock.now = 61
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_model_file_change_clears_cache(tmp_path):
+    model = tmp_path / 'calories_model.ubj'
+    model.write_bytes(b'v1')
+    clock = FakeClock()
+    cache = PredictionCache(watch_paths=[str(model)], check_seconds=5, clock=clock)
+    cache.put('a', PREDICTIONS)
+
+    model.write_bytes(b'version 2')
+    os.utime(model, ns=(0, 10**18))
+    assert cache.get('a') == PREDICTIONS
+
+    clock.now = 5
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(max_entries=0)
+    cache.put('a', PREDICTIONS)
+
+    assert cache.get('a') is None
+    assert cache.stats()['misses'] == 0
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+import ocr_processor
+from ocr_processor import choose_denoise, measure_image_quality, preprocess_image_with_report
+
+
+def text_page(width=1240, height=1754):
+    image = Image.new('L', (width, height), 255)
+    draw  = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 24)
+    except OSError:
+        font = ImageFont.load_default()
+    for i in range(30):
+        draw.text((80, 80 + i * 50), f"Total Cholesterol: {200 + i} mg/dL   Patient Name: John", fill=0, font=font)
+    return np.array(image)
+
+
+def rotate(gray, angle):
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), borderValue=255)
+
+
+def add_noise(gray, sigma, seed=0):
+    noise = np.random.default_rng(seed).normal(0, sigma, gray.shape)
+    return np.clip(gray + noise, 0, 255).astype(np.uint8)
+
+
+def test_clean_page_skips_denoising():
+    _, report = preprocess_image_with_report(Image.fromarray(text_page()))
+    assert report['denoise'] == 'none'
+    assert report['quality']['noise'] < ocr_processor.OCR_NOISE_MEDIAN
+    assert set(report['timings_ms']) >= {'grayscale', 'quality', 'threshold', 'denoise'}
+
+
+@pytest.mark.parametrize('sigma, expected', [(15, 'median'), (40, 'nlmeans')])
+def test_noisy_pages_are_denoised(sigma, expected):
+    _, report = preprocess_image_with_report(Image.fromarray(add_noise(text_page(), sigma)))
+    assert report['denoise'] == expected
+
+
+def test_blurry_page_skips_median():
+    assert choose_denoise({'noise': 6.0, 'blur': 50.0, 'contrast': 200.0}) == 'none'
+    assert choose_denoise({'noise': 6.0, 'blur': 5000.0, 'contrast': 200.0}) == 'median'
+
+
+@pytest.mark.parametrize('angle', [-4.0, 2.5])
+def test_deskew_recovers_rotation(angle):
+    _, report = preprocess_image_with_report(Image.fromarray(rotate(text_page(), angle)))
+    assert report['skew_angle'] == pytest.approx(-angle, abs=0.3)
+
+
+def test_low_dpi_upload_is_upscaled():
+    image = Image.fromarray(text_page(620, 877))
+    image.info['dpi'] = (150, 150)
+    processed, report = preprocess_image_with_report(image)
+    assert report['scale'] == 2.0
+    assert processed.size == (1240, 1754)
+
+
+def test_output_is_binary_rgb_input_accepted():
+    rgb = cv2.cvtColor(add_noise(text_page(), 15), cv2.COLOR_GRAY2RGB)
+    processed, _ = preprocess_image_with_report(Image.fromarray(rgb))
+    assert set(np.unique(np.asarray(processed))) <= {0, 255}
+
+
+def test_legacy_mode_matches_original_pipeline(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'OCR_PREPROCESS_MODE', 'legacy')
+    gray = add_noise(text_page(400, 300), 10)
+
+    processed, report = preprocess_image_with_report(Image.fromarray(gray))
+
+    _, threshold = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    expected     = cv2.fastNlMeansDenoising(threshold, None, 10, 7, 21)
+    assert report['denoise'] == 'nlmeans_full'
+    assert np.array_equal(np.asarray(processed), expected)
+
+
+def test_quality_metrics_track_noise():
+    clean = measure_image_quality(text_page())
+    noisy = measure_image_quality(add_noise(text_page(), 20))
+    assert noisy['noise'] > clean['noise'] + 5
@@ -0,0 +1,119 @@
+import io
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from report_jobs import JobQueueFull, JobStore, ReportJobQueue
+
+
+def wait_for(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def upload(data, filename):
+    stream = io.BytesIO(data)
+    stream.filename = filename
+    return stream
+
+
+def fake_process(file):
+    with file.open() as handle:
+        text = handle.read().decode()
+    if text == 'unreadable':
+        return {'success': False, 'error': 'Could not extract text from file.', 'diseases': [], 'allergies': ''}
+    if text == 'crash':
+        raise RuntimeError('boom')
+    return {'success': True, 'diseases': [text], 'allergies': '', 'filename': file.filename}
+
+
+def test_job_runs_in_background(tmp_path):
+    jobs   = ReportJobQueue(fake_process, JobStore(str(tmp_path / 'jobs.db')))
+    job_id = jobs.submit(upload(b'Diabetes', 'report.pdf'))
+
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == {'success': True, 'diseases': ['Diabetes'], 'allergies': '', 'filename': 'report.pdf'}
+    assert job['started_at'] <= job['finished_at']
+
+    # Another process on the host sees the same state
+    assert JobStore(str(tmp_path / 'jobs.db')).get(job_id)['status'] == 'done'
+
+
+def test_failed_jobs_report_the_error(tmp_path):
+    jobs = ReportJobQueue(fake_process, JobStore(str(tmp_path / 'jobs.db')))
+
+    unreadable = wait_for(jobs, jobs.submit(upload(b'unreadable', 'a.png')))
+    crashed    = wait_for(jobs, jobs.submit(upload(b'crash', 'b.png')))
+
+    assert unreadable['status'] == 'failed'
+    assert unreadable['error'].startswith('Could not extract text')
+    assert crashed['status'] == 'failed'
+    assert crashed['error'] == 'boom'
+    assert jobs.stats()['failed'] == 2
+
+
+def test_full_queue_rejects(tmp_path):
+    release = threading.Event()
+
+    def slow_process(file):
+        release.wait(5)
+        return fake_process(file)
+
+    jobs = ReportJobQueue(slow_process, JobStore(str(tmp_path / 'jobs.db')), workers=1, max_pending=1)
+    jobs.submit(upload(b'one', 'a.pdf'))
+    time.sleep(0.05)          # the worker picks up the first job
+    jobs.submit(upload(b'two', 'b.pdf'))
+
+    with pytest.raises(JobQueueFull):
+        jobs.submit(upload(b'three', 'c.pdf'))
+    assert jobs.stats()['rejected'] == 1
+    release.set()
+
+
+def test_unknown_job(tmp_path):
+    jobs = ReportJobQueue(fake_process, JobStore(str(tmp_path / 'jobs.db')))
+    assert jobs.get('missing') is None
+
+
+class FlakyStore(JobStore):
+    """Fails the first `failures` updates that set `status` (any status if None)."""
+
+    def __init__(self, path, status=None, failures=1):
+        super().__init__(path)
+        self.status   = status
+        self.failures = failures
+
+    def update(self, job_id, **fields):
+        if self.status in (None, fields.get('status')) and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError('database is locked')
+        super().update(job_id, **fields)
+
+
+def test_store_error_marks_job_failed(tmp_path):
+    jobs   = ReportJobQueue(fake_process, FlakyStore(str(tmp_path / 'jobs.db'), 'done'))
+    job_id = jobs.submit(upload(b'Diabetes', 'report.pdf'))
+
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'database is locked'
+
+
+def test_worker_thread_survives_store_errors(tmp_path):
+    jobs  = ReportJobQueue(fake_process, FlakyStore(str(tmp_path / 'jobs.db'), failures=2), workers=1)
+    first = jobs.submit(upload(b'Diabetes', 'a.pdf'))
+    jobs._queue.join()
+
+    # The failure could not be recorded either; the thread still takes the next job
+    assert jobs._threads[0].is_alive()
+    second = jobs.submit(upload(b'Asthma', 'b.pdf'))
+    assert wait_for(jobs, second)['status'] == 'done'
+    assert jobs.failed == 1
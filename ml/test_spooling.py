@@ -0,0 +1,91 @@
+import hashlib
+import io
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+import ocr_processor
+from ocr_processor import OCRResultCache, load_image_gray, preprocess_array
+from spooling import SpooledUpload, upload_path
+
+
+def file_storage(data, filename):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def encoded_page(fmt, dpi=None):
+    gray = np.full((300, 400), 255, dtype=np.uint8)
+    cv2.putText(gray, 'Cholesterol 240', (20, 150), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    rgb  = Image.fromarray(gray).convert('RGB')
+    buffer = io.BytesIO()
+    rgb.save(buffer, format=fmt, **({'dpi': dpi} if dpi else {}))
+    return buffer.getvalue(), gray
+
+
+def test_upload_is_spooled_once_and_hashed():
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    with SpooledUpload(file_storage(data, 'Report.PDF')) as upload:
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.size == len(data)
+        assert upload.path.endswith('.pdf')
+        with upload.mapped() as mapping:
+            assert mapping[:16] == data[:16] and len(mapping) == len(data)
+        path = upload.path
+    assert not os.path.exists(path)
+
+
+def test_upload_path_spools_file_objects_only(tmp_path):
+    source = tmp_path / 'scan.png'
+    source.write_bytes(b'png')
+    with upload_path(str(source)) as path:
+        assert path == str(source)
+    with upload_path(io.BytesIO(b'png'), '.png') as path:
+        assert open(path, 'rb').read() == b'png'
+    assert not os.path.exists(path)
+
+
+def test_cache_key_matches_bytes_key():
+    data = b'%PDF-1.4 report'
+    with SpooledUpload(file_storage(data, 'lab.pdf')) as upload:
+        assert OCRResultCache.make_key_from_digest(upload.sha256, upload.filename) == \
+            OCRResultCache.make_key(data, 'lab.pdf')
+
+
+def test_images_decode_straight_to_greyscale():
+    for fmt in ('PNG', 'JPEG'):
+        data, gray = encoded_page(fmt, dpi=(150, 150))
+        decoded, dpi = load_image_gray(file_storage(data, f'scan.{fmt.lower()}'))
+        assert decoded.dtype == np.uint8 and decoded.shape == gray.shape
+        assert np.abs(decoded.astype(int) - gray).mean() < 3
+        assert round(dpi) == 150
+
+
+def test_preprocessing_reuses_the_decoded_buffer():
+    _, gray = encoded_page('PNG')
+    processed, report = preprocess_array(gray, inplace=True)
+    assert report['denoise'] == 'none'
+    assert np.shares_memory(processed, gray)
+
+    # Without inplace the caller's array is left untouched
+    _, original = encoded_page('PNG')
+    copy = original.copy()
+    preprocess_array(original)
+    assert np.array_equal(original, copy)
+
+
+def test_process_medical_report_removes_spooled_file(monkeypatch):
+    monkeypatch.setattr(ocr_processor, 'ocr_cache', OCRResultCache(max_entries=4))
+    seen = []
+
+    def fake_extract(upload, page_report=None):
+        seen.append(upload.path)
+        return 'Patient Name: Jane Doe\nTotal Cholesterol: 250 mg/dl'
+
+    monkeypatch.setattr(ocr_processor, 'extract_text_from_file', fake_extract)
+    result = ocr_processor.process_medical_report(file_storage(b'%PDF-1.4', 'lab.pdf'))
+
+    assert result['success']
+    assert not os.path.exists(seen[0])
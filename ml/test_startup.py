@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import app as ml_app
+
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_skips_ocr_and_xgboost():
+    code = (
+        "import sys, app; "
+        "heavy = [m for m in ('ocr_processor', 'cv2', 'xgboost', 'pandas') if m in sys.modules]; "
+        "assert not heavy, heavy; "
+        "assert app.MODEL_STATE == 'not_loaded'; "
+        "assert app.plan_writer.outbox is None and app.plan_writer.status_store is None; "
+        "assert app.plan_writer._thread is None and app.report_jobs.store is None"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=ML_DIR, check=True, capture_output=True)
+
+
+def test_health_is_live_while_models_load(monkeypatch):
+    client = ml_app.create_app(warm_up='lazy', watch=False, stores=False).test_client()
+    monkeypatch.setattr(ml_app, 'MODEL_STATE', 'loading')
+
+    health = client.get('/api/health').get_json()
+    assert health['status'] == 'healthy'
+    assert health['ready'] is False
+    assert client.get('/api/ready').status_code == 503
+
+    response = client.post('/api/predict/batch', json=[{'age': 30}])
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+
+def test_failed_models_report_not_ready(monkeypatch):
+    client = ml_app.create_app(warm_up='lazy', watch=False, stores=False).test_client()
+    monkeypatch.setattr(ml_app, 'MODEL_STATE', 'failed')
+
+    assert client.post('/api/predict', json={'age': 30}).status_code == 503
+    assert client.get('/api/ready').get_json() == {'ready': False, 'model_state': 'failed'}
+
+
+def test_stores_open_in_create_app_and_replay(monkeypatch, tmp_path):
+    from plan_writer import DietPlanWriter, PlanOutbox
+
+    PlanOutbox(str(tmp_path / 'plans.db')).add({'idempotencyKey': 'k1', 'n': 1})
+    writer = DietPlanWriter('http://backend')
+    started = []
+    monkeypatch.setattr(writer, 'start', lambda: started.append(True))
+    monkeypatch.setattr(ml_app, 'plan_writer', writer)
+    monkeypatch.setattr(ml_app, 'OUTBOX_ENABLED', True)
+    monkeypatch.setattr(ml_app, 'OUTBOX_PATH', str(tmp_path / 'plans.db'))
+    monkeypatch.setattr(ml_app, 'PLAN_STATUS_PATH', str(tmp_path / 'plans.db'))
+    monkeypatch.setattr(ml_app, 'report_jobs', ml_app.ReportJobQueue(None))
+    monkeypatch.setattr(ml_app, 'REPORT_JOB_DB', str(tmp_path / 'jobs.db'))
+
+    ml_app.create_app(warm_up='lazy', watch=False)
+
+    assert len(writer.outbox) == 1
+    assert writer.status_store is not None
+    assert ml_app.report_jobs.store.path == str(tmp_path / 'jobs.db')
+    assert started == [True]
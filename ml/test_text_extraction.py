@@ -0,0 +1,369 @@
+"""
+Regression checks for the precompiled text extractors: each one must
+return exactly what the original implementation returned.
+"""
+import random
+import re
+
+from fuzzywuzzy import fuzz
+
+import ocr_processor
+from ocr_processor import DISEASE_KEYWORDS
+
+
+def legacy_find_diseases_in_text(text):
+    text_lower = text.lower()
+    found_diseases = set()
+    for disease, keywords in DISEASE_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword.lower() in text_lower:
+                found_diseases.add(disease)
+                break
+            words = text_lower.split()
+            for word in words:
+                if len(word) > 3:
+                    similarity = fuzz.ratio(keyword.lower(), word)
+                    if similarity > 85:
+                        found_diseases.add(disease)
+                        break
+    return list(found_diseases)
+
+
+def legacy_find_allergies_in_text(text):
+    """
+    Find allergy mentions in extracted text
+    """
+    text_lower = text.lower()
+    found_allergies = []
+
+    # Look for allergy section
+    allergy_patterns = [
+        r'allergies?:\s*([^\n]+)',
+        r'allergic to:\s*([^\n]+)',
+        r'known allergies?:\s*([^\n]+)',
+        r'drug allergies?:\s*([^\n]+)',
+        r'food allergies?:\s*([^\n]+)'
+    ]
+
+    for pattern in allergy_patterns:
+        matches = re.finditer(pattern, text_lower)
+        for match in matches:
+            allergy_text = match.group(1)
+
+            # Check for specific allergy keywords
+            for allergy_keyword in ocr_processor.ALLERGY_KEYWORDS:
+                if allergy_keyword in allergy_text:
+                    found_allergies.append(allergy_keyword.title())
+
+    # Also check for "allergic to X" patterns
+    allergic_pattern = r'allergic to ([a-z\s,]+)'
+    matches = re.finditer(allergic_pattern, text_lower)
+    for match in matches:
+        items = match.group(1).split(',')
+        for item in items:
+            item = item.strip()
+            if item and len(item) > 2:
+                found_allergies.append(item.title())
+
+    return list(set(found_allergies))  # Remove duplicates
+
+
+def legacy_extract_patient_details(text):
+
+    info = {}
+    text_lower = text.lower()
+
+    # Extract Name
+    name_patterns = [
+        r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|$)',
+        r'patient\s*name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+        r'name\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+        r'patient\s*[-:–]?\s*([a-zA-Z][a-zA-Z\s\.]+?)(?:\n|age|dob)',
+        r'mr\.\s*([a-zA-Z]+)',
+        r'mrs\.\s*([a-zA-Z]+)',
+        r'ms\.\s*([a-zA-Z]+)',
+    ]
+    for pattern in name_patterns:
+        match = re.search(pattern, text_lower, re.IGNORECASE)
+        if match:
+            name = match.group(1).strip()
+            # Clean up the name
+            name = re.sub(r'\s+', ' ', name)  # Remove multiple spaces
+            name = name.replace('.', '').strip()
+            if len(name) > 2 and len(name) < 50:  # Reasonable name length
+                info['name'] = name.title()
+                break
+
+    # Extract Age
+    age_patterns = [
+        r'age\s*[-:–]?\s*(\d{1,3})\s*(?:years?|yrs?)?',
+        r'(\d{1,3})\s*(?:years?|yrs?)\s*old',
+        r'age\s*[-:–]\s*(\d{1,3})',
+        r'[-–]\s*(\d{1,3})\s*years?',  # Handles "- 56 years"
+    ]
+    for pattern in age_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            age = int(match.group(1))
+            if 1 <= age <= 120:  # Reasonable age range
+                info['age'] = age
+                break
+
+    # Extract Gender
+    gender_patterns = [
+        r'gender\s*:?\s*(male|female|m\/f|m|f)',
+        r'sex\s*:?\s*(male|female|m\/f|m|f)',
+        r'\b(male|female)\b',
+    ]
+    for pattern in gender_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            gender_text = match.group(1).lower()
+            if gender_text in ['male', 'm']:
+                info['gender'] = 'Male'
+            elif gender_text in ['female', 'f']:
+                info['gender'] = 'Female'
+            else:
+                info['gender'] = 'Other'
+            break
+
+    # Extract Height
+    height_patterns = [
+        r'height\s*:?\s*(\d{2,3})\s*cm',
+        r'height\s*:?\s*(\d)\s*[\']\s*(\d{1,2})',  # feet'inches
+    ]
+    for pattern in height_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            if 'cm' in pattern:
+                info['height'] = int(match.group(1))
+            else:
+                # Convert feet'inches to cm
+                feet = int(match.group(1))
+                inches = int(match.group(2))
+                height_cm = int((feet * 12 + inches) * 2.54)
+                info['height'] = height_cm
+            break
+
+    # Extract Weight
+    weight_patterns = [
+        r'weight\s*:?\s*(\d{2,3})\s*kg',
+        r'weight\s*:?\s*(\d{2,3})\s*lbs?',
+    ]
+    for pattern in weight_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            weight = int(match.group(1))
+            if 'lb' in pattern:
+                # Convert lbs to kg
+                weight = int(weight * 0.453592)
+            info['weight'] = weight
+            break
+
+    return info
+
+
+def legacy_extract_numerical_values(text):
+    """Extract numerical health values from text"""
+    values = {}
+    text_lower = text.lower()
+
+    # Blood Pressure (systolic/diastolic)
+    bp_patterns = [
+        r'blood\s*pressure[:\s-]*(\d{2,3})[/\\](\d{2,3})',
+        r'bp[:\s-]*(\d{2,3})[/\\](\d{2,3})',
+    ]
+    for pattern in bp_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['blood_pressure_systolic'] = int(match.group(1))
+            values['blood_pressure_diastolic'] = int(match.group(2))
+            break
+
+    # Cholesterol - more flexible patterns
+    cholesterol_patterns = [
+        r'total\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'cholesterol[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'total\s*chol[:\s-]*(\d{2,3}\.?\d*)',
+    ]
+    for pattern in cholesterol_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['total_cholesterol'] = float(match.group(1))
+            break
+
+    # LDL Cholesterol
+    ldl_patterns = [
+        r'ldl[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'ldl\s*cholesterol[:\s-]*(\d{2,3}\.?\d*)',
+    ]
+    for pattern in ldl_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['ldl_cholesterol'] = float(match.group(1))
+            break
+
+    # HDL Cholesterol
+    hdl_patterns = [
+        r'hdl[:\s-]*(\d{1,3}\.?\d*)\s*mg',
+        r'hdl\s*cholesterol[:\s-]*(\d{1,3}\.?\d*)',
+    ]
+    for pattern in hdl_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['hdl_cholesterol'] = float(match.group(1))
+            break
+
+    # Triglycerides
+    trig_patterns = [
+        r'triglycerides?[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'tg[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+    ]
+    for pattern in trig_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['triglycerides'] = float(match.group(1))
+            break
+
+    # Blood Sugar / Glucose - more flexible
+    sugar_patterns = [
+        r'fasting\s*blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'fbs[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'blood\s*sugar[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'glucose[:\s-]*(\d{2,3}\.?\d*)\s*mg',
+        r'blood\s*glucose[:\s-]*(\d{2,3}\.?\d*)',
+    ]
+    for pattern in sugar_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['blood_sugar'] = float(match.group(1))
+            break
+
+    # HbA1c
+    hba1c_patterns = [
+        r'hba1c[:\s-]*(\d{1,2}\.?\d*)\s*%',
+        r'a1c[:\s-]*(\d{1,2}\.?\d*)',
+    ]
+    for pattern in hba1c_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            values['hba1c'] = float(match.group(1))
+            break
+
+    return values
+
+
+SAMPLE_REPORT = """
+Medical Laboratory Report
+Senaviratna Medical Centre
+Eheliyagoda
+
+NAME - Mr. Amarasena
+AGE - 56 years
+DATE - 01/06/2020
+
+INVESTIGATION - FBS Lipid Profile
+
+Fasting Blood Sugar - 87.4 mg/dl
+Normal range 60 -110 mg/dl
+
+TOTAL CHOLESTEROL - 225.8 mg/dl
+Elevated over 240 mg/dl
+
+TRIGLYCERIDES - 163.4 mg/dl
+Elevated over 200mg/dl
+
+HDL - 45.8 mg/dl
+Favarable over 55mg/dl
+Risk indicator less than 35 mg/dl
+
+LDL - 147.3 mg/dl
+Elevated over 160 mg/dl
+"""
+
+HAND_WRITTEN_CASES = [
+    '',
+    SAMPLE_REPORT,
+    'Diagnosis: Type 2 Diabetes Mellitus, essential hypertension.',
+    'History of myocardial infraction in the last decade.',          # typo + 'cad' inside a word
+    'Pt is diabetc and hypertensoin noted.',                          # misspellings
+    'Known case of hypothyroidism; on levothyroxine.',
+    'highbloodsugar noted on admission',                              # run-together keyword
+    'polycystic ovarian syndrome (PCOS) and anaemia',
+    'Allergic to peanuts. Tree nut allergy. Coeliac disease.',
+    'Osteopenia on DEXA. Fatty liver on USG. CKD stage 3.',
+    'No significant past medical history.',
+    'Lactose malabsorption; hemoglobin <12 g/dl; obese',
+    'HEART FAILURE with reduced EF; arrhythmia',
+]
+
+
+def random_corpus(n_texts=150, seed=7):
+    rng = random.Random(seed)
+    keywords = [kw for kws in DISEASE_KEYWORDS.values() for kw in kws]
+    filler = SAMPLE_REPORT.split() + ['patient', 'reviewed', 'stable', 'normal', 'dose', 'mg', 'daily']
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+
+    def mutate(word):
+        chars = list(word)
+        for _ in range(rng.randint(1, 2)):
+            i = rng.randrange(len(chars))
+            op = rng.random()
+            if op < 0.4:
+                chars[i] = rng.choice(alphabet)
+            elif op < 0.7 and len(chars) > 1:
+                del chars[i]
+            else:
+                chars.insert(i, rng.choice(alphabet))
+        return ''.join(chars)
+
+    corpus = []
+    for _ in range(n_texts):
+        words = [rng.choice(filler) for _ in range(rng.randint(5, 60))]
+        for _ in range(rng.randint(0, 3)):
+            kw = rng.choice(keywords)
+            words.insert(rng.randrange(len(words) + 1), mutate(kw) if rng.random() < 0.7 else kw.upper())
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def test_disease_matcher_matches_legacy():
+    for text in HAND_WRITTEN_CASES + random_corpus():
+        assert sorted(ocr_processor.find_diseases_in_text(text)) == sorted(legacy_find_diseases_in_text(text)), text
+
+
+EXTRACTION_CASES = HAND_WRITTEN_CASES + [
+    'Patient Name: Jane Doe\nAge: 52 years\nSex: F\nHeight: 5\'4\nWeight: 150 lbs\nBP: 150/95',
+    'NAME: Dr. X\npatient name - john smith age 44\nmrs. perera',          # first name candidate too short
+    'Age: 0\nAge 130\n45 years old female',                                # out-of-range ages fall through
+    'Mr. Silva - 61 years\nBlood Pressure: 128/84 mmHg\nBP 140/90',
+    'Total Chol 231\nLDL Cholesterol 150\nHDL: 38 mg/dl\nTG 210 mg/dl\nHbA1c: 6.9 %',
+    'Blood glucose 142\nglucose - 118 mg/dl\nFBS: 101 mg/dl\nA1C 7',
+    'gender: male\nheight: 172 cm\nweight: 81 kg\ncholesterol: 199 mg',
+    'Allergies: peanuts, shellfish\nKnown allergies: penicillin\nFood allergy: egg',
+    'Drug allergies:\n  aspirin and sulfa\nallergic to dust, pollen , cats',
+    'allergies: allergies:\nmilk\nallergic to:\nsoy',                     # empty section headers
+    'Patient is allergic to latex, bee stings and allergic to: wheat',
+]
+
+
+def test_patient_details_match_legacy():
+    for text in EXTRACTION_CASES + random_corpus(50, seed=11):
+        assert ocr_processor.extract_patient_details(text) == legacy_extract_patient_details(text), text
+
+
+def test_numerical_values_match_legacy():
+    for text in EXTRACTION_CASES + random_corpus(50, seed=12):
+        assert ocr_processor.extract_numerical_values(text) == legacy_extract_numerical_values(text), text
+
+
+def test_allergies_match_legacy():
+    for text in EXTRACTION_CASES:
+        assert sorted(ocr_processor.find_allergies_in_text(text)) == sorted(legacy_find_allergies_in_text(text)), text
+
+
+def test_extract_medical_info_on_sample_report():
+    info = ocr_processor.extract_medical_info(SAMPLE_REPORT)
+    assert info['patient_details'] == {'name': 'Mr Amarasena', 'age': 56}
+    assert info['numerical_info']['total_cholesterol'] == 225.8
+    assert 'High Cholesterol' in info['diseases']
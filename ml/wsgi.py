@@ -0,0 +1,29 @@
+"""
+WSGI entry point for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+MODEL_WARMUP defaults to 'eager' here: the gunicorn master loads the
+models before forking so workers share them copy-on-write. With
+'background' or 'lazy' the master skips that and each worker loads its
+own copy after fork (app.reset_after_fork), so workers answer
+/api/health sooner at the cost of memory per worker.
+"""
+import os
+
+os.environ.setdefault('MODEL_WARMUP', 'eager')
+
+import app as ml_app
+
+# The model watcher and the SQLite stores belong to each worker (set up
+# after fork), not the master
+app = ml_app.create_app(
+    warm_up='eager' if ml_app.MODEL_WARMUP == 'eager' else 'lazy', watch=False, stores=False
+)
+
+if ml_app.MODEL_STATE == 'failed':
+    raise RuntimeError('Models failed to load; refusing to start workers')
+
+# Upload-serving groups import the OCR stack once in the master too
+if os.environ.get('ML_SERVER_ROLE', 'all').lower() in ('ocr', 'all'):
+    ml_app.ocr_module()